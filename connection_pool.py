@@ -0,0 +1,143 @@
+"""
+SAP HANA Connection Pool for MCP Server
+
+This module provides an asyncio connection pool on top of hana_connection, so
+tools running concurrently each get their own connection without paying the
+connect and authentication cost on every call. One pool is kept for the
+System DB and one for the Tenant DB.
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from hana_connection import HanaConnection, forget_prepared
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Pool sizing and the seconds acquire waits for a free connection
+POOL_MIN_SIZE = 2
+POOL_MAX_SIZE = 10
+POOL_TIMEOUT = 30
+
+# use_system_db -> pool, and the event loop the pools belong to
+_pools: Dict[bool, "ConnectionPool"] = {}
+_pools_loop: Optional[asyncio.AbstractEventLoop] = None
+_pools_lock: Optional[asyncio.Lock] = None
+
+
+class ConnectionPool:
+    """Pool of HANA connections for the System DB or the Tenant DB."""
+
+    def __init__(
+        self,
+        use_system_db: bool,
+        min_size: int = POOL_MIN_SIZE,
+        max_size: int = POOL_MAX_SIZE,
+        timeout: float = POOL_TIMEOUT
+    ):
+        self.use_system_db = use_system_db
+        self.min_size = min_size
+        self.timeout = timeout
+        self._idle: List[Any] = []
+        # Bounds the connections in use; idle connections were all in use once,
+        # so the pool never holds more than max_size connections
+        self._slots = asyncio.Semaphore(max_size)
+
+    async def _connect(self) -> Any:
+        """Open a new connection in a worker thread, or return None on failure."""
+        return await asyncio.to_thread(HanaConnection.create_connection, self.use_system_db)
+
+    async def fill(self) -> None:
+        """Open connections until min_size are idle."""
+        while len(self._idle) < self.min_size:
+            conn = await self._connect()
+            if conn is None:
+                break
+            self._idle.append(conn)
+
+    def _take_idle(self) -> Any:
+        """Return an idle connection that is still connected, closing stale ones."""
+        while self._idle:
+            conn = self._idle.pop()
+            try:
+                if conn.isconnected():
+                    return conn
+            except Exception:
+                pass
+            logger.info("Discarding stale pooled HANA connection")
+            _close_quietly(conn)
+        return None
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[Any]:
+        """Borrow a connection from the pool.
+
+        Yields None if no connection could be established, like hana_connection.
+        The connection goes back to the pool only if the block completes; if it
+        raises or is cancelled, a worker thread may still be running a statement
+        on it, so it is closed instead.
+
+        Raises:
+            TimeoutError: If no connection becomes free within the pool timeout
+        """
+        await asyncio.wait_for(self._slots.acquire(), self.timeout)
+        conn = None
+        completed = False
+        try:
+            conn = self._take_idle()
+            if conn is None:
+                conn = await self._connect()
+            yield conn
+            completed = True
+        finally:
+            if conn is not None:
+                if completed:
+                    self._idle.append(conn)
+                else:
+                    _close_quietly(conn)
+            self._slots.release()
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        while self._idle:
+            _close_quietly(self._idle.pop())
+
+
+def _close_quietly(conn: Any) -> None:
+    """Close a connection, ignoring errors from an already broken one."""
+    forget_prepared(conn)
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+async def get_pool(use_system_db: bool = False) -> ConnectionPool:
+    """Get the connection pool for the System DB or the Tenant DB.
+
+    Pools are created and filled to their minimum size on first use, and
+    recreated if the running event loop changed.
+    """
+    global _pools_loop, _pools_lock
+
+    loop = asyncio.get_running_loop()
+    if _pools_loop is not loop:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+        _pools_loop = loop
+        _pools_lock = asyncio.Lock()
+
+    pool = _pools.get(use_system_db)
+    if pool is None:
+        async with _pools_lock:
+            pool = _pools.get(use_system_db)
+            if pool is None:
+                pool = ConnectionPool(use_system_db)
+                await pool.fill()
+                _pools[use_system_db] = pool
+    return pool
+
@@ -7,7 +7,7 @@ supporting both System DB and Tenant DB connections.
 
 import os
 import logging
-from typing import Optional, Dict, Any, Union
+from typing import Optional, Dict, Any, Iterator, Union
 from contextlib import contextmanager
 import hdbcli.dbapi
 
@@ -20,6 +20,9 @@ def get_env_var(name: str, default: Optional[str] = None) -> Optional[str]:
     """Get environment variable with optional default."""
     return os.environ.get(name, default)
 
+# Prepared statements per connection: id(conn) -> (conn, {query: cursor with it prepared})
+_prepared_statements: Dict[int, Any] = {}
+
 class HanaConnection:
     """HANA Connection Manager for System and Tenant databases."""
     
@@ -50,31 +53,40 @@ class HanaConnection:
             "currentSchema": schema
         }
     
+    @classmethod
+    def create_connection(cls, use_system_db: bool = False) -> Any:
+        """Open a new connection to the HANA database, or return None on failure."""
+        conn_type = "system" if use_system_db else "tenant"
+        params = cls.get_connection_params(use_system_db)
+        
+        if not params["address"] or not params["port"]:
+            logger.error(f"Missing connection parameters for {conn_type} DB")
+            return None
+        
+        try:
+            connection = hdbcli.dbapi.connect(
+                address=params["address"],
+                port=params["port"],
+                user=params["user"],
+                password=params["password"],
+                currentSchema=params["currentSchema"]
+            )
+            logger.info(f"Established new connection to {conn_type} DB")
+            return connection
+        except Exception as e:
+            logger.error(f"Error connecting to {conn_type} DB: {str(e)}")
+            return None
+    
     @classmethod
     def get_connection(cls, use_system_db: bool = False) -> Any:
         """Get a connection to the HANA database."""
         conn_type = "system" if use_system_db else "tenant"
         
         if conn_type not in cls._connections or not cls._connections[conn_type]:
-            params = cls.get_connection_params(use_system_db)
-            
-            if not params["address"] or not params["port"]:
-                logger.error(f"Missing connection parameters for {conn_type} DB")
-                return None
-            
-            try:
-                connection = hdbcli.dbapi.connect(
-                    address=params["address"],
-                    port=params["port"],
-                    user=params["user"],
-                    password=params["password"],
-                    currentSchema=params["currentSchema"]
-                )
-                cls._connections[conn_type] = connection
-                logger.info(f"Established new connection to {conn_type} DB")
-            except Exception as e:
-                logger.error(f"Error connecting to {conn_type} DB: {str(e)}")
+            connection = cls.create_connection(use_system_db)
+            if connection is None:
                 return None
+            cls._connections[conn_type] = connection
         
         return cls._connections[conn_type]
     
@@ -83,12 +95,14 @@ class HanaConnection:
         """Close a specific or all database connections."""
         if conn_type:
             if conn_type in cls._connections and cls._connections[conn_type]:
+                forget_prepared(cls._connections[conn_type])
                 cls._connections[conn_type].close()
                 cls._connections[conn_type] = None
                 logger.info(f"Closed connection to {conn_type} DB")
         else:
             for conn_type in cls._connections:
                 if cls._connections[conn_type]:
+                    forget_prepared(cls._connections[conn_type])
                     cls._connections[conn_type].close()
                     cls._connections[conn_type] = None
             logger.info("Closed all DB connections")
@@ -135,6 +149,94 @@ def execute_query(
         logger.error(f"Error executing query: {error_msg}")
         return {"error": error_msg}
 
+def execute_prepared(
+    conn, 
+    query: str, 
+    params: list = None, 
+    max_rows: int = 1000
+) -> Union[list, Dict[str, Any]]:
+    """Execute a SQL query through a statement prepared once per connection.
+    
+    The statement is prepared the first time a connection runs the query text
+    and reused afterwards, so HANA does not parse it again. Only use this for
+    query texts from a small fixed set. Returns the same as execute_query.
+    """
+    if not conn:
+        return {"error": "No database connection"}
+    
+    statements = _prepared_statements.setdefault(id(conn), (conn, {}))[1]
+    cursor = statements.get(query)
+    try:
+        if cursor is None:
+            cursor = conn.cursor()
+            cursor.prepare(query)
+            statements[query] = cursor
+        if params:
+            cursor.executeprepared(params)
+        else:
+            cursor.executeprepared()
+        
+        result = []
+        if cursor.description:
+            columns = [col[0] for col in cursor.description]
+            for row in cursor.fetchmany(max_rows):
+                result.append(dict(zip(columns, row)))
+        return result
+    except Exception as e:
+        # Prepare again next time; the statement may no longer be valid
+        statements.pop(query, None)
+        if cursor is not None:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        error_msg = str(e)
+        logger.error(f"Error executing prepared query: {error_msg}")
+        return {"error": error_msg}
+
+def forget_prepared(conn) -> None:
+    """Close the prepared statements of a connection that is being closed."""
+    entry = _prepared_statements.pop(id(conn), None)
+    if entry is None:
+        return
+    for cursor in entry[1].values():
+        try:
+            cursor.close()
+        except Exception:
+            pass
+
+def execute_query_iter(
+    conn, 
+    query: str, 
+    params: list = None, 
+    max_rows: int = 1000,
+    batch_size: int = 100
+) -> Iterator[Dict[str, Any]]:
+    """Execute a SQL query and yield its rows as dictionaries, fetched in batches.
+    
+    Unlike execute_query, rows are not collected into a list, and errors are raised.
+    """
+    cursor = conn.cursor()
+    try:
+        if params:
+            cursor.execute(query, params)
+        else:
+            cursor.execute(query)
+        
+        if not cursor.description:
+            return
+        columns = [col[0] for col in cursor.description]
+        remaining = max_rows
+        while remaining > 0:
+            rows = cursor.fetchmany(min(batch_size, remaining))
+            if not rows:
+                break
+            remaining -= len(rows)
+            for row in rows:
+                yield dict(zip(columns, row))
+    finally:
+        cursor.close()
+
 def get_table_schema(conn, table_name: str, schema_name: str = None) -> Dict[str, Any]:
     """Get schema information for a table."""
     if not conn:
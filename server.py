@@ -46,9 +46,9 @@ from mcp.server.fastmcp import FastMCP, Context
 from mcp.server import Server   
 import uvicorn
 import json
-import decimal
 from dotenv import load_dotenv
 from hana_connection import hana_connection, execute_query, get_table_schema
+from tools._formatting import dumps_json
 from azure.identity import DefaultAzureCredential
 from azure.mgmt.apimanagement import ApiManagementClient
 from azure.mgmt.apimanagement.models import AuthorizationContract, AuthorizationAccessPolicyContract, AuthorizationLoginRequestContract
@@ -73,13 +73,6 @@ mcp_server.server_info = server_info
 logging.info("SAP HANA MCP Server initialized with updated server info")
 print("SAP HANA MCP Server initialized with updated server info", file=sys.stderr)
 
-# Custom JSON encoder for handling Decimal objects
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, o):
-        if isinstance(o, decimal.Decimal):
-            return float(o)
-        return super().default(o)
-
 # Format utilities for tool results
 def format_result_content(result: Union[Dict[str, Any], str, List[Dict[str, Any]]]) -> Dict[str, Any]:
     """Format the result content for MCP response.
@@ -147,7 +140,7 @@ def initialize_server():
         logging.error(traceback.format_exc())
 
 @mcp_server.tool()
-async def get_system_overview(use_system_db: bool = True) -> Dict[str, Any]:
+async def get_system_overview(use_system_db: bool = True, fmt: str = "json") -> Dict[str, Any]:
     """Get an overview of the SAP HANA system status, including host information,
     service status, and system resource usage.
     
@@ -155,10 +148,11 @@ async def get_system_overview(use_system_db: bool = True) -> Dict[str, Any]:
     
     Args:
         use_system_db: Whether to use the system database (recommended for administration)
+        fmt: Output format, "json" (default) or "markdown" for one table per view
     """
     # Import tools from the tools directory
     from tools.system_overview import get_system_overview as get_system_overview_impl
-    return await get_system_overview_impl(use_system_db)
+    return await get_system_overview_impl(use_system_db, fmt)
 
 @mcp_server.tool()
 async def get_disk_usage(use_system_db: bool = True) -> Dict[str, Any]:
@@ -175,17 +169,18 @@ async def get_disk_usage(use_system_db: bool = True) -> Dict[str, Any]:
     return await get_disk_usage_impl(use_system_db)
 
 @mcp_server.tool()
-async def get_db_info(use_system_db: bool = True) -> Dict[str, Any]:
+async def get_db_info(use_system_db: bool = True, refresh: bool = False) -> Dict[str, Any]:
     """Get database information from SAP HANA.
     
     This uses the M_DATABASE system view.
     
     Args:
         use_system_db: Whether to use the system database (recommended for administration)
+        refresh: Bypass the response cached from a recent call
     """
     try:
         from tools.system_info import get_db_info as get_db_info_impl
-        return await get_db_info_impl(use_system_db)
+        return await get_db_info_impl(use_system_db, refresh=refresh)
     except Exception as e:
         logging.error(f"Error getting database information: {str(e)}", exc_info=True)
         return {
@@ -194,17 +189,19 @@ async def get_db_info(use_system_db: bool = True) -> Dict[str, Any]:
         }
 
 @mcp_server.tool()
-async def get_backup_catalog(use_system_db: bool = True) -> Dict[str, Any]:
+async def get_backup_catalog(use_system_db: bool = True, limit: int = 200, refresh: bool = False) -> Dict[str, Any]:
     """Get the backup catalog information from SAP HANA.
     
     This uses the M_BACKUP_CATALOG system view.
     
     Args:
         use_system_db: Whether to use the system database (recommended for administration)
+        limit: Maximum number of (most recent) catalog entries to return, at most 1000
+        refresh: Bypass the response cached from a recent call
     """
     try:
         from tools.system_info import get_backup_catalog as get_backup_catalog_impl
-        return await get_backup_catalog_impl(use_system_db)
+        return await get_backup_catalog_impl(use_system_db, limit, refresh=refresh)
     except Exception as e:
         logging.error(f"Error getting backup catalog: {str(e)}", exc_info=True)
         return {
@@ -213,17 +210,18 @@ async def get_backup_catalog(use_system_db: bool = True) -> Dict[str, Any]:
         }
 
 @mcp_server.tool()
-async def get_failed_backups(use_system_db: bool = True) -> Dict[str, Any]:
+async def get_failed_backups(use_system_db: bool = True, refresh: bool = False) -> Dict[str, Any]:
     """Get information about failed or canceled backups from SAP HANA.
     
     This uses the M_BACKUP_CATALOG and M_BACKUP_CATALOG_FILES system views.
     
     Args:
         use_system_db: Whether to use the system database (recommended for administration)
+        refresh: Bypass the response cached from a recent call
     """
     try:
         from tools.system_info import get_failed_backups as get_failed_backups_impl
-        return await get_failed_backups_impl(use_system_db)
+        return await get_failed_backups_impl(use_system_db, refresh=refresh)
     except Exception as e:
         logging.error(f"Error getting failed backups: {str(e)}", exc_info=True)
         return {
@@ -232,17 +230,18 @@ async def get_failed_backups(use_system_db: bool = True) -> Dict[str, Any]:
         }
 
 @mcp_server.tool()
-async def get_tablesize_on_disk(use_system_db: bool = True) -> Dict[str, Any]:
+async def get_tablesize_on_disk(use_system_db: bool = True, refresh: bool = False) -> Dict[str, Any]:
     """Get table sizes on disk from SAP HANA.
     
     This uses the PUBLIC.M_TABLE_PERSISTENCE_STATISTICS system view.
     
     Args:
         use_system_db: Whether to use the system database (recommended for administration)
+        refresh: Bypass the response cached from a recent call
     """
     try:
         from tools.system_info import get_tablesize_on_disk as get_tablesize_on_disk_impl
-        return await get_tablesize_on_disk_impl(use_system_db)
+        return await get_tablesize_on_disk_impl(use_system_db, refresh=refresh)
     except Exception as e:
         logging.error(f"Error getting table sizes on disk: {str(e)}", exc_info=True)
         return {
@@ -251,17 +250,18 @@ async def get_tablesize_on_disk(use_system_db: bool = True) -> Dict[str, Any]:
         }
 
 @mcp_server.tool()
-async def get_table_used_memory(use_system_db: bool = True) -> Dict[str, Any]:
+async def get_table_used_memory(use_system_db: bool = True, refresh: bool = False) -> Dict[str, Any]:
     """Get memory usage by table type (column vs row) from SAP HANA.
     
     This uses the SYS.M_TABLES system view.
     
     Args:
         use_system_db: Whether to use the system database (recommended for administration)
+        refresh: Bypass the response cached from a recent call
     """
     try:
         from tools.system_info import get_table_used_memory as get_table_used_memory_impl
-        return await get_table_used_memory_impl(use_system_db)
+        return await get_table_used_memory_impl(use_system_db, refresh=refresh)
     except Exception as e:
         logging.error(f"Error getting table memory usage: {str(e)}", exc_info=True)
         return {
@@ -269,6 +269,28 @@ async def get_table_used_memory(use_system_db: bool = True) -> Dict[str, Any]:
             "isError": True
         }
 
+@mcp_server.tool()
+async def get_all_system_info(use_system_db: bool = True, refresh: bool = False) -> Dict[str, Any]:
+    """Get the backup catalog, database information, failed backups, table sizes on disk
+    and table memory usage from SAP HANA in one call.
+    
+    The underlying queries run concurrently, so this is faster than calling the
+    five tools one after another.
+    
+    Args:
+        use_system_db: Whether to use the system database (recommended for administration)
+        refresh: Bypass the responses cached from recent calls
+    """
+    try:
+        from tools.system_info import get_all_system_info as get_all_system_info_impl
+        return await get_all_system_info_impl(use_system_db, refresh=refresh)
+    except Exception as e:
+        logging.error(f"Error getting system information: {str(e)}", exc_info=True)
+        return {
+            "content": [{"type": "text", "text": f"Error getting system information: {str(e)}"}],
+            "isError": True
+        }
+
 @mcp_server.tool()
 async def check_disk_space(sid: str = None, host: str = None, filesystem: str = None, auth_context: Dict[str, Any] = None) -> Dict[str, Any]:
     """Check disk space on SAP/HANA systems.
@@ -1011,7 +1033,8 @@ async def get_sap_inventory_summary_tool(
     resource_group: str = None,
     subscription_id: str = None,
     sid: str = None,
-    auth_context: Dict[str, Any] = None
+    auth_context: Dict[str, Any] = None,
+    include_component_names: bool = False
 ) -> Dict[str, Any]:
     """Get summary of SAP systems and components in Azure.
     
@@ -1024,6 +1047,7 @@ async def get_sap_inventory_summary_tool(
         subscription_id: Azure subscription ID (optional, will use default from config if not provided)
         sid: SAP System ID to filter resources (optional)
         auth_context: Authentication context with Azure permissions
+        include_component_names: Also list the VM names of each component type (optional)
     """
     try:
         from tools.sap_inventory.inventory_summary import get_sap_inventory_summary
@@ -1031,7 +1055,8 @@ async def get_sap_inventory_summary_tool(
             resource_group=resource_group,
             subscription_id=subscription_id,
             sid=sid,
-            auth_context=auth_context
+            auth_context=auth_context,
+            include_component_names=include_component_names
         )
         # Refined: Check status and format accordingly
         if isinstance(result, dict) and 'status' in result:
@@ -1093,7 +1118,7 @@ async def check_sap_vm_compliance_tool(
             if result['status'] == 'success':
                 # Return the structured success data as JSON
                 return {
-                    "content": [{"type": "json", "json": json.dumps(result, cls=DecimalEncoder)}], 
+                    "content": [{"type": "json", "json": dumps_json(result)}], 
                     "isError": False
                 }
             else:
@@ -1119,7 +1144,8 @@ async def run_sap_workbook_check_tool(
     check_name: str, # Name of the check/query to run (must match key in workbook_checker.py)
     vis_id: Optional[str] = None, # Azure Resource ID of the VIS to scope the query
     subscription_ids: Optional[List[str]] = None, # Target subscription ID(s)
-    auth_context: Optional[Dict[str, Any]] = None
+    auth_context: Optional[Dict[str, Any]] = None,
+    vis_ids: Optional[List[str]] = None # Several VIS resource IDs checked in one query
 ) -> Dict[str, Any]:
     """Executes a predefined KQL query check from the SAP Inventory Workbook definition.
     
@@ -1131,6 +1157,7 @@ async def run_sap_workbook_check_tool(
         vis_id (str, optional): The Azure Resource ID of the Virtual Instance for SAP solutions.
         subscription_ids (List[str], optional): Specific subscription IDs to query.
         auth_context (Dict[str, Any], optional): Authentication context.
+        vis_ids (List[str], optional): Azure Resource IDs of several VIS, checked in one query.
         
     Returns:
         Dict[str, Any]: Query results or error message.
@@ -1143,7 +1170,8 @@ async def run_sap_workbook_check_tool(
             check_name=check_name,
             vis_id=vis_id,
             subscription_ids=subscription_ids,
-            auth_context=auth_context
+            auth_context=auth_context,
+            vis_ids=vis_ids
         )
         
         # Process result
@@ -1151,7 +1179,7 @@ async def run_sap_workbook_check_tool(
             if result['status'] == 'success':
                 # Return the data array as JSON
                 return {
-                    "content": [{"type": "json", "json": json.dumps(result.get('data', []), cls=DecimalEncoder)}],
+                    "content": [{"type": "json", "json": dumps_json(result.get('data', []))}],
                     "isError": False
                 }
             else:
@@ -1236,7 +1264,7 @@ async def run_sap_quality_check_tool(
             if result['status'] == 'success':
                 # Return the data as JSON
                 return {
-                    "content": [{"type": "json", "json": json.dumps(result.get('data', {}), cls=DecimalEncoder)}],
+                    "content": [{"type": "json", "json": dumps_json(result.get('data', {}))}],
                     "isError": False
                 }
             else:
@@ -1283,7 +1311,7 @@ async def get_sap_quality_check_definitions_tool(
             if result['status'] == 'success':
                 # Return the data as JSON
                 return {
-                    "content": [{"type": "json", "json": json.dumps(result.get('data', {}), cls=DecimalEncoder)}],
+                    "content": [{"type": "json", "json": dumps_json(result.get('data', {}))}],
                     "isError": False
                 }
             else:
@@ -0,0 +1,118 @@
+"""
+Result formatting for SAP HANA MCP tools.
+
+This module holds the JSON encoder and MCP content formatter shared by the
+tool modules. It does not import any tool module, so every tool can import
+it without creating a circular import.
+"""
+
+import json
+import decimal
+import io
+import itertools
+from typing import Any, Dict, Iterable, Iterator, List
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Custom JSON encoder for handling Decimal objects (kept for callers that pass it as cls=)
+class DecimalEncoder(json.JSONEncoder):
+    def default(self, o):
+        if isinstance(o, decimal.Decimal):
+            return float(o)
+        return super().default(o)
+
+def _decimal_default(o):
+    """Serialize Decimal values as floats; passed as default= instead of an encoder class"""
+    if o.__class__ is decimal.Decimal:
+        return float(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+def _dumps(obj: Any) -> str:
+    """Serialize a dictionary result as indented JSON, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(
+            obj, default=_decimal_default, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+        ).decode()
+    return json.dumps(obj, indent=2, default=_decimal_default)
+
+def dumps_json(obj: Any) -> str:
+    """Serialize a tool result to a compact JSON string, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(
+            obj, default=_decimal_default, option=orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+        ).decode()
+    return json.dumps(obj, default=_decimal_default)
+
+def _table_lines(first: Dict[str, Any], rows: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    """Generate the lines of a markdown table for a first row and the rows after it."""
+    keys = list(first.keys())
+    yield "| " + " | ".join(keys) + " |\n"
+    yield "| " + " | ".join(["---"] * len(keys)) + " |\n"
+    
+    # Convert any Decimal values to float. HANA returns the same type for every
+    # row of a column, so the Decimal columns are found once from the first row
+    # and the other cells are rendered with str alone (so are NULLs)
+    _D = decimal.Decimal
+    dec_cols = {k for k, v in first.items() if type(v) is _D}
+    rows = itertools.chain((first,), rows)
+    if not dec_cols:
+        for row in rows:
+            yield "| " + " | ".join([str(row[k]) for k in keys]) + " |\n"
+        return
+    for row in rows:
+        yield "| " + " | ".join([
+            str(float(row[k])) if k in dec_cols and row[k] is not None else str(row[k]) for k in keys
+        ]) + " |\n"
+
+def format_table(rows: Iterable[Any]) -> str:
+    """Format rows as a markdown table (or other items as bullet points).
+
+    Rows are consumed one at a time and their lines written into one buffer
+    as they are generated, so rows can come straight from execute_query_iter
+    without being collected into a list first.
+    """
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return "No results found."
+    
+    if isinstance(first, dict):
+        buf = io.StringIO()
+        buf.writelines(_table_lines(first, rows))
+        return buf.getvalue()
+    
+    # Format list as bullet points
+    return "\n".join([f"* {item}" for item in itertools.chain((first,), rows)])
+
+def _fmt_str(result: str) -> List[Dict[str, Any]]:
+    return [{"type": "text", "text": result}]
+
+def _fmt_dict(result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    if "error" in result:
+        return [{"type": "text", "text": f"Error: {result['error']}"}]
+    # Format dictionary as JSON
+    return [{"type": "text", "text": _dumps(result)}]
+
+def _fmt_list(result: Iterable[Any]) -> List[Dict[str, Any]]:
+    return [{"type": "text", "text": format_table(result)}]
+
+def _fmt_default(result: Any) -> List[Dict[str, Any]]:
+    # Subclasses of the dispatched types are formatted like their base type
+    for base, fmt in _DISPATCH.items():
+        if isinstance(result, base):
+            return fmt(result)
+    # Rows streamed from a cursor are formatted like a list
+    if isinstance(result, Iterator):
+        return _fmt_list(result)
+    # Default formatting for other types
+    return [{"type": "text", "text": str(result)}]
+
+# Formatter by exact result type; anything else goes through _fmt_default
+_DISPATCH = {str: _fmt_str, dict: _fmt_dict, list: _fmt_list}
+
+def format_result_content(result: Any) -> List[Dict[str, Any]]:
+    """Format result into MCP content format."""
+    return _DISPATCH.get(type(result), _fmt_default)(result)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Azure Async Client Support Module
+
+This module provides the pieces needed to use the azure-mgmt ``aio`` clients
+from the MCP tools: an async wrapper around the credential returned by
+get_azure_credential and an aiohttp transport shared by all clients, so
+connections (TLS sessions, DNS lookups) are reused across tool invocations.
+"""
+import asyncio
+import functools
+import logging
+from typing import Any, Optional
+
+import aiohttp
+from azure.core.pipeline.transport import AioHttpTransport
+
+from tools.azure_tools.auth import get_azure_credential
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Connection pool settings for the shared aiohttp session
+CONNECTION_LIMIT = 100
+KEEPALIVE_TIMEOUT = 60
+
+# Shared transport and the event loop its session belongs to
+_shared_transport: Optional[AioHttpTransport] = None
+_shared_transport_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+class AsyncCredential:
+    """
+    Async credential wrapping a synchronous Azure credential
+
+    The aio management clients require an async credential, while
+    get_azure_credential implements this project's authentication chain with
+    the synchronous azure-identity credentials. Token requests are run in a
+    worker thread so they never block the event loop.
+    """
+
+    def __init__(self, credential: Any):
+        self._credential = credential
+
+    async def get_token(self, *scopes: str, **kwargs: Any) -> Any:
+        return await asyncio.to_thread(self._credential.get_token, *scopes, **kwargs)
+
+    async def close(self) -> None:
+        # The wrapped credential is shared and owned by the caller
+        pass
+
+    async def __aenter__(self) -> "AsyncCredential":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+
+@functools.lru_cache(maxsize=4)
+def get_async_credential(tenant_id: Optional[str] = None, use_cli: bool = False) -> AsyncCredential:
+    """
+    Get an async Azure credential for the aio management clients
+    
+    The credential is created once per tenant_id/use_cli combination, so the
+    credential chain is only probed on first use and its token cache is reused.
+
+    Args:
+        tenant_id (str, optional): Azure tenant ID. Defaults to None.
+        use_cli (bool, optional): Force use of Azure CLI for authentication. Defaults to False.
+
+    Returns:
+        AsyncCredential: Async credential
+    """
+    return AsyncCredential(get_azure_credential(tenant_id, use_cli))
+
+
+def get_shared_transport() -> AioHttpTransport:
+    """
+    Get the aiohttp transport shared by the aio management clients
+
+    The session is created lazily on first use and recreated if the running
+    event loop changed. Clients must be created with this transport; the
+    transport does not own the session, so closing a client leaves it open.
+
+    Returns:
+        AioHttpTransport: Shared transport
+    """
+    global _shared_transport, _shared_transport_loop
+
+    loop = asyncio.get_running_loop()
+    if _shared_transport is None or _shared_transport_loop is not loop or _shared_transport.session.closed:
+        logger.debug("Creating shared aiohttp session for Azure clients")
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=CONNECTION_LIMIT, keepalive_timeout=KEEPALIVE_TIMEOUT)
+        )
+        _shared_transport = AioHttpTransport(session=session, session_owner=False)
+        _shared_transport_loop = loop
+
+    return _shared_transport
@@ -7,9 +7,14 @@ import subprocess
 import paramiko
 import os
 import json
-from typing import Dict, Any, Tuple, Optional, List
+import shlex
+from typing import Dict, Any, Generator, Tuple, Optional, List
 from pathlib import Path
 import asyncio
+import select
+import socket
+import threading
+import time
 
 # Configure logging
 logging.basicConfig(
@@ -24,6 +29,18 @@ DEFAULT_SSH_CONFIG = {
     "port": 22
 }
 
+# Command loop run inside persistent <sid>adm shells (see get_sap_shell)
+SAP_ENV_HELPER_PATH = Path(__file__).parent / "sap_env_helper.sh"
+
+# Sentinel prefix printed by the helper after every command
+SAP_SHELL_RC_PREFIX = "__RC="
+
+# Seconds a persistent SAP shell may stay unused before it is closed
+SAP_SHELL_IDLE_TTL = 600
+
+# Default seconds a command in a persistent SAP shell may take before the shell is dropped
+SAP_SHELL_COMMAND_TIMEOUT = 600
+
 def load_system_config() -> Dict[str, Any]:
     """
     Load system configuration from executor_config.json
@@ -353,6 +370,65 @@ async def _execute_local(command: str, use_sudo: bool = False, timeout: int = 60
         logger.error(f"Command execution error: {str(e)}")
         return -1, "", str(e)
 
+def _connect_ssh(host: str, ssh_config: Dict[str, Any], timeout: int = 60) -> paramiko.SSHClient:
+    """
+    Open an SSH connection to a remote host
+    
+    Args:
+        host (str): Target hostname or IP
+        ssh_config (dict): SSH configuration
+        timeout (int): Connection timeout in seconds
+        
+    Returns:
+        paramiko.SSHClient: Connected SSH client
+    """
+    # Get SSH connection details
+    username = ssh_config.get("username", "root")
+    key_file = ssh_config.get("key_file")
+    password = ssh_config.get("password")
+    port = ssh_config.get("port", 22)
+    use_key_auth = ssh_config.get("use_key_auth", True if key_file else False)
+    key_requires_passphrase = ssh_config.get("key_requires_passphrase", False)
+    
+    # Create SSH client
+    client = paramiko.SSHClient()
+    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    
+    # Connect to remote host based on authentication method
+    if use_key_auth and key_file and os.path.exists(key_file):
+        logger.debug(f"Connecting to {host} using key-based authentication")
+        if key_requires_passphrase and password:
+            # Use key with passphrase
+            pkey = paramiko.RSAKey.from_private_key_file(key_file, password=password)
+            client.connect(
+                hostname=host,
+                username=username,
+                pkey=pkey,
+                port=port,
+                timeout=timeout
+            )
+        else:
+            # Use key without passphrase
+            client.connect(
+                hostname=host,
+                username=username,
+                key_filename=key_file,
+                port=port,
+                timeout=timeout
+            )
+    else:
+        # Use password authentication
+        logger.debug(f"Connecting to {host} using password authentication")
+        client.connect(
+            hostname=host,
+            username=username,
+            password=password,
+            port=port,
+            timeout=timeout
+        )
+    
+    return client
+
 async def _execute_remote(host: str, command: str, use_sudo: bool = False, 
                          timeout: int = 60, ssh_config: Dict[str, Any] = None) -> Tuple[int, str, str]:
     """
@@ -370,50 +446,7 @@ async def _execute_remote(host: str, command: str, use_sudo: bool = False,
     """
     client = None
     try:
-        # Get SSH connection details
-        username = ssh_config.get("username", "root")
-        key_file = ssh_config.get("key_file")
-        password = ssh_config.get("password")
-        port = ssh_config.get("port", 22)
-        use_key_auth = ssh_config.get("use_key_auth", True if key_file else False)
-        key_requires_passphrase = ssh_config.get("key_requires_passphrase", False)
-        
-        # Create SSH client
-        client = paramiko.SSHClient()
-        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        
-        # Connect to remote host based on authentication method
-        if use_key_auth and key_file and os.path.exists(key_file):
-            logger.debug(f"Connecting to {host} using key-based authentication")
-            if key_requires_passphrase and password:
-                # Use key with passphrase
-                pkey = paramiko.RSAKey.from_private_key_file(key_file, password=password)
-                client.connect(
-                    hostname=host,
-                    username=username,
-                    pkey=pkey,
-                    port=port,
-                    timeout=timeout
-                )
-            else:
-                # Use key without passphrase
-                client.connect(
-                    hostname=host,
-                    username=username,
-                    key_filename=key_file,
-                    port=port,
-                    timeout=timeout
-                )
-        else:
-            # Use password authentication
-            logger.debug(f"Connecting to {host} using password authentication")
-            client.connect(
-                hostname=host,
-                username=username,
-                password=password,
-                port=port,
-                timeout=timeout
-            )
+        client = _connect_ssh(host, ssh_config, timeout)
             
         # Prepare command with sudo if required
         if use_sudo:
@@ -441,6 +474,263 @@ async def _execute_remote(host: str, command: str, use_sudo: bool = False,
         if client:
             client.close()
 
+class SAPShell:
+    """
+    Persistent shell running as <sid>adm on a host.
+    
+    The login environment of the <sid>adm user is loaded once when the shell
+    is started; afterwards every command is sent as a single line to the
+    sap_env_helper.sh loop, which answers with the command output followed by
+    a sentinel line carrying the return code.
+    """
+    
+    def __init__(self, host: str, sid: str, ssh_config: Optional[Dict[str, Any]] = None, timeout: int = 60):
+        self.host = host
+        self.sid = sid
+        self.user = f"{sid.lower()}adm"
+        self._lock = threading.Lock()
+        self._client = None
+        self._process = None
+        
+        self._channel = None
+        # Output read from the local pipe but not yet returned as a line
+        self._buffer = b""
+        
+        launch_argv = ["su", "-", self.user, "-c", "sh -s"]
+        if host in ['localhost', '127.0.0.1'] or not host:
+            # Unbuffered binary pipes, so select on stdout sees all unread output
+            self._process = subprocess.Popen(
+                launch_argv,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                bufsize=0
+            )
+            self._stdin = self._process.stdin
+            self._stdout = self._process.stdout
+        else:
+            self._client = _connect_ssh(host, ssh_config or DEFAULT_SSH_CONFIG, timeout)
+            stdin, stdout, _ = self._client.exec_command(shlex.join(launch_argv))
+            self._stdin = stdin
+            self._stdout = stdout
+            self._channel = stdout.channel
+        
+        # Bootstrap the command loop; sh -s reads it from the same stream as the commands,
+        # so wait for the loop to announce itself (skipping any login output) before
+        # the first command is sent
+        self.alive = True
+        try:
+            self._write(SAP_ENV_HELPER_PATH.read_text())
+            deadline = time.monotonic() + timeout
+            while True:
+                line = self._readline(deadline)
+                if not line:
+                    raise EOFError(f"SAP shell for {self.user}@{self.host} terminated during startup")
+                if line.startswith(SAP_SHELL_RC_PREFIX):
+                    break
+        except Exception:
+            self.close()
+            raise
+        self.last_used = time.monotonic()
+    
+    def _write(self, data: str) -> None:
+        if self._process:
+            self._stdin.write(data.encode('utf-8'))
+        else:
+            self._stdin.write(data)
+        self._stdin.flush()
+    
+    def _readline(self, deadline: float) -> str:
+        """
+        Read one output line, or return "" at EOF
+        
+        Raises:
+            TimeoutError: If no complete line arrives before deadline (time.monotonic())
+        """
+        if self._process:
+            while b"\n" not in self._buffer:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("Timed out waiting for SAP shell output")
+                ready, _, _ = select.select([self._stdout], [], [], remaining)
+                if not ready:
+                    raise TimeoutError("Timed out waiting for SAP shell output")
+                chunk = os.read(self._stdout.fileno(), 65536)
+                if not chunk:
+                    line, self._buffer = self._buffer, b""
+                    return line.decode('utf-8', errors='replace')
+                self._buffer += chunk
+            line, self._buffer = self._buffer.split(b"\n", 1)
+            return line.decode('utf-8', errors='replace') + "\n"
+        
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("Timed out waiting for SAP shell output")
+        # paramiko raises socket.timeout from reads that wait longer than this
+        self._channel.settimeout(remaining)
+        try:
+            line = self._stdout.readline()
+        except socket.timeout:
+            raise TimeoutError("Timed out waiting for SAP shell output")
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        return line
+    
+    def stream(self, command: str, timeout: float = SAP_SHELL_COMMAND_TIMEOUT) -> Generator[str, None, int]:
+        """
+        Run a single-line command in the persistent shell, yielding output lines as they arrive
+        
+        The generator's return value (StopIteration.value) is the return code.
+        Abandoning the generator before it is exhausted closes the shell, since
+        the unread output would otherwise be taken for the next command's. A
+        shell that times out or terminates is closed and dropped from the shell
+        cache, so the next get_sap_shell starts a new one.
+        
+        Args:
+            command (str): Command to execute (stderr is merged into stdout)
+            timeout (float): Seconds the command may take, including waiting for
+                a command already running in this shell
+            
+        Yields:
+            str: Output lines, including their line endings
+            
+        Raises:
+            TimeoutError: If the shell is busy or the command does not finish in time
+            EOFError: If the shell terminated
+        """
+        if "\n" in command:
+            raise ValueError("SAPShell commands must be a single line")
+        
+        deadline = time.monotonic() + timeout
+        if not self._lock.acquire(timeout=timeout):
+            raise TimeoutError(f"SAP shell for {self.user}@{self.host} is busy")
+        try:
+            if not self.alive:
+                raise RuntimeError(f"SAP shell for {self.user}@{self.host} is closed")
+            
+            finished = False
+            self.last_used = time.monotonic()
+            try:
+                self._write(command + "\n")
+                while True:
+                    line = self._readline(deadline)
+                    if not line:
+                        raise EOFError("SAP shell terminated unexpectedly")
+                    if line.startswith(SAP_SHELL_RC_PREFIX):
+                        finished = True
+                        return int(line[len(SAP_SHELL_RC_PREFIX):].strip())
+                    yield line
+            finally:
+                if not finished:
+                    self.close()
+                    _discard_sap_shell(self)
+        finally:
+            self._lock.release()
+    
+    def run(self, command: str, timeout: float = SAP_SHELL_COMMAND_TIMEOUT) -> Tuple[int, str, str]:
+        """
+        Run a single-line command in the persistent shell
+        
+        Args:
+            command (str): Command to execute (stderr is merged into stdout)
+            timeout (float): Seconds the command may take
+            
+        Returns:
+            tuple: (return_code, stdout, stderr)
+            
+        Raises:
+            TimeoutError: If the shell is busy or the command does not finish in time
+            EOFError: If the shell terminated
+        """
+        output = []
+        lines = self.stream(command, timeout)
+        while True:
+            try:
+                output.append(next(lines))
+            except StopIteration as stop:
+                return_code = stop.value
+                break
+        
+        stdout = "".join(output)
+        return return_code, stdout, stdout if return_code != 0 else ""
+    
+    def close(self) -> None:
+        """Terminate the shell and its SSH connection"""
+        self.alive = False
+        try:
+            if self._process:
+                self._process.kill()
+                self._process.wait()
+            if self._client:
+                self._client.close()
+        except Exception as e:
+            logger.debug(f"Error closing SAP shell for {self.user}@{self.host}: {e}")
+
+# Persistent SAP shells keyed by (host, sid)
+_sap_shells: Dict[Tuple[str, str], SAPShell] = {}
+_sap_shells_lock = threading.Lock()
+
+# One lock per (host, sid) held while its shell is started, so the slow SSH and
+# su login do not block getting or starting the shells of other keys
+_sap_shell_start_locks: Dict[Tuple[str, str], threading.Lock] = {}
+
+def _discard_sap_shell(shell: SAPShell) -> None:
+    """Drop a broken shell from the cache, unless it was already replaced"""
+    key = (shell.host or "localhost", shell.sid.lower())
+    with _sap_shells_lock:
+        if _sap_shells.get(key) is shell:
+            del _sap_shells[key]
+
+def _close_idle_shells(exclude: Tuple[str, str]) -> None:
+    """Close cached SAP shells unused for longer than SAP_SHELL_IDLE_TTL (caller holds _sap_shells_lock)"""
+    now = time.monotonic()
+    for key, shell in list(_sap_shells.items()):
+        if key == exclude or now - shell.last_used <= SAP_SHELL_IDLE_TTL:
+            continue
+        # Skip shells that are running a command right now
+        if shell._lock.acquire(blocking=False):
+            try:
+                logger.info(f"Closing idle SAP shell for {shell.user} on {key[0]}")
+                shell.close()
+            finally:
+                shell._lock.release()
+            del _sap_shells[key]
+
+def get_sap_shell(host: str, sid: str, ssh_config: Optional[Dict[str, Any]] = None) -> SAPShell:
+    """
+    Get a cached persistent shell running as <sid>adm on the given host
+    
+    Args:
+        host (str): Target hostname or IP
+        sid (str): SAP System ID
+        ssh_config (dict): SSH configuration, defaults to the global executor config
+        
+    Returns:
+        SAPShell: Persistent shell for the <sid>adm user
+    """
+    key = (host or "localhost", sid.lower())
+    with _sap_shells_lock:
+        _close_idle_shells(exclude=key)
+        shell = _sap_shells.get(key)
+        if shell is not None and shell.alive:
+            return shell
+        start_lock = _sap_shell_start_locks.setdefault(key, threading.Lock())
+    
+    with start_lock:
+        # Another caller may have started the shell while this one waited
+        with _sap_shells_lock:
+            shell = _sap_shells.get(key)
+            if shell is not None and shell.alive:
+                return shell
+        
+        if ssh_config is None:
+            ssh_config = load_system_config().get("ssh", DEFAULT_SSH_CONFIG)
+        logger.info(f"Starting persistent SAP shell for {sid.lower()}adm on {key[0]}")
+        shell = SAPShell(host, sid, ssh_config)
+        with _sap_shells_lock:
+            _sap_shells[key] = shell
+        return shell
+
 # Example usage
 async def main():
     # Example: List all systems
@@ -5,15 +5,18 @@ HDB Userstore Management Tool - Set, list and manage HANA database user credenti
 import logging
 import json
 import re
+import shlex
 from datetime import datetime
 from pathlib import Path
 import sys
+import time
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
 
 from core.command_executor import CommandExecutor
 from auth.authentication import Authentication
+from tools.command_executor import get_sap_shell
 
 # Configure logging
 logging.basicConfig(
@@ -22,13 +25,30 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Bound once; used to timestamp every result
+_now = datetime.now
+
+# Seconds a parsed LIST result is reused before hdbuserstore is called again
+DEFAULT_LIST_CACHE_TTL = 30
+
+# Permission required for each hdbuserstore action
+_ACTION_PERMISSIONS = {
+    'set': 'HANA_ADMIN',
+    'list': 'HANA_VIEW',
+    'delete': 'HANA_ADMIN'
+}
+_VALID_ACTIONS = frozenset(_ACTION_PERMISSIONS)
+
 class HDBUserstoreTool:
     """Tool for managing HDB user store entries"""
     
-    def __init__(self):
+    def __init__(self, list_cache_ttl=DEFAULT_LIST_CACHE_TTL):
         """Initialize the HDB userstore tool"""
         self.executor = CommandExecutor()
         self.auth = Authentication()
+        # Parsed LIST results keyed by (host, sid, key) -> (monotonic timestamp, entries)
+        self._list_cache = {}
+        self._list_ttl = list_cache_ttl
     
     def manage_hdbuserstore(self, host, action, sid=None, key=None, username=None, password=None, 
                            database=None, auth_context=None):
@@ -49,21 +69,15 @@ class HDBUserstoreTool:
             dict: Operation result
         """
         # Validate action
-        if action.lower() not in ['set', 'list', 'delete']:
+        action = action.lower()
+        if action not in _VALID_ACTIONS:
             return {
                 "status": "error",
                 "message": f"Invalid action '{action}'. Use 'set', 'list', or 'delete'"
             }
-            
-        # Map actions to required permissions
-        action_permissions = {
-            'set': 'HANA_ADMIN',
-            'list': 'HANA_VIEW',
-            'delete': 'HANA_ADMIN'
-        }
         
         # Verify permissions if auth_context provided
-        required_permission = action_permissions.get(action.lower())
+        required_permission = _ACTION_PERMISSIONS[action]
         if auth_context and not self.auth.has_permission(auth_context, required_permission):
             return {
                 "status": "error",
@@ -71,19 +85,25 @@ class HDBUserstoreTool:
             }
         
         # Validate parameters based on action
-        if action.lower() == 'set':
+        if action == 'set':
             if not all([sid, key, username, database]):
                 return {
                     "status": "error",
                     "message": "Missing required parameters for SET action. Need sid, key, username, and database"
                 }
-        elif action.lower() == 'delete':
+            # hdbuserstore -i would otherwise store an empty password
+            if not password:
+                return {
+                    "status": "error",
+                    "message": "Missing required parameter for SET action. Need password"
+                }
+        elif action == 'delete':
             if not all([sid, key]):
                 return {
                     "status": "error",
                     "message": "Missing required parameters for DELETE action. Need sid and key"
                 }
-        elif action.lower() == 'list':
+        elif action == 'list':
             # For list, we need at least SID (can optionally have key for a specific entry)
             if not sid:
                 return {
@@ -94,26 +114,65 @@ class HDBUserstoreTool:
         # Prepare environment and build command
         sid_lower = sid.lower() if sid else None
         
-        if action.lower() == 'set':
-            # Note: In a production environment, never include passwords in command line
-            # This is a significant security risk - use a more secure method
-            hdbuserstore_cmd = f"hdbuserstore SET {key} {database} {username} {password}"
-        elif action.lower() == 'list':
-            hdbuserstore_cmd = f"hdbuserstore LIST"
-            if key:
-                hdbuserstore_cmd += f" {key}"
-        elif action.lower() == 'delete':
-            hdbuserstore_cmd = f"hdbuserstore DELETE {key}"
+        # Serve repeated LIST calls from the cache
+        if action == 'list':
+            cache_key = (host, sid_lower, key)
+            cached = self._list_cache.get(cache_key)
+            if cached and time.monotonic() - cached[0] < self._list_ttl:
+                logger.debug(f"hdbuserstore LIST cache hit for {cache_key}")
+                return {
+                    "status": "success",
+                    "action": "list",
+                    "entries": cached[1],
+                    "timestamp": _now().isoformat()
+                }
         
-        # Execute as <sid>adm user
-        command = f"su - {sid_lower}adm -c '{hdbuserstore_cmd}'"
+        password_input = ""
+        if action == 'set':
+            # hdbuserstore -i prompts for the password; it is fed through stdin by the shell
+            # builtin printf so it never shows up in the argv of any process
+            hdbuserstore_cmd = f"hdbuserstore -i SET {shlex.quote(key)} {shlex.quote(database)} {shlex.quote(username)}"
+            quoted_password = shlex.quote(password)
+            password_input = f"printf '%s\\n%s\\n' {quoted_password} {quoted_password} | "
+        elif action == 'list':
+            hdbuserstore_cmd = "hdbuserstore LIST"
+            if key:
+                hdbuserstore_cmd += f" {shlex.quote(key)}"
+        elif action == 'delete':
+            hdbuserstore_cmd = f"hdbuserstore DELETE {shlex.quote(key)}"
         
-        # Log the action (without password)
-        safe_command = command.replace(password or "", "********") if password else command
-        logger.info(f"Executing hdbuserstore command on {host}: {safe_command}")
+        # Log the action (the password is never part of the logged values)
+        if action == 'set':
+            logger.info("hdbuserstore SET host=%s key=%s user=%s db=%s", host, key, username, database)
+        else:
+            logger.info("hdbuserstore %s host=%s sid=%s key=%s", action.upper(), host, sid_lower, key)
         
-        # Execute the command
-        return_code, stdout, stderr = self.executor.execute_command(host, command, auth_context)
+        # Execute the command, preferring the persistent <sid>adm shell over a fresh su login.
+        # su is only used if the shell cannot be started; a command already handed to the
+        # shell is not run a second time.
+        try:
+            shell = get_sap_shell(host, sid_lower)
+        except Exception as e:
+            if action == 'set':
+                # A su -c fallback would put the password into the su command line
+                logger.error(f"Persistent SAP shell unavailable on {host}, not sending password via su: {e}")
+                return {
+                    "status": "error",
+                    "message": (f"Failed to set hdbuserstore: SET needs the persistent SAP shell to pass "
+                                f"the password securely, and it is unavailable on {host}: {e}")
+                }
+            logger.warning(f"Persistent SAP shell unavailable on {host}, falling back to su: {e}")
+            command_argv = ["su", "-", f"{sid_lower}adm", "-c", hdbuserstore_cmd]
+            return_code, stdout, stderr = self.executor.execute_command(host, shlex.join(command_argv), auth_context)
+        else:
+            try:
+                return_code, stdout, stderr = shell.run(password_input + hdbuserstore_cmd)
+            except Exception as e:
+                logger.error(f"hdbuserstore {action} failed in the SAP shell on {host}: {e}")
+                return {
+                    "status": "error",
+                    "message": f"Failed to {action} hdbuserstore: {e}"
+                }
         
         # Check for errors
         if return_code != 0:
@@ -124,30 +183,39 @@ class HDBUserstoreTool:
             }
         
         # Process output based on action
-        if action.lower() == 'list':
+        if action == 'list':
             parsed_entries = self._parse_hdbuserstore_list(stdout)
+            self._list_cache[(host, sid_lower, key)] = (time.monotonic(), parsed_entries)
             result = {
                 "status": "success",
-                "action": action.lower(),
+                "action": action,
                 "entries": parsed_entries,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": _now().isoformat()
             }
         else:
+            # SET/DELETE change the store, drop cached LIST results for this host and SID
+            self._invalidate_list_cache(host, sid_lower)
+            
             result = {
                 "status": "success",
-                "action": action.lower(),
+                "action": action,
                 "message": f"hdbuserstore {action} completed successfully",
-                "timestamp": datetime.now().isoformat()
+                "timestamp": _now().isoformat()
             }
             
             # Add additional info for SET
-            if action.lower() == 'set':
+            if action == 'set':
                 result["key"] = key
                 result["database"] = database
                 result["username"] = username
         
         return result
     
+    def _invalidate_list_cache(self, host, sid_lower):
+        """Remove cached LIST results for a host and SID"""
+        for cache_key in [k for k in self._list_cache if k[0] == host and k[1] == sid_lower]:
+            del self._list_cache[cache_key]
+    
     def _parse_hdbuserstore_list(self, output):
         """Parse hdbuserstore list output"""
         entries = []
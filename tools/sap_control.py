@@ -4,16 +4,20 @@ SAP System Control Tool (Start/Stop)
 """
 import logging
 import json
+import re
+import shlex
 from datetime import datetime
 from pathlib import Path
 import sys
 import time
+from operator import itemgetter
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
 
 from core.command_executor import CommandExecutor
 from auth.authentication import Authentication
+from tools.command_executor import get_sap_shell, SAP_SHELL_COMMAND_TIMEOUT
 from tools.sap_status import SAPStatusTool
 
 # Configure logging
@@ -23,6 +27,24 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Bound once; used to timestamp every result
+_now = datetime.now
+
+# Supported control actions
+_VALID_SAP_ACTIONS = frozenset({'start', 'stop', 'restart'})
+
+# Failed status checks after which waiting is abandoned
+MAX_STATUS_ERRORS = 3
+
+# sapcontrol exit code for WaitforStarted/WaitforStopped running into its timeout
+SAPCONTROL_RC_WAIT_TIMEOUT = 2
+
+# Seconds a waiting control command may run in the SAP shell beyond its sapcontrol wait timeout
+SHELL_TIMEOUT_MARGIN = 120
+
+# Matches the result line sapcontrol prints after each web method call ("OK" or "FAIL: ...")
+_SAPCONTROL_RESULT_RE = re.compile(r'^(OK|FAIL:?.*)$', re.MULTILINE)
+
 class SAPControlTool:
     """Tool for starting and stopping SAP systems"""
     
@@ -49,14 +71,13 @@ class SAPControlTool:
             dict: Operation result
         """
         # Validate action
-        if action.lower() not in ['start', 'stop', 'restart']:
+        action = action.lower()
+        if action not in _VALID_SAP_ACTIONS:
             return {
                 "status": "error",
                 "message": "Invalid action. Use 'start', 'stop', or 'restart'"
             }
         
-        action = action.lower()
-        
         # Verify permissions based on action
         permission = f"SAP_{action.upper()}"
         if auth_context and not self.auth.has_permission(auth_context, permission):
@@ -65,6 +86,15 @@ class SAPControlTool:
                 "message": f"Insufficient permissions to {action} SAP system"
             }
         
+        # The timeout is interpolated into the sapcontrol command, so it must be a number
+        try:
+            timeout = int(timeout)
+        except (TypeError, ValueError):
+            return {
+                "status": "error",
+                "message": f"Invalid timeout: {timeout}. Must be a number of seconds"
+            }
+        
         # Log the action
         logger.info(f"{action.capitalize()}ing SAP system {sid} on {host}")
         
@@ -72,28 +102,20 @@ class SAPControlTool:
         sid_upper = sid.upper()
         sid_lower = sid.lower()
         
-        # Determine sapcontrol function based on action
-        if action == 'restart':
-            sapcontrol_function = "RestartSystem"
-        else:
-            # First letter uppercase for sapcontrol functions
-            sapcontrol_function = f"{action.capitalize()}System"
-        
-        # Build sapcontrol command
-        sapcontrol_cmd = f"sapcontrol -nr {instance_number} -function {sapcontrol_function}"
+        # Build the control script; when waiting, sapcontrol's own WaitforStarted/WaitforStopped
+        # and a final GetSystemInstanceList run in the same su invocation instead of Python polling
+        sapcontrol_cmd = self._build_system_control_script(instance_number, action, wait, timeout)
         
-        # Wrap with <sid>adm user
-        command = f"su - {sid_lower}adm -c '{sapcontrol_cmd}'"
-        
-        # Execute the command
-        return_code, stdout, stderr = self.executor.execute_command(host, command, auth_context)
+        # Execute the command as <sid>adm user
+        shell_timeout = timeout + SHELL_TIMEOUT_MARGIN if wait else SAP_SHELL_COMMAND_TIMEOUT
+        return_code, stdout, stderr = self._run_as_sidadm(host, sid_lower, sapcontrol_cmd, auth_context, shell_timeout)
         
         # Check for errors
-        if return_code != 0:
+        if return_code != 0 and not (wait and return_code == SAPCONTROL_RC_WAIT_TIMEOUT):
             logger.error(f"SAP {action} failed: {stderr}")
             return {
                 "status": "error",
-                "message": f"Failed to {action} SAP system: {stderr}"
+                "message": f"Failed to {action} SAP system: {stderr or self._last_sapcontrol_result(stdout)}"
             }
         
         # Wait for system to reach desired state if requested
@@ -103,56 +125,241 @@ class SAPControlTool:
             "system_id": sid_upper,
             "instance": instance_number,
             "host": host,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": _now().isoformat()
         }
         
         if wait:
-            expected_status = "GREEN" if action == "start" else "GRAY"
-            wait_result = self._wait_for_status(sid, instance_number, host, expected_status, auth_context, timeout)
-            result.update(wait_result)
+            expected_status = "GREEN" if action != "stop" else "GRAY"
+            instances = self.status_tool.parse_instance_list(stdout)
+            last_result = self._last_sapcontrol_result(stdout)
+            
+            if return_code == SAPCONTROL_RC_WAIT_TIMEOUT:
+                result.update({
+                    "wait_status": "timeout",
+                    "wait_message": f"Timeout waiting for SAP system to reach {expected_status} status",
+                    "current_status": {"status": "success", "system_id": sid_upper, "instances": instances}
+                })
+            elif last_result is None:
+                # Output could not be interpreted (e.g. older sapcontrol), fall back to polling
+                result.update(self._wait_for_status(sid, instance_number, host, expected_status, auth_context, timeout))
+            else:
+                result.update({
+                    "wait_status": "success",
+                    "wait_message": f"SAP system reached {expected_status} status",
+                    "instances": instances
+                })
         
         return result
     
+    def manage_sap_instances(self, sid, instance_numbers, host, action, auth_context=None, wait=True, timeout=300):
+        """
+        Start, stop or restart several SAP instances on one host with a single su invocation
+        
+        Parameters:
+            sid (str): SAP System ID
+            instance_numbers (list): Instance numbers on the host
+            host (str): Host where the instances are running
+            action (str): Action to perform: 'start', 'stop', or 'restart'
+            auth_context (dict): Authentication context
+            wait (bool): Whether to wait for action completion
+            timeout (int): Maximum time to wait per instance in seconds
+            
+        Returns:
+            dict: Operation result
+        """
+        action = action.lower()
+        if action not in _VALID_SAP_ACTIONS:
+            return {
+                "status": "error",
+                "message": "Invalid action. Use 'start', 'stop', or 'restart'"
+            }
+        
+        permission = f"SAP_{action.upper()}"
+        if auth_context and not self.auth.has_permission(auth_context, permission):
+            return {
+                "status": "error",
+                "message": f"Insufficient permissions to {action} SAP instances"
+            }
+        
+        # The timeout is interpolated into the sapcontrol commands, so it must be a number
+        try:
+            timeout = int(timeout)
+        except (TypeError, ValueError):
+            return {
+                "status": "error",
+                "message": f"Invalid timeout: {timeout}. Must be a number of seconds"
+            }
+        
+        logger.info(f"{action.capitalize()}ing SAP instances {instance_numbers} of {sid} on {host}")
+        
+        # One script per instance, separated by ';' so every instance is attempted;
+        # each script echoes a marker with its own exit code
+        scripts = []
+        for instance_number in instance_numbers:
+            script = self._build_instance_control_script(instance_number, action, wait, timeout)
+            scripts.append(f"{script}; echo __NR={instance_number}:RC=$?")
+        
+        # The instances are handled one after the other, each waiting up to timeout
+        if wait:
+            shell_timeout = timeout * len(instance_numbers) + SHELL_TIMEOUT_MARGIN
+        else:
+            shell_timeout = SAP_SHELL_COMMAND_TIMEOUT
+        return_code, stdout, stderr = self._run_as_sidadm(
+            host, sid.lower(), '; '.join(scripts), auth_context, shell_timeout
+        )
+        
+        instance_results = {}
+        for nr, rc in re.findall(r'^__NR=(\w+):RC=(\d+)$', stdout, re.MULTILINE):
+            rc = int(rc)
+            if rc == 0:
+                instance_results[nr] = "success"
+            elif rc == SAPCONTROL_RC_WAIT_TIMEOUT and wait:
+                instance_results[nr] = "timeout"
+            else:
+                instance_results[nr] = "error"
+        
+        if not instance_results:
+            logger.error(f"SAP instance {action} failed: {stderr}")
+            return {
+                "status": "error",
+                "message": f"Failed to {action} SAP instances: {stderr}"
+            }
+        
+        return {
+            "status": "success" if all(r == "success" for r in instance_results.values()) else "error",
+            "system_id": sid.upper(),
+            "host": host,
+            "instances": instance_results,
+            "timestamp": _now().isoformat()
+        }
+    
+    def _run_as_sidadm(self, host, sid_lower, sapcontrol_cmd, auth_context, shell_timeout=SAP_SHELL_COMMAND_TIMEOUT):
+        """
+        Run a command as <sid>adm, preferring the persistent SAP shell over a fresh su login
+        
+        shell_timeout bounds the command in the persistent shell; it must exceed any
+        sapcontrol wait in the command. su is only used if the shell cannot be
+        started: once the command was handed to the shell, a timeout or shell
+        failure is reported as an error, since the control actions must not run twice.
+        """
+        try:
+            shell = get_sap_shell(host, sid_lower)
+        except Exception as e:
+            logger.warning(f"Persistent SAP shell unavailable on {host}, falling back to su: {e}")
+            command_argv = ["su", "-", f"{sid_lower}adm", "-c", sapcontrol_cmd]
+            return self.executor.execute_command(host, shlex.join(command_argv), auth_context)
+        
+        try:
+            return shell.run(sapcontrol_cmd, shell_timeout)
+        except TimeoutError as e:
+            logger.error(f"SAP shell command timed out on {host}: {e}")
+            return -1, "", f"{e}; the action may still be running on {host}"
+        except Exception as e:
+            logger.error(f"SAP shell command failed on {host}: {e}")
+            return -1, "", str(e)
+    
+    @staticmethod
+    def _build_system_control_script(instance_number, action, wait, timeout):
+        """Build the sapcontrol command chain for a system-wide action"""
+        sapcontrol = f"sapcontrol -nr {shlex.quote(str(instance_number))} -function"
+        
+        if not wait:
+            if action == 'restart':
+                return f"{sapcontrol} RestartSystem"
+            # First letter uppercase for sapcontrol functions
+            return f"{sapcontrol} {action.capitalize()}System"
+        
+        if action == 'start':
+            steps = f"{sapcontrol} StartSystem && {sapcontrol} WaitforStarted {timeout} 10"
+        elif action == 'stop':
+            steps = f"{sapcontrol} StopSystem && {sapcontrol} WaitforStopped {timeout} 10"
+        else:
+            # Wait for the stop before starting so WaitforStarted cannot see the old GREEN state
+            half = max(timeout // 2, 1)
+            steps = (f"{sapcontrol} StopSystem && {sapcontrol} WaitforStopped {half} 10 && "
+                     f"{sapcontrol} StartSystem && {sapcontrol} WaitforStarted {half} 10")
+        
+        # Keep the exit code of the action chain, but always report the final instance list,
+        # in script format like sap_status reads it
+        instance_list = f"sapcontrol -nr {shlex.quote(str(instance_number))} -format script -function GetSystemInstanceList"
+        return f"{steps}; rc=$?; {instance_list}; (exit $rc)"
+    
+    @staticmethod
+    def _build_instance_control_script(instance_number, action, wait, timeout):
+        """Build the sapcontrol command chain for a single instance"""
+        sapcontrol = f"sapcontrol -nr {shlex.quote(str(instance_number))} -function"
+        
+        if action == 'restart':
+            if not wait:
+                return f"{sapcontrol} RestartInstance"
+            half = max(timeout // 2, 1)
+            return (f"{sapcontrol} Stop && {sapcontrol} WaitforStopped {half} 10 && "
+                    f"{sapcontrol} Start && {sapcontrol} WaitforStarted {half} 10")
+        
+        if action == 'start':
+            function, wait_function = "Start", "WaitforStarted"
+        else:
+            function, wait_function = "Stop", "WaitforStopped"
+        
+        if not wait:
+            return f"{sapcontrol} {function}"
+        return f"{sapcontrol} {function} && {sapcontrol} {wait_function} {timeout} 10"
+    
+    @staticmethod
+    def _last_sapcontrol_result(stdout):
+        """Return the last OK/FAIL result line printed by sapcontrol, if any"""
+        results = _SAPCONTROL_RESULT_RE.findall(stdout or "")
+        return results[-1] if results else None
+    
     def _wait_for_status(self, sid, instance_number, host, expected_status, auth_context, timeout):
         """Wait for SAP system to reach expected status"""
         logger.info(f"Waiting for SAP system {sid} to reach {expected_status} status")
         
         start_time = time.time()
         interval = 10  # Check every 10 seconds
+        error_count = 0
+        status_result = None
+        expected_status = sys.intern(expected_status)
+        get_dispstatus = itemgetter("dispstatus")
         
-        while (time.time() - start_time) < timeout:
+        while True:
+            if time.time() - start_time >= timeout:
+                break
+            
             # Get current status
             status_result = self.status_tool.check_sap_status(sid, instance_number, host, auth_context)
             
             if status_result.get("status") == "error":
+                error_count += 1
                 logger.warning(f"Failed to check status while waiting: {status_result.get('message')}")
-                time.sleep(interval)
-                continue
-            
-            # Check if all instances have reached the expected status
-            instances = status_result.get("instances", [])
-            all_expected = True
-            
-            for instance in instances:
-                if instance.get("dispstatus") != expected_status:
-                    all_expected = False
-                    break
-            
-            if all_expected:
-                return {
-                    "wait_status": "success",
-                    "wait_message": f"SAP system reached {expected_status} status",
-                    "instances": instances
-                }
+                if error_count > MAX_STATUS_ERRORS:
+                    return {
+                        "wait_status": "error",
+                        "wait_message": f"Giving up after {error_count} failed status checks",
+                        "current_status": status_result
+                    }
+            else:
+                # Check if all instances have reached the expected status
+                instances = status_result.get("instances", [])
+                
+                if not any(get_dispstatus(instance) != expected_status for instance in instances):
+                    return {
+                        "wait_status": "success",
+                        "wait_message": f"SAP system reached {expected_status} status",
+                        "instances": instances
+                    }
             
-            # Sleep before next check
-            time.sleep(interval)
+            # Sleep before next check, but never past the deadline
+            remaining = timeout - (time.time() - start_time)
+            if remaining <= 0:
+                break
+            time.sleep(min(interval, remaining))
         
-        # Timeout occurred
+        # Timeout occurred, report the last status that was read
         return {
             "wait_status": "timeout",
             "wait_message": f"Timeout waiting for SAP system to reach {expected_status} status",
-            "current_status": self.status_tool.check_sap_status(sid, instance_number, host, auth_context)
+            "current_status": status_result or self.status_tool.check_sap_status(sid, instance_number, host, auth_context)
         }
 
 
@@ -0,0 +1,21 @@
+#!/bin/sh
+#
+# Persistent command loop for a <sid>adm login environment.
+#
+# Started once per host/SID by tools.command_executor.get_sap_shell via
+# "su - <sid>adm -c 'sh -s'", so the login profile is only loaded once.
+# Each line read from stdin is executed and followed by a "__RC=<code>"
+# sentinel line that tells the caller where the command output ends. One
+# sentinel is printed before the loop starts; the caller waits for it before
+# sending commands, so sh cannot read them as part of this script.
+
+if [ -f "$HOME/.sapenv.sh" ]; then
+    . "$HOME/.sapenv.sh" >/dev/null 2>&1
+fi
+
+echo "__RC=0"
+
+while IFS= read -r cmd; do
+    eval "$cmd" 2>&1 </dev/null
+    echo "__RC=$?"
+done
@@ -4,32 +4,547 @@ SAP Inventory Summary Module
 
 This module provides functions to get an overview of SAP systems deployed in Azure.
 """
+import asyncio
+import functools
+import json
 import logging
-from typing import Dict, Any, List, Optional, Union
+import re
+import threading
+from urllib.parse import quote
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple, Union
 from azure.mgmt.compute import ComputeManagementClient
 from azure.mgmt.resource import ResourceManagementClient
+from azure.mgmt.resourcegraph import ResourceGraphClient
+from azure.mgmt.resourcegraph.models import QueryRequest, QueryOptions, ResultFormat
 from azure.core.exceptions import ResourceNotFoundError, HttpResponseError
+from azure.core.rest import HttpRequest
 
 from tools.azure_tools.auth import (
     get_azure_credential,
     get_subscription_id,
     get_resource_group
 )
+from tools.sap_inventory.vm_checks import PREMIUM_SKUS
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 # SAP tags to look for
-SAP_TAGS = [
+SAP_TAGS = frozenset([
     "SAP", "SID", "SAPSID", "SAP-SID", "SAPSystemId", 
     "SAPSystem", "SAP System", "ApplicationRole"
-]
+])
+_SAP_TAGS_LOWER = frozenset(tag.lower() for tag in SAP_TAGS)
+
+# Three-character SID between dashes in a VM name, e.g. hanadb-s4h-vm1
+_SID_RE = re.compile(r'(?:^|-)([A-Za-z0-9]{3})(?=-|$)')
+
+# Component types reported in the summary
+COMPONENT_TYPES = ("database", "application", "central_services", "web_dispatcher")
+
+# Tokens identifying each SAP component type
+DB_TOKENS = frozenset({"db", "database", "hana", "sql"})
+CS_TOKENS = frozenset({"ascs", "scs", "ers", "central"})
+APP_TOKENS = frozenset({"app", "application", "pas", "aas"})
+WEB_TOKENS = frozenset({"web", "webdisp", "wd"})
+
+# Component types in classification priority order
+_COMPONENT_TOKENS = (
+    ("database", DB_TOKENS),
+    ("central_services", CS_TOKENS),
+    ("application", APP_TOKENS),
+    ("web_dispatcher", WEB_TOKENS)
+)
+
+# Single pattern matching any component token in tag keys and values; the named
+# group tells the type. Tokens are matched anywhere, also inside compound words
+# such as "DBServer" or "hanadb01", as the tag checks always did.
+_COMPONENT_RE = re.compile(
+    "|".join(
+        f"(?P<{component_type}>{'|'.join(sorted(tokens, key=len, reverse=True))})"
+        for component_type, tokens in _COMPONENT_TOKENS
+    ),
+    re.IGNORECASE
+)
+
+# Pattern for the VM name fallback, which also marks the VM as an SAP VM. It keeps
+# to the tokens the name check used; the short ones must stand alone so names
+# such as "webserver01" or "fwd-proxy" are not taken for SAP components.
+_COMPONENT_NAME_RE = re.compile(
+    r"(?P<database>hana|db|sql)"
+    r"|(?P<central_services>ascs|scs|(?<![a-z])ers(?![a-z]))"
+    r"|(?P<application>app|(?<![a-z])(?:pas|aas)(?![a-z]))"
+    r"|(?P<web_dispatcher>webdisp|(?<![a-z])(?:web|wd)(?![a-z]))",
+    re.IGNORECASE
+)
+
+# Azure credential shared by all cached clients, created on first use
+_CREDENTIAL = None
+_CREDENTIAL_LOCK = threading.Lock()
+
+# Compute API version and VM properties requested when listing VMs directly
+VM_LIST_API_VERSION = "2023-07-01"
+VM_LIST_SELECT = "name,tags,hardwareProfile,availabilitySet,storageProfile"
+
+# Maximum number of resource groups queried at the same time
+MAX_CONCURRENT_RESOURCE_GROUPS = 16
+
+# Worker threads for the per-resource-group compute API fallback
+_RESOURCE_GROUP_EXECUTOR = ThreadPoolExecutor(
+    max_workers=MAX_CONCURRENT_RESOURCE_GROUPS,
+    thread_name_prefix="sap-inventory"
+)
+
+# Resource Graph query returning every resource the summary needs in one pass
+INVENTORY_RESOURCE_GRAPH_QUERY = """Resources
+| where type in~ ('microsoft.compute/virtualmachines', 'microsoft.compute/disks', 'microsoft.compute/availabilitysets')
+| project id, name, type, resourceGroup, tags, sku, properties"""
+
+class Component(NamedTuple):
+    """SAP component identified on a VM"""
+    vm_name: str
+    component_type: str
+    vm_size: str
+    os_type: Optional[str]
+    in_availability_set: bool
+    has_premium_storage: bool
+    compliance_status: str
+
+def _classify_component(text: str, pattern: re.Pattern = _COMPONENT_RE) -> str:
+    """Return the SAP component type indicated by text, or unknown"""
+    found = {match.lastgroup for match in pattern.finditer(text)}
+    for component_type, _ in _COMPONENT_TOKENS:
+        if component_type in found:
+            return component_type
+    return "unknown"
+
+def _new_partial(include_component_names: bool = False) -> Dict[str, Any]:
+    """
+    Create an empty (partial) summary
+    
+    Per-resource-group results and the overall summary share this schema so
+    workers can build their results independently and the caller can fold
+    them together with _merge.
+    
+    Args:
+        include_component_names (bool): Also collect VM names per component type
+        
+    Returns:
+        Dict[str, Any]: Empty summary
+    """
+    return {
+        "sap_systems": [],
+        "total_components": 0,
+        "vm_count": 0,
+        "disk_count": 0,
+        "availability_set_count": 0,
+        "component_counts": Counter(),
+        "identified_components": defaultdict(list) if include_component_names else None,
+        # Add workbook-aligned metrics
+        "vm_series_distribution": Counter(),
+        "disk_types_distribution": Counter(),
+        "compliance_status": {
+            "compliant": 0,
+            "non_compliant": 0,
+            "unknown": 0
+        }
+    }
+
+def _merge(dst: Dict[str, Any], src: Dict[str, Any]) -> None:
+    """Fold the partial summary src into dst"""
+    dst["sap_systems"].extend(src["sap_systems"])
+    for key in ("total_components", "vm_count", "disk_count", "availability_set_count"):
+        dst[key] += src[key]
+    
+    dst["component_counts"].update(src["component_counts"])
+    if dst["identified_components"] is not None and src["identified_components"]:
+        for component, vm_names in src["identified_components"].items():
+            dst["identified_components"][component].extend(vm_names)
+    
+    dst["vm_series_distribution"].update(src["vm_series_distribution"])
+    dst["disk_types_distribution"].update(src["disk_types_distribution"])
+    
+    for state, count in src["compliance_status"].items():
+        dst["compliance_status"][state] += count
+
+def _summarize_resource_group(
+    rg_name: str,
+    vms: List[Dict[str, Any]],
+    disk_types: Counter,
+    availability_set_count: int,
+    include_component_names: bool = False
+) -> Dict[str, Any]:
+    """
+    Identify SAP components and collect counts for a single resource group
+    
+    VMs are passed in the ARM REST representation (``name``, ``tags`` and a
+    ``properties`` object), as returned by Azure Resource Graph or by the
+    compute REST API, so both listing paths share this logic.
+    
+    Args:
+        rg_name (str): Resource group name
+        vms (List[Dict[str, Any]]): Virtual machines in the resource group
+        disk_types (Counter): Number of managed disks per SKU name
+        availability_set_count (int): Number of availability sets
+        include_component_names (bool): Also collect VM names per component type
+        
+    Returns:
+        Dict[str, Any]: Per-resource-group counts and the SAP system, if any
+    """
+    partial = _new_partial(include_component_names)
+    partial["vm_count"] = len(vms)
+    partial["disk_count"] = sum(disk_types.values())
+    partial["availability_set_count"] = availability_set_count
+    partial["disk_types_distribution"] = disk_types
+    
+    # Track current SAP system
+    current_sap_system = {
+        "resource_group": rg_name,
+        "components": [],
+        "availability_sets": availability_set_count,
+        "compliance_status": "Unknown"
+    }
+    
+    # VMs already counted under a component type
+    classified_vms = set()
+    
+    # Process each VM to identify SAP components
+    for vm in vms:
+        vm_tags = vm.get("tags") or {}
+        vm_name = vm["name"]
+        vm_properties = vm.get("properties") or {}
+        storage_profile = vm_properties.get("storageProfile") or {}
+        vm_size = vm_properties["hardwareProfile"]["vmSize"]
+        vm_series = vm_size.split('_')[0]
+        
+        # Track VM series distribution
+        partial["vm_series_distribution"][vm_series] += 1
+        
+        # Try to identify SAP components from VM tags and name
+        is_sap_vm = False
+        sap_sid = None
+        
+        # Lower-case every tag key and value once
+        tag_items = [(tag_key.lower(), str(tag_value).lower()) for tag_key, tag_value in vm_tags.items()]
+        
+        # Try to determine component type from the tag keys and values
+        component_type = _classify_component(" ".join(f"{key} {value}" for key, value in tag_items))
+        
+        # Check VM tags for SAP indicators; the first SAP tag provides the SID
+        for (tag_key_lower, _), tag_value in zip(tag_items, vm_tags.values()):
+            if tag_key_lower in _SAP_TAGS_LOWER:
+                is_sap_vm = True
+                sap_sid = tag_value
+                break
+        
+        # Check VM name for component indicators if not identified from tags
+        if component_type == "unknown":
+            component_type = _classify_component(vm_name, _COMPONENT_NAME_RE)
+            if component_type != "unknown":
+                is_sap_vm = True
+        
+        if component_type != "unknown" and vm_name not in classified_vms:
+            classified_vms.add(vm_name)
+            partial["component_counts"][component_type] += 1
+            if include_component_names:
+                partial["identified_components"][component_type].append(vm_name)
+        
+        # If this is an SAP VM, add to the component list
+        if is_sap_vm:
+            # Try to extract SID from name if not found in tags
+            if not sap_sid:
+                # Common naming patterns for SAP VMs include SID
+                # Example: hanadb-s4h-vm1 -> S4H might be the SID
+                match = _SID_RE.search(vm_name)
+                sap_sid = match.group(1).upper() if match else None
+            
+            current_sap_system["sid"] = sap_sid
+            
+            # Check if VM is in an availability set
+            in_availability_set = vm_properties.get("availabilitySet") is not None
+            
+            # Check for premium storage
+            has_premium_storage = any(
+                (disk.get("managedDisk") or {}).get("storageAccountType") in PREMIUM_SKUS
+                for disk in storage_profile.get("dataDisks") or []
+            )
+            
+            # Basic compliance check
+            is_compliant = in_availability_set and has_premium_storage
+            compliance_status = "Compliant" if is_compliant else "Non-compliant"
+            
+            if is_compliant:
+                partial["compliance_status"]["compliant"] += 1
+            else:
+                partial["compliance_status"]["non_compliant"] += 1
+            
+            current_sap_system["components"].append(Component(
+                vm_name=vm_name,
+                component_type=component_type,
+                vm_size=vm_size,
+                os_type=(storage_profile.get("osDisk") or {}).get("osType"),
+                in_availability_set=in_availability_set,
+                has_premium_storage=has_premium_storage,
+                compliance_status=compliance_status
+            ))
+            partial["total_components"] += 1
+    
+    # Set overall compliance status for the SAP system; every component in
+    # this resource group has been counted as compliant or non-compliant
+    if current_sap_system["components"]:
+        compliant_components = partial["compliance_status"]["compliant"]
+        if compliant_components == partial["total_components"]:
+            current_sap_system["compliance_status"] = "Compliant"
+        elif compliant_components > 0:
+            current_sap_system["compliance_status"] = "Partially Compliant"
+        else:
+            current_sap_system["compliance_status"] = "Non-compliant"
+    
+    # Return the SAP system if components were found
+    if current_sap_system["components"]:
+        partial["sap_systems"].append(current_sap_system)
+    
+    return partial
+
+def _list_vms(compute_client: ComputeManagementClient, subscription_id: str, rg_name: str) -> List[Dict[str, Any]]:
+    """
+    List the VMs of a resource group as raw ARM JSON, restricted to the properties the summary reads
+    
+    Uses the client's request pipeline directly so ``$select`` can be passed
+    and the response is not hydrated into SDK models.
+    
+    Args:
+        compute_client (ComputeManagementClient): Compute management client
+        subscription_id (str): Subscription ID
+        rg_name (str): Resource group name
+        
+    Returns:
+        List[Dict[str, Any]]: Virtual machines in the ARM REST representation
+    """
+    vms = []
+    request = HttpRequest(
+        "GET",
+        f"/subscriptions/{subscription_id}/resourceGroups/{quote(rg_name)}"
+        "/providers/Microsoft.Compute/virtualMachines",
+        params={"api-version": VM_LIST_API_VERSION, "$select": VM_LIST_SELECT}
+    )
+    
+    while request is not None:
+        response = compute_client._send_request(request)
+        response.raise_for_status()
+        body = response.json()
+        vms.extend(body.get("value", []))
+        next_link = body.get("nextLink")
+        request = HttpRequest("GET", next_link) if next_link else None
+    
+    return vms
+
+def _process_resource_group(
+    compute_client: ComputeManagementClient,
+    subscription_id: str,
+    rg_name: str,
+    include_component_names: bool = False
+) -> Optional[Dict[str, Any]]:
+    """
+    List VMs, disks and availability sets of a resource group through the compute API
+    
+    Fallback for callers without Resource Graph access. Runs in a worker
+    thread; the returned counts are merged into the overall summary by the
+    caller so no state is shared between resource groups.
+    
+    Args:
+        compute_client (ComputeManagementClient): Compute management client
+        subscription_id (str): Subscription ID
+        rg_name (str): Resource group name
+        include_component_names (bool): Also collect VM names per component type
+        
+    Returns:
+        Optional[Dict[str, Any]]: Per-resource-group counts, or None on error
+    """
+    try:
+        vms = _list_vms(compute_client, subscription_id, rg_name)
+        # Stream disks and availability sets; only their counts are needed
+        disk_types = Counter(
+            disk.sku.name if disk.sku and disk.sku.name else "Unknown"
+            for disk in compute_client.disks.list_by_resource_group(rg_name)
+        )
+        availability_set_count = sum(1 for _ in compute_client.availability_sets.list_by_resource_group(rg_name))
+        return _summarize_resource_group(
+            rg_name, vms, disk_types, availability_set_count, include_component_names
+        )
+        
+    except Exception as e:
+        logger.warning(f"Error processing resource group {rg_name}: {str(e)}")
+        return None
+
+def _get_credential() -> Any:
+    """Return the Azure credential, creating it on first use so its token cache is reused"""
+    global _CREDENTIAL
+    with _CREDENTIAL_LOCK:
+        if _CREDENTIAL is None:
+            _CREDENTIAL = get_azure_credential()
+        return _CREDENTIAL
+
+@functools.lru_cache(maxsize=32)
+def _get_clients(subscription_id: str) -> Tuple[ResourceManagementClient, ComputeManagementClient]:
+    """Return cached resource and compute management clients for a subscription"""
+    credential = _get_credential()
+    return (
+        ResourceManagementClient(credential, subscription_id),
+        ComputeManagementClient(credential, subscription_id)
+    )
+
+@functools.lru_cache(maxsize=1)
+def _get_resource_graph_client() -> ResourceGraphClient:
+    """Return the cached Resource Graph client"""
+    return ResourceGraphClient(_get_credential())
+
+def _resource_groups_for_sid(resource_client: ResourceManagementClient, sid: str) -> List[str]:
+    """
+    Find the resource groups holding resources tagged with a SAP System ID
+    
+    Uses the tag-indexed resource filter for each SAP tag, so unrelated
+    resource groups are never listed.
+    
+    Args:
+        resource_client (ResourceManagementClient): Resource management client
+        sid (str): SAP System ID
+        
+    Returns:
+        List[str]: Sorted resource group names, empty if no tagged resource was found
+    """
+    rg_set = set()
+    for tag_value in {sid, sid.upper()}:
+        tag_value = tag_value.replace("'", "''")
+        for tag_name in SAP_TAGS:
+            tag_filter = f"tagName eq '{tag_name}' and tagValue eq '{tag_value}'"
+            for resource in resource_client.resources.list(filter=tag_filter):
+                # /subscriptions/{id}/resourceGroups/{name}/providers/...
+                rg_set.add(resource.id.split('/')[4])
+    return sorted(rg_set)
+
+def _resource_groups_tagged_with_sid(resource_client: ResourceManagementClient, sid: str) -> List[str]:
+    """
+    Find resource groups whose SAP tags carry a SAP System ID
+    
+    Each SAP tag name is filtered by the service (``tagName eq ...``), so
+    only tagged resource groups are returned and checked for the SID.
+    
+    Args:
+        resource_client (ResourceManagementClient): Resource management client
+        sid (str): SAP System ID
+        
+    Returns:
+        List[str]: Matching resource group names in listing order
+    """
+    sid_lower = sid.lower()
+    resource_groups = []
+    for tag_name in SAP_TAGS:
+        tag_name_lower = tag_name.lower()
+        for rg in resource_client.resource_groups.list(filter=f"tagName eq '{tag_name}'"):
+            if rg.name in resource_groups:
+                continue
+            if any(tag_key.lower() == tag_name_lower and sid_lower in str(tag_value).lower()
+                   for tag_key, tag_value in (rg.tags or {}).items()):
+                resource_groups.append(rg.name)
+    return resource_groups
+
+def _list_resource_groups(resource_client: ResourceManagementClient, sid: Optional[str] = None) -> List[str]:
+    """
+    List the resource groups of a subscription, optionally matching a SAP System ID
+    
+    Args:
+        resource_client (ResourceManagementClient): Resource management client
+        sid (str, optional): SAP System ID matched against resource group names,
+            SAP tag values and tag keys
+        
+    Returns:
+        List[str]: Resource group names in listing order
+    """
+    sid_lower = sid.lower() if sid else None
+    resource_groups = []
+    
+    for rg in resource_client.resource_groups.list():
+        # If SID filter is applied, check resource group tags or name
+        if sid_lower:
+            # Check if resource group name contains SID
+            if sid_lower in rg.name.lower():
+                resource_groups.append(rg.name)
+                continue
+            
+            # Check if resource group tags contain SID
+            if rg.tags:
+                for tag_key, tag_value in rg.tags.items():
+                    tag_key_lower = tag_key.lower()
+                    if (tag_key_lower in _SAP_TAGS_LOWER and sid_lower in str(tag_value).lower()) or \
+                       (sid_lower in tag_key_lower):
+                        resource_groups.append(rg.name)
+                        break
+        else:
+            resource_groups.append(rg.name)
+    return resource_groups
+
+def _query_resource_graph(
+    subscription_id: str,
+    resource_groups: Optional[List[str]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch VMs, disks and availability sets of a subscription with one Resource Graph query
+    
+    Args:
+        subscription_id (str): Subscription ID
+        resource_groups (List[str], optional): Restrict the query to these resource groups
+        
+    Returns:
+        Dict[str, Dict[str, Any]]: ``vms``, ``disk_types`` and ``availability_set_count``
+        keyed by lower-case resource group name
+        
+    Raises:
+        HttpResponseError: If the query is rejected, e.g. missing Resource Graph access
+    """
+    query = INVENTORY_RESOURCE_GRAPH_QUERY
+    if resource_groups is not None:
+        if not resource_groups:
+            return {}
+        query += "\n| where resourceGroup in~ (" + ", ".join(json.dumps(rg) for rg in resource_groups) + ")"
+    
+    resource_graph_client = _get_resource_graph_client()
+    grouped = {}
+    skip_token = None
+    
+    while True:
+        query_request = QueryRequest(
+            subscriptions=[subscription_id],
+            query=query,
+            options=QueryOptions(result_format=ResultFormat.object_array, skip_token=skip_token)
+        )
+        response = resource_graph_client.resources(query_request)
+        
+        for row in response.data:
+            rg_resources = grouped.setdefault(
+                row["resourceGroup"].lower(),
+                {"vms": [], "disk_types": Counter(), "availability_set_count": 0}
+            )
+            resource_type = row["type"].lower()
+            if resource_type == "microsoft.compute/virtualmachines":
+                rg_resources["vms"].append(row)
+            elif resource_type == "microsoft.compute/disks":
+                rg_resources["disk_types"][(row.get("sku") or {}).get("name") or "Unknown"] += 1
+            else:
+                rg_resources["availability_set_count"] += 1
+        
+        skip_token = response.skip_token
+        if not skip_token:
+            return grouped
 
 async def get_sap_inventory_summary(
     resource_group: Optional[str] = None,
     subscription_id: Optional[str] = None,
     sid: Optional[str] = None,
-    auth_context: Optional[Dict[str, Any]] = None
+    auth_context: Optional[Dict[str, Any]] = None,
+    include_component_names: bool = False
 ) -> Dict[str, Any]:
     """
     Get summary of SAP systems and components in Azure
@@ -39,6 +554,8 @@ async def get_sap_inventory_summary(
         subscription_id (str, optional): Subscription ID
         sid (str, optional): SAP System ID to filter resources
         auth_context (Dict[str, Any], optional): Authentication context
+        include_component_names (bool, optional): Also list the VM names of each
+            component type under ``identified_components``
         
     Returns:
         Dict[str, Any]: SAP inventory summary
@@ -56,243 +573,96 @@ async def get_sap_inventory_summary(
         # Get subscription ID from config if not provided
         subscription_id = get_subscription_id(subscription_id)
         
-        # Get Azure credential
-        credential = get_azure_credential()
-        
-        # Create Resource Management Client
-        resource_client = ResourceManagementClient(credential, subscription_id)
-        
-        # Create Compute Management Client
-        compute_client = ComputeManagementClient(credential, subscription_id)
+        # Reuse the management clients (and their credential) across calls
+        resource_client, compute_client = await asyncio.to_thread(_get_clients, subscription_id)
         
         # Query resource groups if not specified
         resource_groups = []
         if resource_group:
             resource_groups = [resource_group]
-        else:
-            # List all resource groups
-            for rg in resource_client.resource_groups.list():
-                # If SID filter is applied, check resource group tags or name
-                if sid:
-                    # Check if resource group name contains SID
-                    if sid.lower() in rg.name.lower():
-                        resource_groups.append(rg.name)
-                        continue
-                    
-                    # Check if resource group tags contain SID
-                    if rg.tags:
-                        for tag_key, tag_value in rg.tags.items():
-                            if (tag_key in SAP_TAGS and sid.lower() in str(tag_value).lower()) or \
-                               (sid.lower() in tag_key.lower()):
-                                resource_groups.append(rg.name)
-                                break
-                else:
-                    resource_groups.append(rg.name)
+        elif sid:
+            # Resolve the SID through tagged resources first, then through
+            # resource groups carrying an SAP tag
+            resource_groups = await asyncio.to_thread(_resource_groups_for_sid, resource_client, sid)
+            if not resource_groups:
+                resource_groups = await asyncio.to_thread(_resource_groups_tagged_with_sid, resource_client, sid)
+        
+        # Otherwise list every resource group, matching the SID against names
+        # and tag keys
+        if not resource_group and not resource_groups:
+            # The listing pages through the synchronous client, so keep it off the event loop
+            resource_groups = await asyncio.to_thread(_list_resource_groups, resource_client, sid)
         
         # Initialize summary
-        summary = {
-            "sap_systems": [],
-            "vm_count": 0,
-            "disk_count": 0,
-            "availability_set_count": 0,
-            "identified_components": {
-                "database": [],
-                "application": [],
-                "central_services": [],
-                "web_dispatcher": []
-            },
-            # Add workbook-aligned metrics
-            "vm_series_distribution": {},
-            "disk_types_distribution": {},
-            "compliance_status": {
-                "compliant": 0,
-                "non_compliant": 0,
-                "unknown": 0
-            }
-        }
+        summary = _new_partial(include_component_names)
+        
+        # Fetch everything with a single Resource Graph query; fall back to
+        # listing each resource group if Resource Graph is not available
+        results = None
+        try:
+            grouped = await asyncio.to_thread(
+                _query_resource_graph,
+                subscription_id,
+                resource_groups if (resource_group or sid) else None
+            )
+            results = []
+            for rg_name in resource_groups:
+                rg_resources = grouped.get(rg_name.lower(), {})
+                try:
+                    results.append(_summarize_resource_group(
+                        rg_name,
+                        rg_resources.get("vms", []),
+                        rg_resources.get("disk_types", Counter()),
+                        rg_resources.get("availability_set_count", 0),
+                        include_component_names
+                    ))
+                except Exception as e:
+                    logger.warning(f"Error processing resource group {rg_name}: {str(e)}")
+        except HttpResponseError as e:
+            logger.warning(f"Resource Graph query failed, listing resource groups individually: {e}")
+        
+        if results is None:
+            # Process resource groups concurrently on the bounded worker pool;
+            # the blocking SDK calls release the GIL while waiting on the network
+            loop = asyncio.get_running_loop()
+            results = await asyncio.gather(*[
+                loop.run_in_executor(
+                    _RESOURCE_GROUP_EXECUTOR,
+                    _process_resource_group,
+                    compute_client,
+                    subscription_id,
+                    rg_name,
+                    include_component_names
+                )
+                for rg_name in resource_groups
+            ])
+        
+        # Reduce the per-resource-group results on the calling coroutine
+        for partial in results:
+            if partial is not None:
+                _merge(summary, partial)
         
-        # Process each resource group
-        for rg_name in resource_groups:
-            # Track current SAP system
-            current_sap_system = {
-                "resource_group": rg_name,
-                "components": [],
-                "availability_sets": 0,
-                "compliance_status": "Unknown"
+        # Serialize components at the boundary
+        for sap_system in summary["sap_systems"]:
+            sap_system["components"] = [component._asdict() for component in sap_system["components"]]
+        
+        # Report every component type's VM names only when requested
+        identified_components = summary.pop("identified_components")
+        if include_component_names:
+            summary["identified_components"] = {
+                component: identified_components.get(component, []) for component in COMPONENT_TYPES
             }
-            
-            # List all VMs in the resource group
-            try:
-                vms = list(compute_client.virtual_machines.list(rg_name))
-                summary["vm_count"] += len(vms)
-                
-                # Process each VM to identify SAP components
-                for vm in vms:
-                    vm_tags = vm.tags or {}
-                    vm_name = vm.name
-                    vm_size = vm.hardware_profile.vm_size
-                    vm_series = vm_size.split('_')[0]
-                    
-                    # Track VM series distribution
-                    if vm_series in summary["vm_series_distribution"]:
-                        summary["vm_series_distribution"][vm_series] += 1
-                    else:
-                        summary["vm_series_distribution"][vm_series] = 1
-                    
-                    # Try to identify SAP components from VM tags and name
-                    is_sap_vm = False
-                    component_type = "unknown"
-                    sap_sid = None
-                    
-                    # Check VM tags for SAP indicators
-                    for tag_key, tag_value in vm_tags.items():
-                        # Look for SAP tags
-                        if tag_key in SAP_TAGS:
-                            is_sap_vm = True
-                            sap_sid = tag_value
-                            
-                        # Try to determine component type
-                        tag_key_lower = tag_key.lower()
-                        tag_value_lower = str(tag_value).lower()
-                        
-                        if "db" in tag_key_lower or "database" in tag_key_lower or \
-                           "hana" in tag_key_lower or "db" in tag_value_lower or \
-                           "database" in tag_value_lower or "hana" in tag_value_lower:
-                            component_type = "database"
-                            summary["identified_components"]["database"].append(vm_name)
-                            
-                        elif "ascs" in tag_key_lower or "scs" in tag_key_lower or \
-                             "ers" in tag_key_lower or "central" in tag_key_lower or \
-                             "ascs" in tag_value_lower or "scs" in tag_value_lower or \
-                             "ers" in tag_value_lower:
-                            component_type = "central_services"
-                            summary["identified_components"]["central_services"].append(vm_name)
-                            
-                        elif "app" in tag_key_lower or "application" in tag_key_lower or \
-                             "pas" in tag_key_lower or "aas" in tag_key_lower or \
-                             "app" in tag_value_lower or "pas" in tag_value_lower or \
-                             "aas" in tag_value_lower:
-                            component_type = "application"
-                            summary["identified_components"]["application"].append(vm_name)
-                            
-                        elif "web" in tag_key_lower or "webdisp" in tag_key_lower or \
-                             "web" in tag_value_lower or "webdisp" in tag_value_lower:
-                            component_type = "web_dispatcher"
-                            summary["identified_components"]["web_dispatcher"].append(vm_name)
-                    
-                    # Check VM name for component indicators if not identified from tags
-                    if component_type == "unknown":
-                        vm_name_lower = vm_name.lower()
-                        
-                        if "db" in vm_name_lower or "hana" in vm_name_lower or "sql" in vm_name_lower:
-                            component_type = "database"
-                            summary["identified_components"]["database"].append(vm_name)
-                            is_sap_vm = True
-                            
-                        elif "ascs" in vm_name_lower or "scs" in vm_name_lower or "ers" in vm_name_lower:
-                            component_type = "central_services"
-                            summary["identified_components"]["central_services"].append(vm_name)
-                            is_sap_vm = True
-                            
-                        elif "app" in vm_name_lower or "pas" in vm_name_lower or "aas" in vm_name_lower:
-                            component_type = "application"
-                            summary["identified_components"]["application"].append(vm_name)
-                            is_sap_vm = True
-                            
-                        elif "web" in vm_name_lower or "wd" in vm_name_lower:
-                            component_type = "web_dispatcher"
-                            summary["identified_components"]["web_dispatcher"].append(vm_name)
-                            is_sap_vm = True
-                    
-                    # If this is an SAP VM, add to the component list
-                    if is_sap_vm:
-                        # Try to extract SID from name if not found in tags
-                        if not sap_sid and len(vm_name) >= 3:
-                            # Common naming patterns for SAP VMs include SID
-                            # Example: hanadb-s4h-vm1 -> S4H might be the SID
-                            parts = vm_name.split('-')
-                            for part in parts:
-                                if len(part) == 3 and part.isalnum():
-                                    sap_sid = part.upper()
-                                    break
-                        
-                        current_sap_system["sid"] = sap_sid
-                        
-                        # Check if VM is in an availability set
-                        in_availability_set = vm.availability_set is not None
-                        
-                        # Check for premium storage
-                        has_premium_storage = False
-                        for disk in vm.storage_profile.data_disks:
-                            if disk.managed_disk and disk.managed_disk.storage_account_type and 'Premium' in disk.managed_disk.storage_account_type:
-                                has_premium_storage = True
-                                break
-                        
-                        # Basic compliance check
-                        is_compliant = in_availability_set and has_premium_storage
-                        compliance_status = "Compliant" if is_compliant else "Non-compliant"
-                        
-                        if is_compliant:
-                            summary["compliance_status"]["compliant"] += 1
-                        else:
-                            summary["compliance_status"]["non_compliant"] += 1
-                        
-                        current_sap_system["components"].append({
-                            "vm_name": vm_name,
-                            "component_type": component_type,
-                            "vm_size": vm.hardware_profile.vm_size,
-                            "os_type": vm.storage_profile.os_disk.os_type,
-                            "in_availability_set": in_availability_set,
-                            "has_premium_storage": has_premium_storage,
-                            "compliance_status": compliance_status
-                        })
-                
-                # Count disks and track disk types
-                disks = list(compute_client.disks.list_by_resource_group(rg_name))
-                summary["disk_count"] += len(disks)
-                
-                # Track disk type distribution
-                for disk in disks:
-                    disk_type = disk.sku.name if disk.sku and disk.sku.name else "Unknown"
-                    if disk_type in summary["disk_types_distribution"]:
-                        summary["disk_types_distribution"][disk_type] += 1
-                    else:
-                        summary["disk_types_distribution"][disk_type] = 1
-                
-                # Count availability sets
-                availability_sets = compute_client.availability_sets.list_by_resource_group(rg_name)
-                availability_set_count = len(list(availability_sets))
-                summary["availability_set_count"] += availability_set_count
-                current_sap_system["availability_sets"] = availability_set_count
-                
-                # Set overall compliance status for the SAP system
-                if current_sap_system["components"]:
-                    compliant_components = sum(1 for comp in current_sap_system["components"] if comp["compliance_status"] == "Compliant")
-                    if compliant_components == len(current_sap_system["components"]):
-                        current_sap_system["compliance_status"] = "Compliant"
-                    elif compliant_components > 0:
-                        current_sap_system["compliance_status"] = "Partially Compliant"
-                    else:
-                        current_sap_system["compliance_status"] = "Non-compliant"
-                
-                # Add the SAP system to summary if components were found
-                if current_sap_system["components"]:
-                    summary["sap_systems"].append(current_sap_system)
-                
-            except Exception as e:
-                logger.warning(f"Error processing resource group {rg_name}: {str(e)}")
-                continue
+        
+        # Report plain dicts rather than Counter instances
+        summary["vm_series_distribution"] = dict(summary["vm_series_distribution"])
+        summary["disk_types_distribution"] = dict(summary["disk_types_distribution"])
         
         # Calculate summary stats
         summary["total_sap_systems"] = len(summary["sap_systems"])
-        summary["total_components"] = sum(len(sys["components"]) for sys in summary["sap_systems"])
         
-        # Calculate component type counts
+        # Report every component type, including those with no VMs
         summary["component_counts"] = {
-            "database": len(summary["identified_components"]["database"]),
-            "application": len(summary["identified_components"]["application"]),
-            "central_services": len(summary["identified_components"]["central_services"]),
-            "web_dispatcher": len(summary["identified_components"]["web_dispatcher"])
+            component: summary["component_counts"][component] for component in COMPONENT_TYPES
         }
         
         return {
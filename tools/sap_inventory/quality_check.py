@@ -5,23 +5,30 @@ SAP Quality Check Module
 This module provides functions to validate SAP systems on Azure against Microsoft's best practices.
 It is based on the QualityCheck tool developed by Microsoft for SAP on Azure.
 """
+import asyncio
+import functools
 import logging
 import json
 import os
 import re
-from typing import Dict, Any, List, Optional, Union
+from collections import Counter
+from dataclasses import asdict, dataclass
+from typing import Dict, Any, FrozenSet, List, Optional, Tuple, Union
 from pathlib import Path
 
-from azure.mgmt.compute import ComputeManagementClient
-from azure.mgmt.storage import StorageManagementClient
-from azure.mgmt.network import NetworkManagementClient
 from azure.core.exceptions import ResourceNotFoundError, HttpResponseError
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from tools.azure_tools.auth import (
-    get_azure_credential,
     get_subscription_id,
     get_resource_group
 )
+from tools.sap_inventory.vm_resources import get_clients, get_vm_cached, get_vm_resources, invalidate_vm_cache
+from tools.sap_inventory.vm_checks import CHECKS, get_vm_facts
 from tools.azure_tools.ssh_client import SSHClient, SSHException
 
 # Configure logging
@@ -30,13 +37,99 @@ logger = logging.getLogger(__name__)
 # Path to the Quality Check configuration file
 QUALITY_CHECK_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "QualityCheck.json")
 
-# Load Quality Check configuration
-try:
-    with open(QUALITY_CHECK_CONFIG_PATH, 'r') as config_file:
-        QUALITY_CHECK_CONFIG = json.load(config_file)
-except (FileNotFoundError, json.JSONDecodeError) as e:
-    logger.error(f"Error loading Quality Check configuration: {e}")
-    QUALITY_CHECK_CONFIG = {}
+@functools.lru_cache(maxsize=1)
+def get_quality_check_config() -> Dict[str, Any]:
+    """
+    Load the Quality Check configuration
+    
+    The file is read on first use and cached, so importing this module does no I/O.
+    
+    Returns:
+        Dict[str, Any]: Quality Check configuration, or an empty dict if it cannot be loaded
+    """
+    try:
+        with open(QUALITY_CHECK_CONFIG_PATH, 'rb') as config_file:
+            data = config_file.read()
+        return orjson.loads(data) if orjson else json.loads(data)
+    except (FileNotFoundError, ValueError) as e:
+        logger.error(f"Error loading Quality Check configuration: {e}")
+        return {}
+
+@functools.lru_cache(maxsize=1)
+def _supported_db_index() -> Dict[Tuple[str, str], FrozenSet[str]]:
+    """Supported databases per (VM size, role), flattened from SupportedVMs"""
+    return {
+        (vm_size, role): frozenset(role_config.get("SupportedDB", []))
+        for vm_size, roles in get_quality_check_config().get("SupportedVMs", {}).items()
+        for role, role_config in roles.items()
+        if isinstance(role_config, dict)
+    }
+
+# Shared checks (see vm_checks.CHECKS) with the check name, description, expected text,
+# (passed, failed) actual texts and recommendation this tool reports, and the result
+# reported when the check does not pass
+QUALITY_CHECK_TEXTS = {
+    "DB-0001": (
+        "Premium Storage for Database", "Premium storage for database disks",
+        "Premium Storage for database disks",
+        ("Premium storage used for database disks", "Standard storage used for database disks"),
+        "Use Premium Storage for database disks", "Fail"
+    ),
+    "NET-0001": (
+        "Accelerated Networking", "Accelerated Networking enabled",
+        "Accelerated Networking enabled",
+        ("Accelerated Networking enabled", "Accelerated Networking disabled"),
+        "Enable Accelerated Networking for improved network performance", "Fail"
+    ),
+    "HA-0001": (
+        "Availability Set", "VM in Availability Set for high availability",
+        "VM in Availability Set",
+        ("VM in Availability Set", "VM not in Availability Set"),
+        "Deploy VM in an Availability Set for high availability", "Fail"
+    ),
+    "PERF-0001": (
+        "Proximity Placement Group", "VM in Proximity Placement Group for low latency",
+        "VM in Proximity Placement Group",
+        ("VM in Proximity Placement Group", "VM not in Proximity Placement Group"),
+        "Consider using Proximity Placement Group for low latency between SAP components", "Warning"
+    ),
+}
+
+# Maximum number of disk/NIC lookups issued at the same time
+MAX_CONCURRENT_SDK_CALLS = 20
+
+# Commands printing the OS version, per Linux distribution
+OS_VERSION_COMMANDS = {
+    "SUSE": "cat /etc/os-release | grep VERSION= | cut -d '\"' -f 2",
+    "RedHat": "cat /etc/redhat-release",
+    "OracleLinux": "cat /etc/oracle-release",
+}
+
+# Host information gathered over SSH in a single exec; every command's output
+# follows a ===<SECTION>=== marker line
+HOST_INFO_SCRIPT = (
+    "echo '===OS==='; {os_version_cmd}; "
+    "echo '===DF==='; df -h; "
+    "echo '===VGS==='; vgs --units g 2>/dev/null | grep . || echo NO_VG; "
+    "echo '===PVS==='; pvs --units g 2>/dev/null; "
+    "echo '===LVS==='; lvs --units g 2>/dev/null"
+)
+_SECTION_RE = re.compile(r'^===(\w+)===\n', re.M)
+
+# One "df -h" row; the header never matches because its use column is "Use%"
+_DF_RE = re.compile(r'^(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\d+%|-)\s+(\S.*?)\s*$', re.M)
+_DF_FIELDS = ("filesystem", "size", "used", "available", "use_percent", "mounted_on")
+
+@dataclass(slots=True)
+class CheckResult:
+    """One quality check result; converted to a dict when the results are returned"""
+    check_id: str
+    check_name: str
+    description: str
+    result: str
+    expected: str
+    actual: str
+    recommendation: str = ""
 
 # Mapping of PowerShell commands to Python equivalents
 PS_TO_PY_COMMANDS = {
@@ -45,6 +138,80 @@ PS_TO_PY_COMMANDS = {
     "Get-AzDisk": "compute_client.disks.get",
 }
 
+def _gather_host_info(
+    vm_os: str,
+    ssh_host: str,
+    ssh_username: str,
+    ssh_password: Optional[str],
+    ssh_key_path: Optional[str],
+    ssh_port: int
+) -> Dict[str, Any]:
+    """
+    Gather OS, filesystem and LVM information from a Linux VM over SSH
+    
+    Args:
+        vm_os (str): Operating system (SUSE, RedHat, OracleLinux)
+        ssh_host (str): SSH hostname or IP
+        ssh_username (str): SSH username
+        ssh_password (str, optional): SSH password or key passphrase
+        ssh_key_path (str, optional): Path to SSH private key
+        ssh_port (int): SSH port
+        
+    Returns:
+        Dict[str, Any]: Entries to add to the VM info, or an ssh_error entry
+    """
+    host_info = {}
+    ssh_client = SSHClient()
+    
+    try:
+        if ssh_key_path:
+            ssh_client.connect_with_key(
+                hostname=ssh_host, 
+                username=ssh_username,
+                key_path=ssh_key_path,
+                password=ssh_password,  # Can be None if key doesn't require passphrase
+                port=ssh_port
+            )
+        else:
+            ssh_client.connect_with_password(
+                hostname=ssh_host, 
+                username=ssh_username,
+                password=ssh_password,
+                port=ssh_port
+            )
+        
+        # Gather OS, filesystem and LVM information in one round-trip
+        host_info_result = ssh_client.execute_command(
+            HOST_INFO_SCRIPT.format(os_version_cmd=OS_VERSION_COMMANDS[vm_os])
+        )
+        split_output = _SECTION_RE.split(host_info_result.output)
+        sections = {name: output.strip() for name, output in zip(split_output[1::2], split_output[2::2])}
+        
+        host_info["os_version"] = sections.get("OS") or "Unknown"
+        
+        if sections.get("DF"):
+            # Parse filesystem information
+            host_info["filesystems"] = [dict(zip(_DF_FIELDS, match)) for match in _DF_RE.findall(sections["DF"])]
+        
+        # LVM details are only reported if volume groups exist
+        if sections.get("VGS", "NO_VG") != "NO_VG":
+            host_info["lvm"] = {
+                "volume_groups": sections["VGS"]
+            }
+            if sections.get("PVS"):
+                host_info["lvm"]["physical_volumes"] = sections["PVS"]
+            if sections.get("LVS"):
+                host_info["lvm"]["logical_volumes"] = sections["LVS"]
+    
+    except SSHException as e:
+        logger.error(f"SSH connection error: {e}")
+        host_info["ssh_error"] = str(e)
+    finally:
+        # Close SSH connection
+        ssh_client.close()
+    
+    return host_info
+
 async def run_quality_check(
     vm_name: str,
     vm_role: str = "DB",  # Options: DB, ASCS, APP
@@ -108,13 +275,8 @@ async def run_quality_check(
         # Get subscription ID from config if not provided
         subscription_id = get_subscription_id(subscription_id)
         
-        # Get Azure credential
-        credential = get_azure_credential()
-        
-        # Create Azure clients
-        compute_client = ComputeManagementClient(credential, subscription_id)
-        network_client = NetworkManagementClient(credential, subscription_id)
-        storage_client = StorageManagementClient(credential, subscription_id)
+        # Get the cached Azure clients on the shared connection pool
+        compute_client, network_client = get_clients(subscription_id)
         
         # Initialize results dictionary
         results = {
@@ -126,9 +288,23 @@ async def run_quality_check(
             "warning_count": 0
         }
         
+        # Gather host information over SSH in a worker thread while Azure is queried
+        host_info_task = None
+        if vm_os in ["SUSE", "RedHat", "OracleLinux"] and ssh_host and ssh_username and (ssh_password or ssh_key_path):
+            host_info_task = asyncio.create_task(asyncio.to_thread(
+                _gather_host_info, vm_os, ssh_host, ssh_username, ssh_password, ssh_key_path, ssh_port
+            ))
+        
         # Get VM details
         try:
-            vm = compute_client.virtual_machines.get(resource_group, vm_name, expand='instanceView')
+            # One Resource Graph query returns the VM with its disks and NICs; anything
+            # it does not (yet) know about is fetched with individual Get calls below
+            vm_resources = await get_vm_resources(subscription_id, resource_group, vm_name)
+            if vm_resources:
+                vm, graph_disks, graph_nics = vm_resources
+            else:
+                vm = await get_vm_cached(compute_client, subscription_id, resource_group, vm_name)
+                graph_disks, graph_nics = {}, {}
             results["vm_info"] = {
                 "name": vm.name,
                 "resource_group": resource_group,
@@ -146,12 +322,33 @@ async def run_quality_check(
                 "subscription_id": subscription_id
             }
             
+            # Fetch disks and network interfaces concurrently, bounded by a semaphore
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_SDK_CALLS)
+            
+            async def _fetch(known, operation, *args):
+                if known is not None:
+                    return known
+                async with semaphore:
+                    return await operation(*args)
+            
+            os_disk_ref = vm.storage_profile.os_disk
+            data_disk_refs = list(vm.storage_profile.data_disks)
+            disk_tasks = [
+                _fetch(graph_disks.get(disk_ref.name.lower()), compute_client.disks.get, resource_group, disk_ref.name)
+                for disk_ref in [os_disk_ref] + data_disk_refs
+            ]
+            nic_tasks = [
+                _fetch(
+                    graph_nics.get(nic_ref.id.lower()),
+                    network_client.network_interfaces.get, resource_group, nic_ref.id.split('/')[-1]
+                )
+                for nic_ref in vm.network_profile.network_interfaces
+            ]
+            disks_raw, nics_raw = await asyncio.gather(asyncio.gather(*disk_tasks), asyncio.gather(*nic_tasks))
+            
             # Get network interfaces
             network_interfaces = []
-            for nic_ref in vm.network_profile.network_interfaces:
-                nic_id = nic_ref.id
-                nic_name = nic_id.split('/')[-1]
-                nic = network_client.network_interfaces.get(resource_group, nic_name)
+            for nic in nics_raw:
                 network_interfaces.append({
                     "name": nic.name,
                     "primary": nic.primary,
@@ -170,7 +367,7 @@ async def run_quality_check(
             # Get disks details
             disks = []
             # OS disk
-            os_disk = compute_client.disks.get(resource_group, vm.storage_profile.os_disk.name)
+            os_disk = disks_raw[0]
             disks.append({
                 "name": os_disk.name,
                 "disk_size_gb": os_disk.disk_size_gb,
@@ -178,12 +375,11 @@ async def run_quality_check(
                 "disk_mbps_read_write": os_disk.disk_m_bps_read_write,
                 "storage_account_type": os_disk.sku.name,
                 "os_disk": True,
-                "caching": vm.storage_profile.os_disk.caching
+                "caching": os_disk_ref.caching
             })
             
             # Data disks
-            for data_disk_ref in vm.storage_profile.data_disks:
-                data_disk = compute_client.disks.get(resource_group, data_disk_ref.name)
+            for data_disk_ref, data_disk in zip(data_disk_refs, disks_raw[1:]):
                 disks.append({
                     "name": data_disk.name,
                     "disk_size_gb": data_disk.disk_size_gb,
@@ -196,209 +392,58 @@ async def run_quality_check(
                 })
             results["vm_info"]["disks"] = disks
             
-            # Check if SSH connection information is provided for Linux VMs
-            if vm_os in ["SUSE", "RedHat", "OracleLinux"] and ssh_host and ssh_username and (ssh_password or ssh_key_path):
-                # Establish SSH connection
-                ssh_client = SSHClient()
-                
-                try:
-                    if ssh_key_path:
-                        ssh_client.connect_with_key(
-                            hostname=ssh_host, 
-                            username=ssh_username,
-                            key_path=ssh_key_path,
-                            password=ssh_password,  # Can be None if key doesn't require passphrase
-                            port=ssh_port
-                        )
-                    else:
-                        ssh_client.connect_with_password(
-                            hostname=ssh_host, 
-                            username=ssh_username,
-                            password=ssh_password,
-                            port=ssh_port
-                        )
-                    
-                    # Get OS version
-                    if vm_os == "SUSE":
-                        os_version_cmd = "cat /etc/os-release | grep VERSION= | cut -d '\"' -f 2"
-                    elif vm_os == "RedHat":
-                        os_version_cmd = "cat /etc/redhat-release"
-                    elif vm_os == "OracleLinux":
-                        os_version_cmd = "cat /etc/oracle-release"
-                    
-                    os_version_result = ssh_client.execute_command(os_version_cmd)
-                    results["vm_info"]["os_version"] = os_version_result.output.strip() if os_version_result.success else "Unknown"
-                    
-                    # Get filesystem info
-                    fs_info_cmd = "df -h"
-                    fs_info_result = ssh_client.execute_command(fs_info_cmd)
-                    
-                    if fs_info_result.success:
-                        # Parse filesystem information
-                        filesystems = []
-                        lines = fs_info_result.output.strip().split('\n')
-                        # Skip header line
-                        for line in lines[1:]:
-                            parts = line.split()
-                            if len(parts) >= 6:
-                                filesystems.append({
-                                    "filesystem": parts[0],
-                                    "size": parts[1],
-                                    "used": parts[2],
-                                    "available": parts[3],
-                                    "use_percent": parts[4],
-                                    "mounted_on": parts[5]
-                                })
-                        results["vm_info"]["filesystems"] = filesystems
-                    
-                    # Get LVM info if relevant
-                    lvm_info_cmd = "vgs --noheadings 2>/dev/null || echo 'No volume groups found'"
-                    lvm_info_result = ssh_client.execute_command(lvm_info_cmd)
-                    
-                    if lvm_info_result.success and "No volume groups found" not in lvm_info_result.output:
-                        # LVM is in use, get details
-                        vg_info_cmd = "vgs --units g"
-                        vg_info_result = ssh_client.execute_command(vg_info_cmd)
-                        
-                        if vg_info_result.success:
-                            results["vm_info"]["lvm"] = {
-                                "volume_groups": vg_info_result.output.strip()
-                            }
-                            
-                            # Get physical volumes
-                            pv_info_cmd = "pvs --units g"
-                            pv_info_result = ssh_client.execute_command(pv_info_cmd)
-                            
-                            if pv_info_result.success:
-                                results["vm_info"]["lvm"]["physical_volumes"] = pv_info_result.output.strip()
-                            
-                            # Get logical volumes
-                            lv_info_cmd = "lvs --units g"
-                            lv_info_result = ssh_client.execute_command(lv_info_cmd)
-                            
-                            if lv_info_result.success:
-                                results["vm_info"]["lvm"]["logical_volumes"] = lv_info_result.output.strip()
-                    
-                    # Close SSH connection
-                    ssh_client.close()
-                
-                except SSHException as e:
-                    logger.error(f"SSH connection error: {e}")
-                    results["vm_info"]["ssh_error"] = str(e)
+            # Add the host information gathered over SSH
+            if host_info_task is not None:
+                results["vm_info"].update(await host_info_task)
             
             # Run checks based on QualityCheck.json configuration
             checks = []
             
             # 1. Check VM size for SAP workload support
             vm_size = vm.hardware_profile.vm_size
-            vm_supported = False
-            
-            if vm_size in QUALITY_CHECK_CONFIG.get("SupportedVMs", {}):
-                vm_config = QUALITY_CHECK_CONFIG["SupportedVMs"][vm_size]
-                
-                if vm_role in vm_config:
-                    supported_dbs = vm_config[vm_role].get("SupportedDB", [])
-                    vm_supported = sap_component_type in supported_dbs
+            vm_supported = sap_component_type in _supported_db_index().get((vm_size, vm_role), frozenset())
             
-            checks.append({
-                "check_id": "VM-0001",
-                "check_name": "Supported VM Size",
-                "description": f"VM size {vm_size} support for {sap_component_type} as {vm_role}",
-                "result": "Pass" if vm_supported else "Fail",
-                "expected": f"VM size supports {sap_component_type} as {vm_role}",
-                "actual": f"VM size {'supports' if vm_supported else 'does not support'} {sap_component_type} as {vm_role}",
-                "recommendation": "Use a supported VM size for SAP workloads" if not vm_supported else ""
-            })
-            
-            if vm_supported:
-                results["pass_count"] += 1
-            else:
-                results["fail_count"] += 1
-            
-            # 2. Check for Premium Storage for data disks (if DB role)
-            if vm_role == "DB":
-                has_premium_storage = False
-                for disk in disks:
-                    if not disk["os_disk"] and "Premium" in disk["storage_account_type"]:
-                        has_premium_storage = True
-                        break
-                
-                checks.append({
-                    "check_id": "DB-0001",
-                    "check_name": "Premium Storage for Database",
-                    "description": "Premium storage for database disks",
-                    "result": "Pass" if has_premium_storage else "Fail",
-                    "expected": "Premium Storage for database disks",
-                    "actual": f"{'Premium' if has_premium_storage else 'Standard'} storage used for database disks",
-                    "recommendation": "Use Premium Storage for database disks" if not has_premium_storage else ""
-                })
-                
-                if has_premium_storage:
-                    results["pass_count"] += 1
-                else:
-                    results["fail_count"] += 1
-            
-            # 3. Check for Accelerated Networking
-            has_accelerated_networking = False
-            for nic in network_interfaces:
-                if nic["accelerated_networking"]:
-                    has_accelerated_networking = True
-                    break
-            
-            checks.append({
-                "check_id": "NET-0001",
-                "check_name": "Accelerated Networking",
-                "description": "Accelerated Networking enabled",
-                "result": "Pass" if has_accelerated_networking else "Fail",
-                "expected": "Accelerated Networking enabled",
-                "actual": f"Accelerated Networking {'enabled' if has_accelerated_networking else 'disabled'}",
-                "recommendation": "Enable Accelerated Networking for improved network performance" if not has_accelerated_networking else ""
-            })
-            
-            if has_accelerated_networking:
-                results["pass_count"] += 1
-            else:
-                results["fail_count"] += 1
+            checks.append(CheckResult(
+                "VM-0001",
+                "Supported VM Size",
+                f"VM size {vm_size} support for {sap_component_type} as {vm_role}",
+                "Pass" if vm_supported else "Fail",
+                f"VM size supports {sap_component_type} as {vm_role}",
+                f"VM size {'supports' if vm_supported else 'does not support'} {sap_component_type} as {vm_role}",
+                "Use a supported VM size for SAP workloads" if not vm_supported else ""
+            ))
             
-            # 4. Check for Availability Set (if high_availability is True)
-            if high_availability:
-                in_availability_set = vm.availability_set is not None
-                
-                checks.append({
-                    "check_id": "HA-0001",
-                    "check_name": "Availability Set",
-                    "description": "VM in Availability Set for high availability",
-                    "result": "Pass" if in_availability_set else "Fail",
-                    "expected": "VM in Availability Set",
-                    "actual": f"VM {'in' if in_availability_set else 'not in'} Availability Set",
-                    "recommendation": "Deploy VM in an Availability Set for high availability" if not in_availability_set else ""
-                })
-                
-                if in_availability_set:
-                    results["pass_count"] += 1
-                else:
-                    results["fail_count"] += 1
+            # 2-5. Shared VM checks; premium storage only applies to the DB role and
+            # the availability set only to highly available deployments
+            skipped_checks = set()
+            if vm_role != "DB":
+                skipped_checks.add("DB-0001")
+            if not high_availability:
+                skipped_checks.add("HA-0001")
             
-            # 5. Check for Proximity Placement Group (PPG)
-            has_ppg = vm.proximity_placement_group is not None
+            facts = get_vm_facts(vm, nics_raw)
+            for spec in CHECKS:
+                if spec.id in skipped_checks:
+                    continue
+                check_name, description, expected, actual, recommendation, severity = QUALITY_CHECK_TEXTS[spec.id]
+                passed = spec.pred(facts)
+                checks.append(CheckResult(
+                    spec.id,
+                    check_name,
+                    description,
+                    "Pass" if passed else severity,
+                    expected,
+                    actual[0] if passed else actual[1],
+                    "" if passed else recommendation
+                ))
             
-            checks.append({
-                "check_id": "PERF-0001",
-                "check_name": "Proximity Placement Group",
-                "description": "VM in Proximity Placement Group for low latency",
-                "result": "Warning" if not has_ppg else "Pass",
-                "expected": "VM in Proximity Placement Group",
-                "actual": f"VM {'in' if has_ppg else 'not in'} Proximity Placement Group",
-                "recommendation": "Consider using Proximity Placement Group for low latency between SAP components" if not has_ppg else ""
-            })
-            
-            if has_ppg:
-                results["pass_count"] += 1
-            else:
-                results["warning_count"] += 1
+            counts = Counter(check.result for check in checks)
+            results["pass_count"] = counts["Pass"]
+            results["fail_count"] = counts["Fail"]
+            results["warning_count"] = counts["Warning"]
             
             # Save checks to results
-            results["checks"] = checks
+            results["checks"] = [asdict(check) for check in checks]
             
             # Calculate overall status
             if results["fail_count"] > 0:
@@ -414,10 +459,14 @@ async def run_quality_check(
             }
             
         except ResourceNotFoundError:
+            invalidate_vm_cache(subscription_id, resource_group)
             return {
                 "status": "error",
                 "message": f"VM {vm_name} not found in resource group {resource_group}"
             }
+        finally:
+            if host_info_task is not None and not host_info_task.done():
+                host_info_task.cancel()
             
     except HttpResponseError as e:
         logger.error(f"Error running quality check: {e}")
@@ -441,13 +490,14 @@ async def get_quality_check_definitions() -> Dict[str, Any]:
         Dict[str, Any]: Quality check definitions
     """
     try:
+        config = get_quality_check_config()
         return {
             "status": "success",
             "data": {
-                "supported_vms": list(QUALITY_CHECK_CONFIG.get("SupportedVMs", {}).keys()),
-                "supported_os_db_combinations": QUALITY_CHECK_CONFIG.get("SupportedOSDBCombinations", {}),
-                "checks": QUALITY_CHECK_CONFIG.get("Checks", []),
-                "version": QUALITY_CHECK_CONFIG.get("Version", "Unknown")
+                "supported_vms": list(config.get("SupportedVMs", {}).keys()),
+                "supported_os_db_combinations": config.get("SupportedOSDBCombinations", {}),
+                "checks": config.get("Checks", []),
+                "version": config.get("Version", "Unknown")
             }
         }
     except Exception as e:
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+SAP VM Check Definitions
+
+This module holds the VM checks shared by the quality check and VM compliance
+tools. The facts the checks need are collected from a VM and its network
+interfaces once, and each check is a predicate over those facts.
+"""
+from collections import namedtuple
+from dataclasses import dataclass
+from operator import attrgetter
+from typing import Any, Iterable, List
+
+# Managed disk storage types that count as premium storage
+PREMIUM_SKUS = frozenset({"Premium_LRS", "Premium_ZRS", "PremiumV2_LRS"})
+
+
+@dataclass(slots=True)
+class VmFacts:
+    """Normalized facts about a VM that the shared checks are evaluated against"""
+    vm_size: str
+    premium_data_disks: bool
+    accelerated_nic: bool
+    in_availability_set: bool
+    has_ppg: bool
+
+
+def get_vm_facts(vm: Any, nics: Iterable[Any]) -> VmFacts:
+    """
+    Collect the facts for the shared checks from a VM and its network interfaces
+
+    Args:
+        vm: VirtualMachine model
+        nics: NetworkInterface models attached to the VM
+
+    Returns:
+        VmFacts: Facts about the VM
+    """
+    managed_disks = (disk.managed_disk for disk in vm.storage_profile.data_disks)
+    return VmFacts(
+        vm_size=vm.hardware_profile.vm_size,
+        premium_data_disks=any(
+            managed_disk is not None and managed_disk.storage_account_type in PREMIUM_SKUS
+            for managed_disk in managed_disks
+        ),
+        accelerated_nic=any(nic.enable_accelerated_networking for nic in nics),
+        in_availability_set=vm.availability_set is not None,
+        has_ppg=vm.proximity_placement_group is not None
+    )
+
+
+# id: check ID, pred: VmFacts -> bool; the result texts are kept by the tools
+# running the checks, as each reports them in its own wording
+CheckSpec = namedtuple("CheckSpec", "id pred")
+
+CHECKS: List[CheckSpec] = [
+    CheckSpec("DB-0001", attrgetter("premium_data_disks")),
+    CheckSpec("NET-0001", attrgetter("accelerated_nic")),
+    CheckSpec("HA-0001", attrgetter("in_availability_set")),
+    CheckSpec("PERF-0001", attrgetter("has_ppg")),
+]
@@ -4,16 +4,20 @@ SAP VM Compliance Checks
 
 This module checks SAP VMs against best practices for performance and reliability.
 """
+import asyncio
 import logging
-from typing import Dict, Any, List, Optional, Union
-from azure.mgmt.compute import ComputeManagementClient
+import re
+import time
+from typing import Dict, Any, List, Optional, Tuple, Union
+from azure.mgmt.compute.aio import ComputeManagementClient
 from azure.core.exceptions import ResourceNotFoundError, HttpResponseError
 
 from tools.azure_tools.auth import (
-    get_azure_credential,
     get_subscription_id,
     get_resource_group
 )
+from tools.sap_inventory.vm_resources import get_clients, get_vm_cached, get_vm_resources, invalidate_vm_cache
+from tools.sap_inventory.vm_checks import CHECKS, get_vm_facts
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -41,6 +45,58 @@ SAP_VM_BEST_PRACTICES = {
     "backup_required": True
 }
 
+# Supported series as one prefix match, longest alternatives first
+_SERIES_RE = re.compile(
+    "^(?:" + "|".join(map(re.escape, sorted(SAP_VM_BEST_PRACTICES["supported_vm_series"], key=len, reverse=True))) + ")"
+)
+
+# Shared checks (see vm_checks.CHECKS) evaluated by check_vm_compliance, with the check
+# name, expected text, (passed, failed) actual texts and recommendation this tool reports
+COMPLIANCE_CHECK_TEXTS = {
+    "DB-0001": ("Premium Storage", "Yes", ("Yes", "No"), "Use Premium Storage for SAP workloads"),
+    "NET-0001": ("Accelerated Networking", "Enabled", ("Enabled", "Disabled"),
+                 "Enable Accelerated Networking for improved network performance"),
+    "HA-0001": ("Availability Set", "Yes", ("Yes", "No"),
+                "Deploy SAP VMs in an availability set for high availability"),
+}
+
+# Seconds a location's VM size list is reused before it is fetched again
+VM_SIZE_CACHE_TTL = 3600
+
+# (subscription_id, location) -> (fetch time, {size name: size})
+_VM_SIZE_CACHE: Dict[Tuple[str, str], Tuple[float, Dict[str, Any]]] = {}
+
+async def _get_vm_size(
+    compute_client: ComputeManagementClient,
+    subscription_id: str,
+    location: str,
+    vm_size: str,
+    ttl: float = VM_SIZE_CACHE_TTL
+) -> Optional[Any]:
+    """
+    Look up a VM size in the cached size list of a location
+    
+    The size list of a location is fetched only when it is not cached or
+    older than ttl seconds.
+    
+    Args:
+        compute_client (ComputeManagementClient): Compute management client
+        subscription_id (str): Subscription ID
+        location (str): Azure location
+        vm_size (str): VM size name
+        ttl (float): Seconds a fetched size list is reused
+        
+    Returns:
+        Optional[Any]: VM size details, or None if the size is not offered in the location
+    """
+    key = (subscription_id, location)
+    cached = _VM_SIZE_CACHE.get(key)
+    if cached is None or time.monotonic() - cached[0] > ttl:
+        sizes = {size.name: size async for size in compute_client.virtual_machine_sizes.list(location)}
+        cached = (time.monotonic(), sizes)
+        _VM_SIZE_CACHE[key] = cached
+    return cached[1].get(vm_size)
+
 async def check_vm_compliance(
     vm_name: str,
     sap_component_type: str = "HANA",  # Options: HANA, AnyDB, App
@@ -80,24 +136,35 @@ async def check_vm_compliance(
         # Get subscription ID from config if not provided
         subscription_id = get_subscription_id(subscription_id)
         
-        # Get Azure credential
-        credential = get_azure_credential()
-        
-        # Create Compute Management Client
-        compute_client = ComputeManagementClient(credential, subscription_id)
+        # Get the cached Azure clients on the shared connection pool
+        compute_client, network_client = get_clients(subscription_id)
         
         # Get VM details
         try:
-            vm = compute_client.virtual_machines.get(resource_group, vm_name, expand='instanceView')
-            nics = compute_client.virtual_machines.list_network_interfaces(resource_group, vm_name)
+            # One Resource Graph query returns the VM with its NICs; fall back to Get calls
+            vm_resources = await get_vm_resources(subscription_id, resource_group, vm_name)
+            if vm_resources:
+                vm, _, graph_nics = vm_resources
+            else:
+                vm = await get_vm_cached(compute_client, subscription_id, resource_group, vm_name)
+                graph_nics = {}
+            nic_refs = vm.network_profile.network_interfaces
+            missing_refs = [nic_ref for nic_ref in nic_refs if nic_ref.id.lower() not in graph_nics]
             
             # Get VM size details
             vm_size = vm.hardware_profile.vm_size
             vm_series = vm_size.split('_')[0]
             
-            # Get VM size data
-            vm_sizes = list(compute_client.virtual_machine_sizes.list(vm.location))
-            current_vm_size = next((s for s in vm_sizes if s.name == vm_size), None)
+            # Fetch the remaining NICs and the VM size data concurrently
+            current_vm_size, fetched_nics = await asyncio.gather(
+                _get_vm_size(compute_client, subscription_id, vm.location, vm_size),
+                asyncio.gather(*[
+                    network_client.network_interfaces.get(resource_group, nic_ref.id.split('/')[-1])
+                    for nic_ref in missing_refs
+                ])
+            )
+            graph_nics.update(zip((nic_ref.id.lower() for nic_ref in missing_refs), fetched_nics))
+            nics = [graph_nics[nic_ref.id.lower()] for nic_ref in nic_refs]
             
             compliance_checks = []
             all_compliant = True
@@ -107,7 +174,7 @@ async def check_vm_compliance(
                 "check_name": "VM Series",
                 "expected": ", ".join(SAP_VM_BEST_PRACTICES["supported_vm_series"]),
                 "actual": vm_series,
-                "compliant": any(vm_series.startswith(s) for s in SAP_VM_BEST_PRACTICES["supported_vm_series"]),
+                "compliant": _SERIES_RE.match(vm_series) is not None,
                 "recommendation": "Use a VM series certified for SAP workloads"
             }
             compliance_checks.append(series_check)
@@ -135,53 +202,22 @@ async def check_vm_compliance(
             compliance_checks.append(cores_check)
             all_compliant = all_compliant and cores_check["compliant"]
             
-            # Check premium storage
-            has_premium_storage = False
-            for disk in vm.storage_profile.data_disks:
-                if disk.managed_disk and disk.managed_disk.storage_account_type and 'Premium' in disk.managed_disk.storage_account_type:
-                    has_premium_storage = True
-                    break
-            
-            storage_check = {
-                "check_name": "Premium Storage",
-                "expected": "Yes",
-                "actual": "Yes" if has_premium_storage else "No",
-                "compliant": has_premium_storage,
-                "recommendation": "Use Premium Storage for SAP workloads"
-            }
-            compliance_checks.append(storage_check)
-            all_compliant = all_compliant and storage_check["compliant"]
-            
-            # Check accelerated networking
-            has_accelerated_networking = False
-            nic_list = list(nics)
-            for nic in nic_list:
-                if nic.enable_accelerated_networking:
-                    has_accelerated_networking = True
-                    break
-            
-            network_check = {
-                "check_name": "Accelerated Networking",
-                "expected": "Enabled",
-                "actual": "Enabled" if has_accelerated_networking else "Disabled",
-                "compliant": has_accelerated_networking,
-                "recommendation": "Enable Accelerated Networking for improved network performance"
-            }
-            compliance_checks.append(network_check)
-            all_compliant = all_compliant and network_check["compliant"]
-            
-            # Check if VM is in an availability set
-            in_availability_set = vm.availability_set is not None
-            
-            availability_check = {
-                "check_name": "Availability Set",
-                "expected": "Yes",
-                "actual": "Yes" if in_availability_set else "No",
-                "compliant": in_availability_set,
-                "recommendation": "Deploy SAP VMs in an availability set for high availability"
-            }
-            compliance_checks.append(availability_check)
-            all_compliant = all_compliant and availability_check["compliant"]
+            # Shared VM checks
+            facts = get_vm_facts(vm, nics)
+            for spec in CHECKS:
+                texts = COMPLIANCE_CHECK_TEXTS.get(spec.id)
+                if texts is None:
+                    continue
+                check_name, expected, actual, recommendation = texts
+                passed = spec.pred(facts)
+                compliance_checks.append({
+                    "check_name": check_name,
+                    "expected": expected,
+                    "actual": actual[0] if passed else actual[1],
+                    "compliant": passed,
+                    "recommendation": recommendation
+                })
+                all_compliant = all_compliant and passed
             
             return {
                 "status": "success",
@@ -194,6 +230,7 @@ async def check_vm_compliance(
             }
             
         except ResourceNotFoundError:
+            invalidate_vm_cache(subscription_id, resource_group)
             return {
                 "status": "error",
                 "message": f"VM {vm_name} not found in resource group {resource_group}"
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+SAP VM Resource Lookup Module
+
+This module fetches a VM together with its managed disks and network
+interfaces using a single Azure Resource Graph query, and serves VM lookups
+from a short-lived per resource group VM listing when Resource Graph cannot
+answer. It is shared by the quality check and VM compliance tools.
+"""
+import functools
+import json
+import logging
+import time
+from typing import Dict, Any, Optional, Tuple
+
+from azure.mgmt.compute.aio import ComputeManagementClient
+from azure.mgmt.compute.models import VirtualMachine, Disk
+from azure.mgmt.network.aio import NetworkManagementClient
+from azure.mgmt.network.models import NetworkInterface
+from azure.mgmt.resourcegraph.aio import ResourceGraphClient
+from azure.mgmt.resourcegraph.models import QueryRequest, QueryOptions, ResultFormat
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
+
+from tools.azure_tools.async_clients import get_async_credential, get_shared_transport
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# VM, the disks it manages and the NICs attached to it
+VM_RESOURCES_QUERY = """Resources
+| where (type =~ 'microsoft.compute/virtualmachines' and id =~ {vm_id})
+    or (type =~ 'microsoft.compute/disks' and managedBy =~ {vm_id})
+    or (type =~ 'microsoft.network/networkinterfaces' and tostring(properties.virtualMachine.id) =~ {vm_id})"""
+
+# Seconds a resource group's VM listing is reused before it is fetched again
+VM_LIST_CACHE_TTL = 60
+
+# (subscription_id, resource group) -> (fetch time, {lower-case VM name: VM})
+_VM_LIST_CACHE: Dict[Tuple[str, str], Tuple[float, Dict[str, VirtualMachine]]] = {}
+
+
+@functools.lru_cache(maxsize=8)
+def _clients(subscription_id: str, transport: Any) -> Tuple[ComputeManagementClient, NetworkManagementClient]:
+    """Return cached compute and network clients for a subscription on a transport"""
+    credential = get_async_credential()
+    return (
+        ComputeManagementClient(credential, subscription_id, transport=transport),
+        NetworkManagementClient(credential, subscription_id, transport=transport)
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _resource_graph_client(transport: Any) -> ResourceGraphClient:
+    """Return the cached Resource Graph client on a transport"""
+    return ResourceGraphClient(get_async_credential(), transport=transport)
+
+
+def get_clients(subscription_id: str) -> Tuple[ComputeManagementClient, NetworkManagementClient]:
+    """
+    Get the compute and network clients for a subscription
+
+    Clients are created once per subscription on the shared transport and
+    reused across tool invocations; they are recreated with the transport when
+    the event loop changes.
+
+    Args:
+        subscription_id (str): Subscription ID
+
+    Returns:
+        Tuple[ComputeManagementClient, NetworkManagementClient]: Compute and network clients
+    """
+    return _clients(subscription_id, get_shared_transport())
+
+
+async def get_vm_cached(
+    compute_client: Any,
+    subscription_id: str,
+    resource_group: str,
+    vm_name: str,
+    ttl: float = VM_LIST_CACHE_TTL
+) -> VirtualMachine:
+    """
+    Get a VM from the cached VM listing of its resource group
+
+    The VMs of a resource group (with instance view) are listed once and reused
+    for ttl seconds, so checks over many VMs of the same resource group do not
+    issue one Get call per VM. A VM missing from a cached listing triggers a
+    fresh listing before it is reported as not found.
+
+    Args:
+        compute_client: Async compute management client
+        subscription_id (str): Subscription ID
+        resource_group (str): Resource group name
+        vm_name (str): VM name
+        ttl (float): Seconds a listing is reused
+
+    Returns:
+        VirtualMachine: The VM
+
+    Raises:
+        ResourceNotFoundError: If the VM does not exist in the resource group
+    """
+    key = (subscription_id, resource_group.lower())
+    cached = _VM_LIST_CACHE.get(key)
+    if cached is not None and time.monotonic() - cached[0] <= ttl:
+        vm = cached[1].get(vm_name.lower())
+        if vm is not None:
+            return vm
+
+    vms = {
+        vm.name.lower(): vm
+        async for vm in compute_client.virtual_machines.list(resource_group, expand='instanceView')
+    }
+    _VM_LIST_CACHE[key] = (time.monotonic(), vms)
+    vm = vms.get(vm_name.lower())
+    if vm is None:
+        raise ResourceNotFoundError(f"VM {vm_name} not found in resource group {resource_group}")
+    return vm
+
+
+def invalidate_vm_cache(subscription_id: str, resource_group: str) -> None:
+    """
+    Drop the cached VM listing of a resource group
+
+    Args:
+        subscription_id (str): Subscription ID
+        resource_group (str): Resource group name
+    """
+    _VM_LIST_CACHE.pop((subscription_id, resource_group.lower()), None)
+
+
+async def get_vm_resources(
+    subscription_id: str,
+    resource_group: str,
+    vm_name: str
+) -> Optional[Tuple[VirtualMachine, Dict[str, Disk], Dict[str, NetworkInterface]]]:
+    """
+    Get a VM, its managed disks and its network interfaces with one Resource Graph query
+
+    Args:
+        subscription_id (str): Subscription ID
+        resource_group (str): Resource group name
+        vm_name (str): VM name
+
+    Returns:
+        Optional[Tuple[VirtualMachine, Dict[str, Disk], Dict[str, NetworkInterface]]]:
+        The VM, its disks keyed by lower-case name and its NICs keyed by lower-case
+        resource ID, or None if Resource Graph does not (yet) know the VM or the
+        query is rejected
+    """
+    vm_id = (
+        f"/subscriptions/{subscription_id}/resourceGroups/{resource_group}"
+        f"/providers/Microsoft.Compute/virtualMachines/{vm_name}"
+    )
+    query_request = QueryRequest(
+        subscriptions=[subscription_id],
+        query=VM_RESOURCES_QUERY.format(vm_id=json.dumps(vm_id)),
+        options=QueryOptions(result_format=ResultFormat.object_array)
+    )
+
+    try:
+        response = await _resource_graph_client(get_shared_transport()).resources(query_request)
+    except HttpResponseError as e:
+        logger.warning(f"Resource Graph query for VM {vm_name} failed: {e}")
+        return None
+
+    vm = None
+    disks = {}
+    nics = {}
+    for row in response.data:
+        resource_type = row["type"].lower()
+        if resource_type == "microsoft.compute/virtualmachines":
+            vm = VirtualMachine.deserialize(row)
+        elif resource_type == "microsoft.compute/disks":
+            disks[row["name"].lower()] = Disk.deserialize(row)
+        else:
+            nics[row["id"].lower()] = NetworkInterface.deserialize(row)
+
+    if vm is None:
+        return None
+    return vm, disks, nics
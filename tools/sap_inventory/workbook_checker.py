@@ -5,11 +5,19 @@ SAP Workbook Checker Tool
 This module executes specific KQL queries derived from the SAP on Azure 
 inventory checks workbook using Azure Resource Graph.
 """
+import asyncio
+import json
 import logging
-from typing import Dict, Any, List, Optional
-from azure.identity import DefaultAzureCredential
-from azure.mgmt.resourcegraph import ResourceGraphClient
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from string import Template
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Tuple
+from azure.mgmt.resourcegraph import ResourceGraphClient as SyncResourceGraphClient
+from azure.mgmt.resourcegraph.aio import ResourceGraphClient
 from azure.mgmt.resourcegraph.models import QueryRequest, QueryOptions, ResultFormat
+from azure.mgmt.resource.subscriptions.aio import SubscriptionClient
 from azure.core.exceptions import HttpResponseError
 
 from tools.azure_tools.auth import (
@@ -17,77 +25,348 @@ from tools.azure_tools.auth import (
     get_subscription_id
     # Assuming get_resource_group might be needed later if queries are RG specific
 )
+from tools.azure_tools.async_clients import get_async_credential, get_shared_transport
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Query Resource Graph with the aio client; set to False to fall back to the
+# synchronous client, which is then run on _ARG_POOL
+USE_ASYNC_CLIENT = True
+
+# Rows per Resource Graph page (the service maximum)
+RESOURCE_GRAPH_PAGE_SIZE = 1000
+
+# Attempts per Resource Graph query, the responses worth retrying and the
+# longest wait between attempts in seconds
+MAX_QUERY_ATTEMPTS = 4
+RETRYABLE_STATUS_CODES = frozenset({429, 503, 504})
+MAX_RETRY_DELAY = 60
+
+# Resource Graph accepts at most this many subscriptions per query
+MAX_SUBSCRIPTIONS_PER_QUERY = 1000
+
+# Seconds the list of accessible subscriptions is reused before it is fetched again
+SUBSCRIPTION_CACHE_TTL = 3600
+
+# (fetch time, subscription IDs) of the accessible subscriptions
+_SUBSCRIPTION_CACHE: Optional[tuple] = None
+
+# Seconds a check result is served from the cache
+QUERY_CACHE_TTL = 60
+
+# (check name, VIS IDs, subscriptions) -> (time, future of the query result); a
+# pending future is shared by identical checks running at the same time
+_QUERY_CACHE: Dict[tuple, Tuple[float, asyncio.Future]] = {}
+
+# Resource Graph client shared by all checks and the transport it was created on
+_ARG_CLIENT: Optional[ResourceGraphClient] = None
+_ARG_CLIENT_TRANSPORT: Any = None
+_ARG_CLIENT_LOCK = asyncio.Lock()
+
+# Worker threads running the synchronous fallback's queries
+_ARG_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix='arg')
+
+# Credential and client of the synchronous fallback
+_CREDENTIAL: Any = None
+_SYNC_ARG_CLIENT: Optional[SyncResourceGraphClient] = None
+_SYNC_ARG_CLIENT_LOCK = threading.Lock()
+
 # --- Placeholder for KQL Queries Extracted from Workbook ---
 # These should be populated with actual KQL from sap-inventory-checks.json
-# We need to carefully handle parameter substitution (e.g., {current_vis}, {Subscriptions})
+# Parameters are Template placeholders substituted with KQL literals: $vis_ids is a
+# dynamic array of the VIS IDs (for exact matches, "id in~ ($vis_ids)") and
+# $vis_children a predicate matching resources below them by id prefix
 WORKBOOK_KQL_QUERIES = {
     "vm_details_for_vis": """
         // Placeholder: Query to get VM details associated with a VIS ID
         resources
-        | where type =~ 'microsoft.workloads/sapvirtualinstances/centralinstances' 
-           or type =~ 'microsoft.workloads/sapvirtualinstances/databaseinstances'
-           or type =~ 'microsoft.workloads/sapvirtualinstances/applicationinstances'
-        | where id contains '{vis_id}' // Placeholder for VIS ID
+        | where $vis_children // Child resources of the VIS IDs of this batch
+        | where type in~ ('microsoft.workloads/sapvirtualinstances/centralinstances',
+                          'microsoft.workloads/sapvirtualinstances/databaseinstances',
+                          'microsoft.workloads/sapvirtualinstances/applicationinstances')
+        | extend visId = strcat_array(array_slice(split(id, '/'), 0, 8), '/')
         | mv-expand vm = properties.vmDetails
         | extend vmId = tostring(vm.virtualMachineId)
-        | project visId = id, vmId, instanceType = type
+        | project visId, instanceId = id, vmId, instanceType = type
         // Join with VM details if needed... requires more complex query
-        | limit 100 // Example limit
     """,
     "advisor_recommendations_for_vis": """
         // Placeholder: Query to get Advisor recommendations for resources under a VIS
         advisorresources
+        | where $vis_children // Recommendations for the VIS IDs of this batch or their children
         | where type =~ 'microsoft.advisor/recommendations'
         | where properties.lastUpdated >= ago(7d) // Example filter
-        | where id contains '{vis_id}' // Placeholder for VIS ID
-        | project recommendationId = name, resourceId = tostring(properties.resourceMetadata.resourceId), 
+        | extend visId = strcat_array(array_slice(split(id, '/'), 0, 8), '/')
+        | project visId, recommendationId = name, resourceId = tostring(properties.resourceMetadata.resourceId), 
                   impact = properties.impact, description = properties.shortDescription.solution, 
                   category = properties.category, lastUpdated = properties.lastUpdated
-        | limit 100 // Example limit
     """
     # Add more queries here as needed...
 }
 
+# Canonical ARM ID of a Virtual Instance for SAP solutions
+_VIS_ID_RE = re.compile(
+    r'^/subscriptions/[0-9a-f-]{36}/resourceGroups/[^/]+/providers/Microsoft\.Workloads/sapVirtualInstances/[^/]+$',
+    re.IGNORECASE
+)
+
+# Templates parsed once at import, and the checks that need VIS IDs
+_COMPILED_QUERIES = {name: Template(query) for name, query in WORKBOOK_KQL_QUERIES.items()}
+_VIS_ID_PARAMETERS = frozenset({"vis_ids", "vis_children"})
+_VIS_ID_CHECKS = frozenset(
+    name for name, template in _COMPILED_QUERIES.items()
+    if _VIS_ID_PARAMETERS.intersection(template.get_identifiers())
+)
+
+def _vis_children_predicate(vis_ids: List[str]) -> str:
+    """KQL predicate selecting the resources below the given VIS IDs by id prefix"""
+    return "(" + " or ".join(f"id startswith {json.dumps(vid + '/')}" for vid in vis_ids) + ")"
+
+async def _get_client() -> ResourceGraphClient:
+    """
+    Get the Resource Graph client shared by all workbook checks
+
+    The client is created on first use and recreated when the shared transport
+    changes (e.g. when running on a new event loop).
+
+    Returns:
+        ResourceGraphClient: Async Resource Graph client
+    """
+    global _ARG_CLIENT, _ARG_CLIENT_TRANSPORT
+
+    async with _ARG_CLIENT_LOCK:
+        transport = get_shared_transport()
+        if _ARG_CLIENT is None or _ARG_CLIENT_TRANSPORT is not transport:
+            _ARG_CLIENT = ResourceGraphClient(get_async_credential(), transport=transport)
+            _ARG_CLIENT_TRANSPORT = transport
+        return _ARG_CLIENT
+
+def _get_sync_client() -> SyncResourceGraphClient:
+    """Get the synchronous Resource Graph client, creating it and its credential on first use"""
+    global _CREDENTIAL, _SYNC_ARG_CLIENT
+
+    with _SYNC_ARG_CLIENT_LOCK:
+        if _SYNC_ARG_CLIENT is None:
+            if _CREDENTIAL is None:
+                _CREDENTIAL = get_azure_credential()
+            _SYNC_ARG_CLIENT = SyncResourceGraphClient(_CREDENTIAL)
+        return _SYNC_ARG_CLIENT
+
+def _reset_clients() -> None:
+    """Drop the cached credentials and clients so they are rebuilt on next use"""
+    global _ARG_CLIENT, _ARG_CLIENT_TRANSPORT, _CREDENTIAL, _SYNC_ARG_CLIENT
+
+    _ARG_CLIENT = None
+    _ARG_CLIENT_TRANSPORT = None
+    with _SYNC_ARG_CLIENT_LOCK:
+        _CREDENTIAL = None
+        _SYNC_ARG_CLIENT = None
+    get_async_credential.cache_clear()
+
+async def _list_subscriptions(ttl: float = SUBSCRIPTION_CACHE_TTL) -> List[str]:
+    """
+    List the IDs of all subscriptions the credential can access
+
+    The list is fetched once and reused for ttl seconds.
+
+    Args:
+        ttl (float): Seconds the list is reused
+
+    Returns:
+        List[str]: Subscription IDs
+    """
+    global _SUBSCRIPTION_CACHE
+
+    if _SUBSCRIPTION_CACHE is None or time.monotonic() - _SUBSCRIPTION_CACHE[0] > ttl:
+        subscription_client = SubscriptionClient(get_async_credential(), transport=get_shared_transport())
+        subscription_ids = [sub.subscription_id async for sub in subscription_client.subscriptions.list()]
+        _SUBSCRIPTION_CACHE = (time.monotonic(), subscription_ids)
+    return _SUBSCRIPTION_CACHE[1]
+
+def _retry_delay(error: HttpResponseError, attempt: int) -> float:
+    """Seconds to wait before retrying a throttled query: Retry-After if given, else exponential"""
+    retry_after = error.response.headers.get("Retry-After") if error.response is not None else None
+    try:
+        delay = float(retry_after) if retry_after else 2 ** attempt
+    except ValueError:
+        delay = 2 ** attempt
+    return min(delay, MAX_RETRY_DELAY)
+
+async def _query_resources(query_request: QueryRequest) -> Any:
+    """
+    Run a Resource Graph query without blocking the event loop
+
+    Throttled or temporarily unavailable queries (429, 503, 504) are retried,
+    waiting as long as the Retry-After header asks. If the cached credential is
+    rejected (401), the credential and clients are rebuilt and the query is
+    sent once more.
+
+    Args:
+        query_request (QueryRequest): Query to run
+
+    Returns:
+        Any: Query response
+
+    Raises:
+        HttpResponseError: If the query fails and no attempt is left
+    """
+    credential_refreshed = False
+    for attempt in range(MAX_QUERY_ATTEMPTS):
+        try:
+            if USE_ASYNC_CLIENT:
+                resource_graph_client = await _get_client()
+                return await resource_graph_client.resources(query_request)
+
+            return await asyncio.get_running_loop().run_in_executor(
+                _ARG_POOL, _get_sync_client().resources, query_request
+            )
+        except HttpResponseError as e:
+            # Only rebuild when an attempt is left to use it; otherwise the 401 is raised below
+            if e.status_code == 401 and not credential_refreshed and attempt < MAX_QUERY_ATTEMPTS - 1:
+                logger.warning("Resource Graph rejected the cached credential, rebuilding it")
+                _reset_clients()
+                credential_refreshed = True
+                continue
+            if e.status_code not in RETRYABLE_STATUS_CODES or attempt == MAX_QUERY_ATTEMPTS - 1:
+                raise
+            delay = _retry_delay(e, attempt)
+            logger.warning(
+                f"Resource Graph query failed with {e.status_code} "
+                f"(attempt {attempt + 1}/{MAX_QUERY_ATTEMPTS}), retrying in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+
+async def _query_all_pages(query_request: QueryRequest) -> List[Dict[str, Any]]:
+    """
+    Run a Resource Graph query and follow its skip tokens until all rows are read
+
+    Args:
+        query_request (QueryRequest): Query to run
+
+    Returns:
+        List[Dict[str, Any]]: Rows of all pages
+    """
+    rows = []
+    while True:
+        query_response = await _query_resources(query_request)
+        rows.extend(query_response.data)
+        if not query_response.skip_token:
+            return rows
+        query_request.options.skip_token = query_response.skip_token
+
+def invalidate_workbook_cache(check_name: Optional[str] = None) -> None:
+    """
+    Drop cached workbook check results
+
+    Args:
+        check_name (str, optional): Only drop results of this check. Defaults to all checks.
+    """
+    for key in list(_QUERY_CACHE):
+        if check_name is None or key[0] == check_name:
+            del _QUERY_CACHE[key]
+
+def _evict(key: tuple, future: asyncio.Future) -> None:
+    """Drop a cache entry if it still holds the given result"""
+    entry = _QUERY_CACHE.get(key)
+    if entry is not None and entry[1] is future:
+        del _QUERY_CACHE[key]
+
+async def _cached(key: tuple, run: Callable[[], Awaitable[Any]], ttl: float = QUERY_CACHE_TTL) -> Any:
+    """
+    Run a query once per key and TTL, sharing a pending run with concurrent callers
+
+    Args:
+        key (tuple): Cache key
+        run (Callable[[], Awaitable[Any]]): Runs the query
+        ttl (float): Seconds a result is reused
+
+    Returns:
+        Any: Query result
+    """
+    entry = _QUERY_CACHE.get(key)
+    if entry is not None and (not entry[1].done() or time.monotonic() - entry[0] <= ttl):
+        return await asyncio.shield(entry[1])
+
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    _QUERY_CACHE[key] = (time.monotonic(), future)
+    try:
+        result = await run()
+    except BaseException as e:
+        # Failures are not cached; waiting callers see the same error
+        _evict(key, future)
+        if isinstance(e, asyncio.CancelledError):
+            future.cancel()
+        else:
+            future.set_exception(e)
+            future.exception()  # Mark as retrieved when nobody else waits
+        raise
+
+    future.set_result(result)
+    _QUERY_CACHE[key] = (time.monotonic(), future)
+    loop.call_later(ttl, _evict, key, future)
+    return result
+
 async def run_sap_workbook_check(
     check_name: str,
     vis_id: Optional[str] = None, # Virtual Instance for SAP solutions resource ID
     subscription_ids: Optional[List[str]] = None, # Target subscription(s)
-    auth_context: Optional[Dict[str, Any]] = None
+    auth_context: Optional[Dict[str, Any]] = None,
+    vis_ids: Optional[List[str]] = None # Several VIS resource IDs checked in one query
 ) -> Dict[str, Any]:
     """
     Runs a specific KQL query check from the SAP Inventory Workbook definition.
 
+    All VIS IDs (vis_id and vis_ids) are checked with a single Resource Graph query.
+
     Args:
         check_name (str): The key of the query to run (must exist in WORKBOOK_KQL_QUERIES).
         vis_id (str, optional): The Azure Resource ID of the VIS to scope the query.
         subscription_ids (List[str], optional): List of subscription IDs to query. 
-                                                 Uses default from context/config if None.
+                                                 Uses the subscriptions of the VIS IDs,
+                                                 or the default from context/config if None.
         auth_context (Dict[str, Any], optional): Authentication context (potentially for permissions).
+        vis_ids (List[str], optional): Azure Resource IDs of several VIS to scope the query.
 
     Returns:
         Dict[str, Any]: Dictionary with 'status' ('success' or 'error') and 'data' or 'message'.
+                        Rows carrying a visId are also returned grouped by VIS in 'data_by_vis'.
     """
     if check_name not in WORKBOOK_KQL_QUERIES:
         return {"status": "error", "message": f"Unknown check name: {check_name}"}
 
-    kql_query_template = WORKBOOK_KQL_QUERIES[check_name]
+    all_vis_ids = list(dict.fromkeys(([vis_id] if vis_id else []) + list(vis_ids or [])))
+
+    # Reject malformed VIS IDs before spending a query on them
+    invalid_vis_ids = [vid for vid in all_vis_ids if not _VIS_ID_RE.match(vid)]
+    if invalid_vis_ids:
+        return {"status": "error", "message": f"Invalid VIS resource ID: {', '.join(invalid_vis_ids)}"}
 
     # --- Parameter Substitution ---
-    # Basic substitution for vis_id. More complex parameter handling might be needed
-    # for things like subscription lists used within the KQL itself.
-    if '{vis_id}' in kql_query_template:
-        if not vis_id:
+    # The VIS IDs are inlined as a JSON encoded dynamic array, which also escapes quotes
+    if check_name in _VIS_ID_CHECKS:
+        if not all_vis_ids:
              return {"status": "error", "message": f"Check '{check_name}' requires a vis_id parameter."}
-        kql_query = kql_query_template.replace('{vis_id}', vis_id)
+        kql_query = _COMPILED_QUERIES[check_name].substitute(
+            vis_ids=f"dynamic({json.dumps(all_vis_ids)})",
+            vis_children=_vis_children_predicate(all_vis_ids)
+        )
     else:
-        kql_query = kql_query_template
+        kql_query = WORKBOOK_KQL_QUERIES[check_name]
         
-    # Handle subscriptions
+    # Handle subscriptions; VIS IDs carry their subscription
     target_subscriptions = subscription_ids
+    if not target_subscriptions and all_vis_ids:
+        target_subscriptions = list(dict.fromkeys(
+            vid.split('/')[2] for vid in all_vis_ids if vid.lower().startswith('/subscriptions/')
+        ))
+    if not target_subscriptions:
+        try:
+            # Query every accessible subscription at once
+            target_subscriptions = await _list_subscriptions()
+        except HttpResponseError as e:
+            logger.warning(f"Could not list subscriptions, using the default subscription: {e}")
     if not target_subscriptions:
         try:
             # Attempt to get default subscription ID if none provided
@@ -100,7 +379,7 @@ async def run_sap_workbook_check(
              logger.error(f"Error getting default subscription ID: {e}")
              return {"status": "error", "message": f"Error getting default subscription ID: {e}"}
 
-    logger.info(f"Running workbook check '{check_name}' on subscriptions: {target_subscriptions}")
+    logger.info(f"Running workbook check '{check_name}' on {len(target_subscriptions)} subscription(s)")
     # logger.debug(f"Executing KQL: {kql_query}") # Be careful logging full queries if they contain sensitive info
 
     try:
@@ -109,26 +388,46 @@ async def run_sap_workbook_check(
         # if auth_context and not auth_context.get("permissions", {}).get("AZURE_RESOURCEGRAPH_READ", False):
         #     return {"status": "error", "message": "Permission denied: AZURE_RESOURCEGRAPH_READ required"}
 
-        credential = get_azure_credential()
-        resource_graph_client = ResourceGraphClient(credential)
+        # One query covers all subscriptions, unless there are more than
+        # Resource Graph accepts in a single request
+        query_requests = [
+            QueryRequest(
+                subscriptions=target_subscriptions[start:start + MAX_SUBSCRIPTIONS_PER_QUERY],
+                query=kql_query,
+                options=QueryOptions(
+                    result_format=ResultFormat.object_array, # Use objectArray for easier JSON parsing
+                    top=RESOURCE_GRAPH_PAGE_SIZE
+                )
+            )
+            for start in range(0, len(target_subscriptions), MAX_SUBSCRIPTIONS_PER_QUERY)
+        ]
 
-        # Construct the query request
-        query_request = QueryRequest(
-            subscriptions=target_subscriptions,
-            query=kql_query,
-            options=QueryOptions(result_format=ResultFormat.object_array) # Use objectArray for easier JSON parsing
+        # Execute the query, or reuse the result of an identical recent check
+        cache_key = (
+            check_name,
+            frozenset(vid.lower() for vid in all_vis_ids),
+            frozenset(target_subscriptions)
+        )
+        pages = await _cached(
+            cache_key,
+            lambda: asyncio.gather(*[_query_all_pages(query_request) for query_request in query_requests])
         )
+        data = [row for rows in pages for row in rows]
+        total_records = len(data)
 
-        # Execute the query
-        query_response = resource_graph_client.resources(query_request)
+        logger.info(f"Check '{check_name}' query completed. Found {total_records} records.")
 
-        logger.info(f"Check '{check_name}' query completed. Found {query_response.total_records} records.")
+        data_by_vis = {}
+        for row in data:
+            if "visId" in row:
+                data_by_vis.setdefault(row["visId"], []).append(row)
 
         return {
             "status": "success",
             "check_name": check_name,
-            "record_count": query_response.total_records,
-            "data": query_response.data # This will be a list of dictionaries
+            "record_count": total_records,
+            "data": data, # This will be a list of dictionaries
+            "data_by_vis": data_by_vis
         }
 
     except HttpResponseError as e:
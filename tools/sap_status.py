@@ -2,9 +2,11 @@
 """
 SAP System Status Check Tool
 """
+import asyncio
 import logging
 import re
-import json
+import shlex
+from collections import deque
 from datetime import datetime
 from pathlib import Path
 import sys
@@ -14,13 +16,25 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from core.command_executor import CommandExecutor
 from auth.authentication import Authentication
+from tools.command_executor import get_sap_shell
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Logging is configured by the application; stay silent until it is
 logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Maximum number of hosts checked at the same time by check_sap_status_many
+MAX_CONCURRENT_STATUS_CHECKS = 16
+
+# Output lines kept to report why a status command failed
+ERROR_OUTPUT_LINES = 20
+
+# One instance line of GetSystemInstanceList: "<n>: hostname, instance, features, dispstatus, pid"
+_INSTANCE_RE = re.compile(
+    r'^\d+:\s*([^,:]*?)\s*(?::[^,]*)?,\s*([^,]*?)\s*,\s*([^,]*?)\s*,\s*([^,]*?)\s*,\s*([^,]*?)\s*(?:,|$)'
+)
+
+# One field of GetSystemInstanceList in "-format script" output: "<n> <key>: <value>"
+_SCRIPT_FIELD_RE = re.compile(r'^(\d+) (\w+): ?(.*?)\s*$')
 
 class SAPStatusTool:
     """Tool for checking SAP system status"""
@@ -58,13 +72,10 @@ class SAPStatusTool:
         sid_lower = sid.lower()
         
         # Execute sapcontrol command
-        sapcontrol_cmd = f"sapcontrol -nr {instance_number} -function GetSystemInstanceList"
-        
-        # If using <sid>adm user, wrap command
-        command = f"su - {sid_lower}adm -c '{sapcontrol_cmd}'"
+        sapcontrol_cmd = f"sapcontrol -nr {shlex.quote(str(instance_number))} -format script -function GetSystemInstanceList"
         
-        # Execute the command
-        return_code, stdout, stderr = self.executor.execute_command(host, command, auth_context)
+        # Execute the command as <sid>adm and parse the output
+        return_code, instances, stderr = self._run_status_command(host, sid_lower, sapcontrol_cmd, auth_context)
         
         # Check for errors
         if return_code != 0:
@@ -74,23 +85,6 @@ class SAPStatusTool:
                 "message": f"Failed to get SAP status: {stderr}"
             }
         
-        # Parse the output
-        instances = []
-        instance_pattern = re.compile(r'^(\d+):.*')
-        
-        for line in stdout.split('\n'):
-            if instance_pattern.match(line):
-                parts = line.split(',')
-                if len(parts) >= 5:
-                    instance = {
-                        "hostname": parts[0].split(':')[1].strip(),
-                        "instance": parts[1].strip(),
-                        "features": parts[2].strip(),
-                        "dispstatus": parts[3].strip(),
-                        "pid": parts[4].strip()
-                    }
-                    instances.append(instance)
-        
         # Return the structured data
         return {
             "status": "success",
@@ -98,3 +92,112 @@ class SAPStatusTool:
             "instances": instances,
             "timestamp": datetime.now().isoformat()
         }
+    
+    def _run_status_command(self, host, sid_lower, sapcontrol_cmd, auth_context):
+        """
+        Run a status command as <sid>adm and parse the instances from its output
+        
+        The persistent SAP shell is preferred, so the <sid>adm login is not
+        repeated for every check; its output is parsed while it is read. A
+        fresh su login is used if the shell is unavailable.
+        
+        Returns:
+            tuple: (return_code, instances, error_output)
+        """
+        try:
+            shell = get_sap_shell(host, sid_lower)
+            result = {}
+            tail = deque(maxlen=ERROR_OUTPUT_LINES)
+            
+            def _lines():
+                lines = shell.stream(sapcontrol_cmd)
+                while True:
+                    try:
+                        line = next(lines)
+                    except StopIteration as stop:
+                        result["return_code"] = stop.value
+                        return
+                    tail.append(line)
+                    yield line
+            
+            instances = list(self.iter_instances(_lines()))
+            return_code = result["return_code"]
+            return return_code, instances, "".join(tail) if return_code != 0 else ""
+        except Exception as e:
+            logger.warning(f"Persistent SAP shell unavailable on {host}, falling back to su: {e}")
+        
+        # Run as <sid>adm user; CommandExecutor takes a command string, so the inner
+        # command is quoted as a single argument to su
+        command_argv = ["su", "-", f"{sid_lower}adm", "-c", sapcontrol_cmd]
+        return_code, stdout, stderr = self.executor.execute_command(host, shlex.join(command_argv), auth_context)
+        return return_code, self.parse_instance_list(stdout) if return_code == 0 else [], stderr
+    
+    async def check_sap_status_many(self, targets, auth_context=None):
+        """
+        Check the status of several SAP systems concurrently
+        
+        Parameters:
+            targets (list): (sid, instance_number, host) tuples
+            auth_context (dict): Authentication context
+            
+        Returns:
+            list: System status information per target, in the order of targets
+        """
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_STATUS_CHECKS)
+        
+        async def _check_one(sid, instance_number, host):
+            async with semaphore:
+                return await asyncio.to_thread(self.check_sap_status, sid, instance_number, host, auth_context)
+        
+        return await asyncio.gather(*[_check_one(*target) for target in targets])
+    
+    @staticmethod
+    def _script_instance(fields):
+        """Build an instance dict from the fields of one "-format script" instance"""
+        return {
+            "hostname": fields.get("hostname", ""),
+            "instance": fields.get("instanceNr", ""),
+            "features": fields.get("features", ""),
+            "dispstatus": fields.get("dispstatus", ""),
+            "pid": fields.get("pid", "")
+        }
+    
+    @staticmethod
+    def iter_instances(lines):
+        """
+        Yield instance dicts from GetSystemInstanceList output lines as they are read
+        
+        Handles "-format script" output, where every field is a "<n> <key>: <value>"
+        line, and falls back to the comma separated list format for older sapcontrol.
+        """
+        current_index = None
+        fields = {}
+        for line in lines:
+            match = _SCRIPT_FIELD_RE.match(line)
+            if match:
+                index, key, value = match.groups()
+                if index != current_index:
+                    if fields:
+                        yield SAPStatusTool._script_instance(fields)
+                    current_index, fields = index, {}
+                fields[key] = value
+                continue
+            
+            match = _INSTANCE_RE.match(line)
+            if match:
+                hostname, instance, features, dispstatus, pid = match.groups()
+                yield {
+                    "hostname": hostname,
+                    "instance": instance,
+                    "features": features,
+                    "dispstatus": dispstatus,
+                    "pid": pid
+                }
+        
+        if fields:
+            yield SAPStatusTool._script_instance(fields)
+    
+    @staticmethod
+    def parse_instance_list(stdout):
+        """Parse sapcontrol GetSystemInstanceList output into instance dicts"""
+        return list(SAPStatusTool.iter_instances(stdout.splitlines()))
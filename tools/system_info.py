@@ -5,143 +5,488 @@ This module provides tools for retrieving various system information from SAP HA
 including backup catalog, system configuration, and other administrative information.
 """
 
+import asyncio
+import functools
+import itertools
 import logging
-import json
-import decimal
-from typing import Any, Dict, List
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 
-from hana_connection import hana_connection, execute_query
+from hana_connection import execute_query, execute_query_iter, execute_prepared
+from connection_pool import get_pool
+from tools._formatting import format_result_content, format_table
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Custom JSON encoder for handling Decimal objects (copied from utils to avoid circular imports)
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, o):
-        if isinstance(o, decimal.Decimal):
-            return float(o)
-        return super().default(o)
-
-# Format utilities (copied from utils to avoid circular imports)
-def format_result_content(result: Any) -> List[Dict[str, Any]]:
-    """Format result into MCP content format."""
-    if isinstance(result, str):
-        return [{"type": "text", "text": result}]
-    elif isinstance(result, dict):
-        if "error" in result:
-            return [{"type": "text", "text": f"Error: {result['error']}"}]
-        else:
-            # Format dictionary as markdown table
-            return [{"type": "text", "text": json.dumps(result, indent=2, cls=DecimalEncoder)}]
-    elif isinstance(result, list):
-        if not result:
-            return [{"type": "text", "text": "No results found."}]
+# Seconds the column names of a view are reused before they are probed again
+_COLUMN_TTL = 3600
+
+# (schema, view, "system"/"tenant") -> (probe time, column names)
+_COLUMN_CACHE: Dict[Tuple[str, str, str], Tuple[float, List[str]]] = {}
+
+# Column names of views; {views} holds one bound (schema, view) predicate per view
+_COLUMNS_QUERY = """
+SELECT SCHEMA_NAME, TABLE_NAME, COLUMN_NAME 
+FROM SYS.TABLE_COLUMNS 
+WHERE {views}
+"""
+
+# All (schema, view) pairs the tools in this module query; they are probed together
+_SYSTEM_INFO_VIEWS = (
+    ('SYS', 'M_BACKUP_CATALOG'),
+    ('SYS', 'M_BACKUP_CATALOG_FILES'),
+    ('SYS', 'M_DATABASE'),
+    ('SYS', 'M_TABLES'),
+    ('PUBLIC', 'M_TABLE_PERSISTENCE_STATISTICS'),
+)
+
+# (tool name, use_system_db, tool arguments...) -> (expiry time, tool response)
+_RESULT_CACHE: Dict[tuple, Tuple[float, Dict[str, Any]]] = {}
+
+# One lock per result cache key, so concurrent misses run the tool only once;
+# a lock is dropped together with its cache entry
+_RESULT_LOCKS: Dict[tuple, asyncio.Lock] = {}
+
+# Default and maximum number of backup catalog entries returned (execute_query's row cap)
+BACKUP_CATALOG_LIMIT = 200
+MAX_BACKUP_CATALOG_LIMIT = 1000
+
+def _query_table(conn, query: str, params: Optional[list] = None) -> Union[str, Dict[str, str]]:
+    """Run a query and render its rows into a markdown table as they are fetched.
+
+    Returns the table, or an error dictionary like execute_query if the query fails.
+    """
+    try:
+        return format_table(execute_query_iter(conn, query, params))
+    except Exception as e:
+        logger.error("Error executing query: %s", e)
+        return {"error": str(e)}
+
+def _cached_columns(schema: str, table: str, use_system_db: bool) -> Optional[List[str]]:
+    """Get the cached column names of a system view, or None if it was not probed recently."""
+    cached = _COLUMN_CACHE.get((schema, table, "system" if use_system_db else "tenant"))
+    if cached is not None and time.monotonic() - cached[0] < _COLUMN_TTL:
+        return cached[1]
+    return None
+
+def _get_columns_many(conn, views: List[Tuple[str, str]], use_system_db: bool) -> Dict[Tuple[str, str], List[str]]:
+    """Get the column names of several views, probing the uncached ones in one query.
+
+    A probe also refreshes every other view of this module that is not
+    cached, so a cold start costs a single query for all tools.
+    Column names are cached per database for _COLUMN_TTL seconds.
+
+    Raises:
+        RuntimeError: If the columns could not be queried; failures are not cached
+    """
+    column_names: Dict[Tuple[str, str], List[str]] = {}
+    for view in views:
+        cached = _cached_columns(*view, use_system_db)
+        if cached is not None:
+            column_names[view] = cached
+
+    if len(column_names) < len(views):
+        missing = [view for view in views if view not in column_names]
+        missing += [
+            view for view in _SYSTEM_INFO_VIEWS
+            if view not in missing and _cached_columns(*view, use_system_db) is None
+        ]
+        column_names.update(preload_schema(conn, use_system_db, missing))
+
+    return column_names
+
+def preload_schema(
+    conn,
+    use_system_db: bool,
+    views: Optional[List[Tuple[str, str]]] = None
+) -> Dict[Tuple[str, str], List[str]]:
+    """Probe the column names of views with one query and cache them.
+
+    Args:
+        conn: HANA connection
+        use_system_db: Whether conn is a system database connection
+        views: (schema, view) pairs to probe, defaults to all views of this module
+
+    Returns:
+        The column names by (schema, view); views that do not exist have none
+
+    Raises:
+        RuntimeError: If the columns could not be queried; failures are not cached
+    """
+    views = list(views or _SYSTEM_INFO_VIEWS)
+    query = _COLUMNS_QUERY.format(views=" OR ".join(["(SCHEMA_NAME = ? AND TABLE_NAME = ?)"] * len(views)))
+    columns = execute_prepared(conn, query, [name for view in views for name in view])
+    if isinstance(columns, dict):
+        raise RuntimeError(columns.get("error", "Unexpected column query result"))
+
+    fetched: Dict[Tuple[str, str], List[str]] = {view: [] for view in views}
+    for col in columns:
+        fetched[(col['SCHEMA_NAME'], col['TABLE_NAME'])].append(col['COLUMN_NAME'])
+    db_tag = "system" if use_system_db else "tenant"
+    now = time.monotonic()
+    for (schema, table), names in fetched.items():
+        logger.info("Available columns in %s.%s: %s", schema, table, names)
+        _COLUMN_CACHE[(schema, table, db_tag)] = (now, names)
+    return fetched
+
+def _evict_expired_results() -> None:
+    """Drop the expired tool responses and the locks of their cache keys."""
+    now = time.monotonic()
+    for key in [key for key, (expires, _) in _RESULT_CACHE.items() if expires <= now]:
+        del _RESULT_CACHE[key]
+        _drop_result_lock(key)
+
+def _drop_result_lock(key: tuple) -> None:
+    """Drop the lock of a result cache key unless a call is holding it."""
+    lock = _RESULT_LOCKS.get(key)
+    if lock is not None and not lock.locked():
+        del _RESULT_LOCKS[key]
+
+def cached_tool(ttl: float) -> Callable[[Callable[..., Awaitable[Dict[str, Any]]]], Callable[..., Awaitable[Dict[str, Any]]]]:
+    """Cache a tool's successful responses per (tool, use_system_db, arguments) for ttl seconds.
+
+    Responses with isError set, which the tools also use for failed queries,
+    are not cached. Concurrent calls that miss the cache wait for the first one
+    instead of querying HANA themselves. Passing refresh=True bypasses the
+    cached response.
+    """
+    def decorator(func: Callable[..., Awaitable[Dict[str, Any]]]) -> Callable[..., Awaitable[Dict[str, Any]]]:
+        @functools.wraps(func)
+        async def wrapper(use_system_db: bool = True, *args: Any, refresh: bool = False, **kwargs: Any) -> Dict[str, Any]:
+            key = (func.__name__, use_system_db, *args, *sorted(kwargs.items()))
+            _evict_expired_results()
+            lock = _RESULT_LOCKS.setdefault(key, asyncio.Lock())
+            async with lock:
+                cached = _RESULT_CACHE.get(key)
+                if not refresh and cached is not None and time.monotonic() < cached[0]:
+                    return cached[1]
+
+                result = await func(use_system_db, *args, **kwargs)
+                if result.get("isError"):
+                    _RESULT_CACHE.pop(key, None)
+                else:
+                    _RESULT_CACHE[key] = (time.monotonic() + ttl, result)
+            if key not in _RESULT_CACHE:
+                _drop_result_lock(key)
+            return result
+        return wrapper
+    return decorator
+
+def _is_query_error(result: Any) -> bool:
+    """Check whether an execute_query result is an error instead of rows."""
+    return isinstance(result, dict) and "error" in result
+
+def _run_for_columns(
+    conn,
+    views: Dict[Tuple[str, str], List[str]],
+    build_query: Callable[[Dict[str, List[str]]], str],
+    use_system_db: bool,
+    params: Optional[list] = None,
+    build_fallback_query: Optional[Callable[[Dict[str, List[str]]], Optional[str]]] = None,
+    execute: Callable[..., Any] = execute_query
+) -> Tuple[Any, Dict[str, List[str]]]:
+    """Run the query built for the available columns of some system views.
+
+    Views that were not probed yet are assumed to have their standard columns,
+    so in the common case the query runs without a probe round-trip first. The
+    columns are only probed, and the query rebuilt and rerun, when that fails.
+    If the query for the known columns fails too, the simpler fallback query
+    built for the same columns is run instead.
+
+    Args:
+        conn: HANA connection
+        views: Standard column names by (schema, view)
+        build_query: Builds the query from the column names by view name
+        use_system_db: Whether conn is a system database connection
+        params: Bind parameters of the queries
+        build_fallback_query: Builds the fallback query from the column names by view
+            name, or returns None if there is none
+        execute: Runs a query, returning an error dictionary on failure like execute_query
+
+    Returns:
+        The query result and the column names by view name the query was built for
+    """
+    column_names: Dict[str, List[str]] = {}
+    probed = True
+    for (schema, table), standard_columns in views.items():
+        cached = _cached_columns(schema, table, use_system_db)
+        if cached is None:
+            cached = standard_columns
+            probed = False
+        column_names[table] = cached
+    
+    query = build_query(column_names)
+    result = execute(conn, query, params)
+    if not _is_query_error(result):
+        return result, column_names
+    
+    if not probed:
+        # The assumed columns do not match this HANA version; check what is available
+        try:
+            probed_columns = _get_columns_many(conn, list(views), use_system_db)
+            column_names.update((table, names) for (_, table), names in probed_columns.items())
+        except Exception as e:
+            logger.error("Error checking available columns: %s", e)
+            return result, column_names
         
-        if isinstance(result[0], dict):
-            # Format list of dictionaries as markdown table
-            table_str = "| " + " | ".join(result[0].keys()) + " |\n"
-            table_str += "| " + " | ".join(["---"] * len(result[0].keys())) + " |\n"
-            
-            for row in result:
-                # Convert any Decimal values to float
-                formatted_values = []
-                for val in row.values():
-                    if isinstance(val, decimal.Decimal):
-                        formatted_values.append(str(float(val)))
-                    else:
-                        formatted_values.append(str(val))
-                
-                table_str += "| " + " | ".join(formatted_values) + " |\n"
-            
-            return [{"type": "text", "text": table_str}]
-        else:
-            # Format list as bullet points
-            bullet_list = "\n".join([f"* {item}" for item in result])
-            return [{"type": "text", "text": bullet_list}]
+        probed_query = build_query(column_names)
+        if probed_query != query:
+            query = probed_query
+            result = execute(conn, query, params)
+            if not _is_query_error(result):
+                return result, column_names
+    
+    fallback_query = build_fallback_query(column_names) if build_fallback_query else None
+    if fallback_query is not None and fallback_query != query:
+        logger.error("Query failed with the available columns, using fallback query: %s", result['error'])
+        result = execute(conn, fallback_query, params)
+    return result, column_names
+
+# Backup catalog query by ORDER BY column; fixed statement texts keep HANA's plan cache hits.
+# The row limit is bound as a parameter so it does not change the text.
+_BACKUP_CATALOG_QUERIES = {
+    "ENTRY_ID": "SELECT * FROM SYS.M_BACKUP_CATALOG ORDER BY ENTRY_ID DESC LIMIT ?",
+    "ENTERY_ID": "SELECT * FROM SYS.M_BACKUP_CATALOG ORDER BY ENTERY_ID DESC LIMIT ?",
+    "START_TIME": "SELECT * FROM SYS.M_BACKUP_CATALOG ORDER BY START_TIME DESC LIMIT ?",
+    None: "SELECT * FROM SYS.M_BACKUP_CATALOG LIMIT ?",
+}
+
+# M_DATABASE columns of the database information fallback query, and the query for each
+# subset of them that exists (in this order)
+_DB_INFO_FALLBACK_COLUMNS = ("DATABASE_NAME", "DESCRIPTION", "ACTIVE_STATUS", "HOST")
+_DB_INFO_FALLBACK_QUERIES = {
+    columns: f"SELECT {', '.join(columns)} FROM SYS.M_DATABASE"
+    for count in range(1, len(_DB_INFO_FALLBACK_COLUMNS) + 1)
+    for columns in itertools.combinations(_DB_INFO_FALLBACK_COLUMNS, count)
+}
+
+def _backup_catalog_query(column_names: Dict[str, List[str]]) -> str:
+    """Build the backup catalog query for the available M_BACKUP_CATALOG columns."""
+    catalog_column_names = column_names['M_BACKUP_CATALOG']
+    
+    # Check if ENTRY_ID column exists (it might be ENTRY_ID or ENTERY_ID due to typo in query)
+    has_entry_id = "ENTRY_ID" in catalog_column_names
+    has_entery_id = "ENTERY_ID" in catalog_column_names
+    
+    # Pick the ORDER BY column based on available columns
+    if has_entry_id:
+        order_by_column = "ENTRY_ID"
+    elif has_entery_id:
+        order_by_column = "ENTERY_ID"
     else:
-        # Default formatting for other types
-        return [{"type": "text", "text": str(result)}]
+        # If neither column exists, try to use START_TIME or fall back to no ordering
+        order_by_column = "START_TIME" if "START_TIME" in catalog_column_names else None
+    
+    return _BACKUP_CATALOG_QUERIES[order_by_column]
+
+def _backup_catalog_fallback_query(column_names: Dict[str, List[str]]) -> str:
+    """Build the unordered backup catalog query used when the ordered one fails."""
+    return _BACKUP_CATALOG_QUERIES[None]
+
+def _db_info_fallback_query(column_names: Dict[str, List[str]]) -> str:
+    """Build the M_DATABASE query for only the columns that are likely to exist."""
+    fallback_columns = tuple(col for col in _DB_INFO_FALLBACK_COLUMNS if col in column_names['M_DATABASE'])
+    if fallback_columns:
+        return _DB_INFO_FALLBACK_QUERIES[fallback_columns]
+    # Last resort - try with just one column
+    return _DB_INFO_FALLBACK_QUERIES[("DATABASE_NAME",)]
 
-async def get_backup_catalog(use_system_db: bool = True) -> Dict[str, Any]:
+def _failed_backups_query(column_names: Dict[str, List[str]]) -> str:
+    """Build the failed backups query for the available backup catalog columns."""
+    catalog_column_names = column_names['M_BACKUP_CATALOG']
+    files_column_names = column_names['M_BACKUP_CATALOG_FILES']
+    
+    # Check if required columns exist for the join
+    has_entry_id_catalog = "ENTRY_ID" in catalog_column_names
+    has_entry_id_files = "ENTRY_ID" in files_column_names
+    
+    # Check if we have the state column for filtering
+    has_state_name = "STATE_NAME" in catalog_column_names
+    
+    # Build the query based on available columns
+    if has_entry_id_catalog and has_entry_id_files and has_state_name:
+        # We can perform the full query with join and filtering
+        return """
+        SELECT C.BACKUP_ID, 
+               C.ENTRY_TYPE_NAME AS BACKUP_TYPE, 
+               C.SYS_START_TIME, 
+               C.SYS_END_TIME AS SYS_STOP_TIME, 
+               C.STATE_NAME AS STATE, 
+               C.MESSAGE AS ADDITIONAL_INFORMATION, 
+               F.SERVICE_TYPE_NAME AS SERVICE, 
+               F.SOURCE_ID, 
+               F.SOURCE_TYPE_NAME AS SOURCE_TYPE, 
+               F.DESTINATION_PATH 
+        FROM SYS.M_BACKUP_CATALOG C, SYS.M_BACKUP_CATALOG_FILES F 
+        WHERE C.ENTRY_ID = F.ENTRY_ID 
+          AND (C.STATE_NAME = 'failed' OR C.STATE_NAME = 'canceled') 
+        ORDER BY C.BACKUP_ID DESC
+        LIMIT 500
+        """
+    elif has_state_name:
+        # We can at least filter for failed backups from the catalog
+        return """
+        SELECT BACKUP_ID, 
+               ENTRY_TYPE_NAME AS BACKUP_TYPE, 
+               SYS_START_TIME, 
+               SYS_END_TIME AS SYS_STOP_TIME, 
+               STATE_NAME AS STATE, 
+               MESSAGE AS ADDITIONAL_INFORMATION
+        FROM SYS.M_BACKUP_CATALOG 
+        WHERE STATE_NAME = 'failed' OR STATE_NAME = 'canceled'
+        ORDER BY BACKUP_ID DESC
+        LIMIT 500
+        """
+    # Fallback to just getting all backups from catalog
+    return """
+    SELECT * FROM SYS.M_BACKUP_CATALOG
+    ORDER BY BACKUP_ID DESC
+    LIMIT 500
+    """
+
+def _failed_backups_fallback_query(column_names: Dict[str, List[str]]) -> str:
+    """Build the basic backup catalog query, without joins, used when the failed backups query fails."""
+    return """
+    SELECT * FROM SYS.M_BACKUP_CATALOG
+    LIMIT 500
+    """
+
+def _table_sizes_query(column_names: Dict[str, List[str]]) -> str:
+    """Build the table sizes query for the available M_TABLE_PERSISTENCE_STATISTICS columns."""
+    persistence_column_names = column_names['M_TABLE_PERSISTENCE_STATISTICS']
+    
+    # Check if required columns exist
+    has_schema_name = "SCHEMA_NAME" in persistence_column_names
+    has_table_name = "TABLE_NAME" in persistence_column_names
+    has_disk_size = "DISK_SIZE" in persistence_column_names
+    
+    # Build the query based on available columns
+    if has_schema_name and has_table_name and has_disk_size:
+        # We can perform the full query with only the essential columns
+        # Use DOUBLE so the driver returns floats rather than Decimals, and add calculated columns
+        return """
+        SELECT 
+            SCHEMA_NAME, 
+            TABLE_NAME, 
+            CAST(DISK_SIZE AS DOUBLE) AS DISK_SIZE,
+            TO_DOUBLE(ROUND(DISK_SIZE / 1024 / 1024 / 1024, 2)) AS DISK_SIZE_GB,
+            TO_DOUBLE(ROUND(DISK_SIZE / 1024 / 1024, 2)) AS DISK_SIZE_MB
+        FROM PUBLIC.M_TABLE_PERSISTENCE_STATISTICS 
+        WHERE DISK_SIZE > 0
+        ORDER BY DISK_SIZE DESC
+        """
+    elif has_schema_name and has_table_name:
+        # We can at least get schema and table names
+        return """
+        SELECT SCHEMA_NAME, TABLE_NAME 
+        FROM PUBLIC.M_TABLE_PERSISTENCE_STATISTICS
+        """
+    # Fallback to just getting all columns
+    return """
+    SELECT * FROM PUBLIC.M_TABLE_PERSISTENCE_STATISTICS
+    """
+
+def _table_sizes_fallback_query(column_names: Dict[str, List[str]]) -> Optional[str]:
+    """Build the table sizes query without calculated columns, if the size columns exist."""
+    persistence_column_names = column_names['M_TABLE_PERSISTENCE_STATISTICS']
+    if not all(col in persistence_column_names for col in ("SCHEMA_NAME", "TABLE_NAME", "DISK_SIZE")):
+        return None
+    return """
+    SELECT 
+        SCHEMA_NAME, 
+        TABLE_NAME, 
+        CAST(DISK_SIZE AS DOUBLE) AS DISK_SIZE
+    FROM PUBLIC.M_TABLE_PERSISTENCE_STATISTICS
+    WHERE DISK_SIZE > 0
+    ORDER BY DISK_SIZE DESC
+    """
+
+def _has_table_size_columns(column_names: Dict[str, List[str]]) -> bool:
+    """Check whether M_TABLES has the columns the memory usage by table type query needs."""
+    tables_column_names = column_names['M_TABLES']
+    return "TABLE_TYPE" in tables_column_names and "TABLE_SIZE" in tables_column_names
+
+def _table_memory_query(column_names: Dict[str, List[str]]) -> str:
+    """Build the table memory usage query for the available M_TABLES columns."""
+    # Build the query based on available columns
+    if _has_table_size_columns(column_names):
+        # We can perform the full query, aggregating both table types in one pass over M_TABLES
+        return """
+        SELECT 
+            ROUND(SUM(CASE WHEN TABLE_TYPE = 'COLUMN' THEN TABLE_SIZE END)/1024/1024) 
+                AS "Used Storage for Column Tables in [MB]", 
+            ROUND(SUM(CASE WHEN TABLE_TYPE = 'ROW' THEN TABLE_SIZE END)/1024/1024) 
+                AS "Used Storage for Row Tables in [MB]" 
+        FROM SYS.M_TABLES 
+        WHERE TABLE_TYPE IN ('COLUMN', 'ROW')
+        """
+    # Fallback to a more detailed query that doesn't rely on the specific calculation
+    return """
+    SELECT TABLE_TYPE, COUNT(*) AS TABLE_COUNT, SUM(TABLE_SIZE) AS TOTAL_SIZE 
+    FROM SYS.M_TABLES 
+    GROUP BY TABLE_TYPE
+    """
+
+def _table_memory_fallback_query(column_names: Dict[str, List[str]]) -> Optional[str]:
+    """Build the table count by type query used when the memory usage query fails."""
+    if "TABLE_TYPE" not in column_names['M_TABLES']:
+        return None
+    return """
+    SELECT TABLE_TYPE, COUNT(*) AS TABLE_COUNT 
+    FROM SYS.M_TABLES 
+    GROUP BY TABLE_TYPE
+    """
+
+@cached_tool(ttl=60)
+async def get_backup_catalog(use_system_db: bool = True, limit: int = BACKUP_CATALOG_LIMIT) -> Dict[str, Any]:
     """Get the backup catalog information from SAP HANA.
     
     This uses the M_BACKUP_CATALOG system view.
     
     Args:
         use_system_db: Whether to use the system database (recommended for administration)
+        limit: Maximum number of (most recent) catalog entries to return, at most 1000
     """
+    limit = max(1, min(limit, MAX_BACKUP_CATALOG_LIMIT))
     try:
-        with hana_connection(use_system_db) as conn:
+        async with (await get_pool(use_system_db)).acquire() as conn:
             if conn is None:
                 return {
                     "content": [{"type": "text", "text": "Error: Database connection failed. Check credentials."}],
                     "isError": True
                 }
             
-            # First, check what columns are actually available in the view
-            try:
-                # Check M_BACKUP_CATALOG columns
-                catalog_columns_query = """
-                SELECT COLUMN_NAME 
-                FROM SYS.TABLE_COLUMNS 
-                WHERE SCHEMA_NAME = 'SYS' AND TABLE_NAME = 'M_BACKUP_CATALOG'
-                """
-                catalog_columns = execute_query(conn, catalog_columns_query)
-                catalog_column_names = [col['COLUMN_NAME'] for col in catalog_columns]
-                logger.info(f"Available columns in M_BACKUP_CATALOG: {catalog_column_names}")
-            except Exception as e:
-                logger.error(f"Error checking available columns: {str(e)}")
-                # Fall back to standard column names from SAP HANA documentation
-                catalog_column_names = ["ENTRY_ID", "BACKUP_ID", "SID", "DATABASE_NAME", "HOST", 
-                                       "START_TIME", "END_TIME", "STATE", "COMMENT", "BACKUP_SIZE"]
-            
-            # Check if ENTRY_ID column exists (it might be ENTRY_ID or ENTERY_ID due to typo in query)
-            has_entry_id = "ENTRY_ID" in catalog_column_names
-            has_entery_id = "ENTERY_ID" in catalog_column_names
-            
-            # Build the query based on available columns
-            if has_entry_id:
-                order_by_column = "ENTRY_ID"
-            elif has_entery_id:
-                order_by_column = "ENTERY_ID"
-            else:
-                # If neither column exists, try to use START_TIME or fall back to no ordering
-                order_by_column = "START_TIME" if "START_TIME" in catalog_column_names else None
-            
-            # Build the query
-            if order_by_column:
-                backup_catalog_query = f"""
-                SELECT * FROM SYS.M_BACKUP_CATALOG ORDER BY {order_by_column} DESC
-                """
-            else:
-                backup_catalog_query = """
-                SELECT * FROM SYS.M_BACKUP_CATALOG
-                """
+            # Standard column names from SAP HANA documentation, assumed until the view is probed
+            views = {
+                ('SYS', 'M_BACKUP_CATALOG'): ["ENTRY_ID", "BACKUP_ID", "SID", "DATABASE_NAME", "HOST", 
+                                              "START_TIME", "END_TIME", "STATE", "COMMENT", "BACKUP_SIZE"]
+            }
             
             try:
-                backup_catalog = execute_query(conn, backup_catalog_query)
-                logger.info(f"Successfully retrieved backup catalog: {len(backup_catalog)} rows")
+                backup_catalog, _ = await asyncio.to_thread(
+                    _run_for_columns, conn, views, _backup_catalog_query, use_system_db, [limit],
+                    _backup_catalog_fallback_query, execute=_query_table
+                )
+                query_failed = _is_query_error(backup_catalog)
+                logger.info("Successfully retrieved backup catalog")
             except Exception as e:
-                logger.error(f"Error querying backup catalog: {str(e)}")
-                # Try a simpler query as fallback
-                try:
-                    backup_catalog = execute_query(conn, "SELECT * FROM SYS.M_BACKUP_CATALOG")
-                    logger.info(f"Retrieved backup catalog with basic query: {len(backup_catalog)} rows")
-                except Exception as e2:
-                    logger.error(f"Error with fallback backup catalog query: {str(e2)}")
-                    backup_catalog = [{"error": f"Failed to retrieve backup catalog: {str(e)}"}]
+                logger.error("Error querying backup catalog: %s", e)
+                backup_catalog = [{"error": f"Failed to retrieve backup catalog: {str(e)}"}]
+                query_failed = True
             
             return {
                 "content": format_result_content(backup_catalog),
-                "isError": False
+                "isError": query_failed
             }
     except Exception as e:
-        logger.error(f"Error getting backup catalog: {str(e)}", exc_info=True)
+        logger.error("Error getting backup catalog: %s", e, exc_info=True)
         return {
             "content": [{"type": "text", "text": f"Error getting backup catalog: {str(e)}"}],
             "isError": True
         }
 
+@cached_tool(ttl=300)
 async def get_db_info(use_system_db: bool = True) -> Dict[str, Any]:
     """Get database information from SAP HANA.
     
@@ -151,29 +496,18 @@ async def get_db_info(use_system_db: bool = True) -> Dict[str, Any]:
         use_system_db: Whether to use the system database (recommended for administration)
     """
     try:
-        with hana_connection(use_system_db) as conn:
+        async with (await get_pool(use_system_db)).acquire() as conn:
             if conn is None:
                 return {
                     "content": [{"type": "text", "text": "Error: Database connection failed. Check credentials."}],
                     "isError": True
                 }
             
-            # First, check what columns are actually available in the view
-            try:
-                # Check M_DATABASE columns
-                db_columns_query = """
-                SELECT COLUMN_NAME 
-                FROM SYS.TABLE_COLUMNS 
-                WHERE SCHEMA_NAME = 'SYS' AND TABLE_NAME = 'M_DATABASE'
-                """
-                db_columns = execute_query(conn, db_columns_query)
-                db_column_names = [col['COLUMN_NAME'] for col in db_columns]
-                logger.info(f"Available columns in M_DATABASE: {db_column_names}")
-            except Exception as e:
-                logger.error(f"Error checking available columns: {str(e)}")
-                # Fall back to standard column names from SAP HANA documentation
-                db_column_names = ["DATABASE_NAME", "DESCRIPTION", "ACTIVE_STATUS", "HOST", 
-                                  "START_TIME", "VERSION", "USAGE", "SYSTEM_ID"]
+            # Standard column names from SAP HANA documentation, assumed until the view is probed
+            views = {
+                ('SYS', 'M_DATABASE'): ["DATABASE_NAME", "DESCRIPTION", "ACTIVE_STATUS", "HOST", 
+                                        "START_TIME", "VERSION", "USAGE", "SYSTEM_ID"]
+            }
             
             # Build the query
             db_info_query = """
@@ -181,43 +515,29 @@ async def get_db_info(use_system_db: bool = True) -> Dict[str, Any]:
             """
             
             try:
-                db_info = execute_query(conn, db_info_query)
-                logger.info(f"Successfully retrieved database information: {len(db_info)} rows")
+                db_info, _ = await asyncio.to_thread(
+                    _run_for_columns, conn, views, lambda _: db_info_query, use_system_db, None,
+                    _db_info_fallback_query
+                )
+                query_failed = _is_query_error(db_info)
+                logger.info("Successfully retrieved database information: %d rows", len(db_info))
             except Exception as e:
-                logger.error(f"Error querying database information: {str(e)}")
-                # Try a more specific query as fallback
-                try:
-                    # Try to select only columns that are likely to exist
-                    fallback_columns = []
-                    for col in ["DATABASE_NAME", "DESCRIPTION", "ACTIVE_STATUS", "HOST"]:
-                        if col in db_column_names:
-                            fallback_columns.append(col)
-                    
-                    if fallback_columns:
-                        fallback_query = f"""
-                        SELECT {', '.join(fallback_columns)} FROM SYS.M_DATABASE
-                        """
-                        db_info = execute_query(conn, fallback_query)
-                        logger.info(f"Retrieved database information with fallback query: {len(db_info)} rows")
-                    else:
-                        # Last resort - try with just one column
-                        db_info = execute_query(conn, "SELECT DATABASE_NAME FROM SYS.M_DATABASE")
-                        logger.info(f"Retrieved basic database information: {len(db_info)} rows")
-                except Exception as e2:
-                    logger.error(f"Error with fallback database query: {str(e2)}")
-                    db_info = [{"error": f"Failed to retrieve database information: {str(e)}"}]
+                logger.error("Error querying database information: %s", e)
+                db_info = [{"error": f"Failed to retrieve database information: {str(e)}"}]
+                query_failed = True
             
             return {
                 "content": format_result_content(db_info),
-                "isError": False
+                "isError": query_failed
             }
     except Exception as e:
-        logger.error(f"Error getting database information: {str(e)}", exc_info=True)
+        logger.error("Error getting database information: %s", e, exc_info=True)
         return {
             "content": [{"type": "text", "text": f"Error getting database information: {str(e)}"}],
             "isError": True
         }
 
+@cached_tool(ttl=30)
 async def get_failed_backups(use_system_db: bool = True) -> Dict[str, Any]:
     """Get information about failed or canceled backups from SAP HANA.
     
@@ -227,116 +547,45 @@ async def get_failed_backups(use_system_db: bool = True) -> Dict[str, Any]:
         use_system_db: Whether to use the system database (recommended for administration)
     """
     try:
-        with hana_connection(use_system_db) as conn:
+        async with (await get_pool(use_system_db)).acquire() as conn:
             if conn is None:
                 return {
                     "content": [{"type": "text", "text": "Error: Database connection failed. Check credentials."}],
                     "isError": True
                 }
             
-            # First, check what columns are actually available in the views
-            try:
-                # Check M_BACKUP_CATALOG columns
-                catalog_columns_query = """
-                SELECT COLUMN_NAME 
-                FROM SYS.TABLE_COLUMNS 
-                WHERE SCHEMA_NAME = 'SYS' AND TABLE_NAME = 'M_BACKUP_CATALOG'
-                """
-                catalog_columns = execute_query(conn, catalog_columns_query)
-                catalog_column_names = [col['COLUMN_NAME'] for col in catalog_columns]
-                logger.info(f"Available columns in M_BACKUP_CATALOG: {catalog_column_names}")
-                
-                # Check M_BACKUP_CATALOG_FILES columns
-                files_columns_query = """
-                SELECT COLUMN_NAME 
-                FROM SYS.TABLE_COLUMNS 
-                WHERE SCHEMA_NAME = 'SYS' AND TABLE_NAME = 'M_BACKUP_CATALOG_FILES'
-                """
-                files_columns = execute_query(conn, files_columns_query)
-                files_column_names = [col['COLUMN_NAME'] for col in files_columns]
-                logger.info(f"Available columns in M_BACKUP_CATALOG_FILES: {files_column_names}")
-            except Exception as e:
-                logger.error(f"Error checking available columns: {str(e)}")
-                # Fall back to standard column names from SAP HANA documentation
-                catalog_column_names = ["ENTRY_ID", "BACKUP_ID", "ENTRY_TYPE_NAME", "SYS_START_TIME", 
-                                      "SYS_END_TIME", "STATE_NAME", "MESSAGE"]
-                files_column_names = ["ENTRY_ID", "SERVICE_TYPE_NAME", "SOURCE_ID", "SOURCE_TYPE_NAME", 
-                                     "DESTINATION_PATH"]
-            
-            # Check if required columns exist for the join
-            has_entry_id_catalog = "ENTRY_ID" in catalog_column_names
-            has_entry_id_files = "ENTRY_ID" in files_column_names
-            
-            # Check if we have the state column for filtering
-            has_state_name = "STATE_NAME" in catalog_column_names
-            
-            # Build the query based on available columns
-            if has_entry_id_catalog and has_entry_id_files and has_state_name:
-                # We can perform the full query with join and filtering
-                query = """
-                SELECT C.BACKUP_ID, 
-                       C.ENTRY_TYPE_NAME AS BACKUP_TYPE, 
-                       C.SYS_START_TIME, 
-                       C.SYS_END_TIME AS SYS_STOP_TIME, 
-                       C.STATE_NAME AS STATE, 
-                       C.MESSAGE AS ADDITIONAL_INFORMATION, 
-                       F.SERVICE_TYPE_NAME AS SERVICE, 
-                       F.SOURCE_ID, 
-                       F.SOURCE_TYPE_NAME AS SOURCE_TYPE, 
-                       F.DESTINATION_PATH 
-                FROM SYS.M_BACKUP_CATALOG C, SYS.M_BACKUP_CATALOG_FILES F 
-                WHERE C.ENTRY_ID = F.ENTRY_ID 
-                  AND (C.STATE_NAME = 'failed' OR C.STATE_NAME = 'canceled') 
-                ORDER BY C.BACKUP_ID DESC
-                """
-            elif has_state_name:
-                # We can at least filter for failed backups from the catalog
-                query = """
-                SELECT BACKUP_ID, 
-                       ENTRY_TYPE_NAME AS BACKUP_TYPE, 
-                       SYS_START_TIME, 
-                       SYS_END_TIME AS SYS_STOP_TIME, 
-                       STATE_NAME AS STATE, 
-                       MESSAGE AS ADDITIONAL_INFORMATION
-                FROM SYS.M_BACKUP_CATALOG 
-                WHERE STATE_NAME = 'failed' OR STATE_NAME = 'canceled'
-                ORDER BY BACKUP_ID DESC
-                """
-            else:
-                # Fallback to just getting all backups from catalog
-                query = """
-                SELECT * FROM SYS.M_BACKUP_CATALOG
-                ORDER BY BACKUP_ID DESC
-                """
+            # Standard column names from SAP HANA documentation, assumed until the views are probed
+            views = {
+                ('SYS', 'M_BACKUP_CATALOG'): ["ENTRY_ID", "BACKUP_ID", "ENTRY_TYPE_NAME", "SYS_START_TIME", 
+                                              "SYS_END_TIME", "STATE_NAME", "MESSAGE"],
+                ('SYS', 'M_BACKUP_CATALOG_FILES'): ["ENTRY_ID", "SERVICE_TYPE_NAME", "SOURCE_ID", 
+                                                    "SOURCE_TYPE_NAME", "DESTINATION_PATH"]
+            }
             
             try:
-                failed_backups = execute_query(conn, query)
-                logger.info(f"Successfully retrieved failed backups: {len(failed_backups)} rows")
+                failed_backups, _ = await asyncio.to_thread(
+                    _run_for_columns, conn, views, _failed_backups_query, use_system_db, None,
+                    _failed_backups_fallback_query
+                )
+                query_failed = _is_query_error(failed_backups)
+                logger.info("Successfully retrieved failed backups: %d rows", len(failed_backups))
             except Exception as e:
-                logger.error(f"Error querying failed backups: {str(e)}")
-                # Try a simpler query as fallback
-                try:
-                    # Try to get just the basic information without joins
-                    fallback_query = """
-                    SELECT * FROM SYS.M_BACKUP_CATALOG
-                    """
-                    failed_backups = execute_query(conn, fallback_query)
-                    logger.info(f"Retrieved backup catalog with fallback query: {len(failed_backups)} rows")
-                except Exception as e2:
-                    logger.error(f"Error with fallback query: {str(e2)}")
-                    failed_backups = [{"error": f"Failed to retrieve failed backups: {str(e)}"}]
+                logger.error("Error querying failed backups: %s", e)
+                failed_backups = [{"error": f"Failed to retrieve failed backups: {str(e)}"}]
+                query_failed = True
             
             return {
                 "content": format_result_content(failed_backups),
-                "isError": False
+                "isError": query_failed
             }
     except Exception as e:
-        logger.error(f"Error getting failed backups: {str(e)}", exc_info=True)
+        logger.error("Error getting failed backups: %s", e, exc_info=True)
         return {
             "content": [{"type": "text", "text": f"Error getting failed backups: {str(e)}"}],
             "isError": True
         }
 
+@cached_tool(ttl=60)
 async def get_tablesize_on_disk(use_system_db: bool = True) -> Dict[str, Any]:
     """Get table sizes on disk from SAP HANA.
     
@@ -346,95 +595,42 @@ async def get_tablesize_on_disk(use_system_db: bool = True) -> Dict[str, Any]:
         use_system_db: Whether to use the system database (recommended for administration)
     """
     try:
-        with hana_connection(use_system_db) as conn:
+        async with (await get_pool(use_system_db)).acquire() as conn:
             if conn is None:
                 return {
                     "content": [{"type": "text", "text": "Error: Database connection failed. Check credentials."}],
                     "isError": True
                 }
             
-            # First, check what columns are actually available in the view
-            try:
-                # Check M_TABLE_PERSISTENCE_STATISTICS columns
-                columns_query = """
-                SELECT COLUMN_NAME 
-                FROM SYS.TABLE_COLUMNS 
-                WHERE SCHEMA_NAME = 'PUBLIC' AND TABLE_NAME = 'M_TABLE_PERSISTENCE_STATISTICS'
-                """
-                columns = execute_query(conn, columns_query)
-                column_names = [col['COLUMN_NAME'] for col in columns]
-                logger.info(f"Available columns in PUBLIC.M_TABLE_PERSISTENCE_STATISTICS: {column_names}")
-            except Exception as e:
-                logger.error(f"Error checking available columns: {str(e)}")
-                # Fall back to standard column names from SAP HANA documentation
-                column_names = ["SCHEMA_NAME", "TABLE_NAME", "DISK_SIZE"]
-            
-            # Check if required columns exist
-            has_schema_name = "SCHEMA_NAME" in column_names
-            has_table_name = "TABLE_NAME" in column_names
-            has_disk_size = "DISK_SIZE" in column_names
-            
-            # Build the query based on available columns
-            if has_schema_name and has_table_name and has_disk_size:
-                # We can perform the full query with only the essential columns
-                # Use CAST to ensure proper numeric formatting and add calculated columns
-                query = """
-                SELECT 
-                    SCHEMA_NAME, 
-                    TABLE_NAME, 
-                    CAST(DISK_SIZE AS DECIMAL(38,2)) AS DISK_SIZE,
-                    ROUND(DISK_SIZE / 1024 / 1024 / 1024, 2) AS DISK_SIZE_GB,
-                    ROUND(DISK_SIZE / 1024 / 1024, 2) AS DISK_SIZE_MB
-                FROM PUBLIC.M_TABLE_PERSISTENCE_STATISTICS 
-                WHERE DISK_SIZE > 0
-                ORDER BY DISK_SIZE DESC
-                """
-            elif has_schema_name and has_table_name:
-                # We can at least get schema and table names
-                query = """
-                SELECT SCHEMA_NAME, TABLE_NAME 
-                FROM PUBLIC.M_TABLE_PERSISTENCE_STATISTICS
-                """
-            else:
-                # Fallback to just getting all columns
-                query = """
-                SELECT * FROM PUBLIC.M_TABLE_PERSISTENCE_STATISTICS
-                """
+            # Standard column names from SAP HANA documentation, assumed until the view is probed
+            views = {
+                ('PUBLIC', 'M_TABLE_PERSISTENCE_STATISTICS'): ["SCHEMA_NAME", "TABLE_NAME", "DISK_SIZE"]
+            }
             
             try:
-                table_sizes = execute_query(conn, query)
-                logger.info(f"Successfully retrieved table sizes: {len(table_sizes)} rows")
+                table_sizes, _ = await asyncio.to_thread(
+                    _run_for_columns, conn, views, _table_sizes_query, use_system_db, None,
+                    _table_sizes_fallback_query, execute=_query_table
+                )
+                query_failed = _is_query_error(table_sizes)
+                logger.info("Successfully retrieved table sizes")
             except Exception as e:
-                logger.error(f"Error querying table sizes: {str(e)}")
-                # Try a simpler query as fallback
-                try:
-                    # Try to get just the basic information
-                    fallback_query = """
-                    SELECT 
-                        SCHEMA_NAME, 
-                        TABLE_NAME, 
-                        CAST(DISK_SIZE AS DECIMAL(38,2)) AS DISK_SIZE
-                    FROM PUBLIC.M_TABLE_PERSISTENCE_STATISTICS
-                    WHERE DISK_SIZE > 0
-                    ORDER BY DISK_SIZE DESC
-                    """
-                    table_sizes = execute_query(conn, fallback_query)
-                    logger.info(f"Retrieved table sizes with fallback query: {len(table_sizes)} rows")
-                except Exception as e2:
-                    logger.error(f"Error with fallback query: {str(e2)}")
-                    table_sizes = [{"error": f"Failed to retrieve table sizes: {str(e)}"}]
+                logger.error("Error querying table sizes: %s", e)
+                table_sizes = [{"error": f"Failed to retrieve table sizes: {str(e)}"}]
+                query_failed = True
             
             return {
                 "content": format_result_content(table_sizes),
-                "isError": False
+                "isError": query_failed
             }
     except Exception as e:
-        logger.error(f"Error getting table sizes: {str(e)}", exc_info=True)
+        logger.error("Error getting table sizes: %s", e, exc_info=True)
         return {
             "content": [{"type": "text", "text": f"Error getting table sizes: {str(e)}"}],
             "isError": True
         }
 
+@cached_tool(ttl=60)
 async def get_table_used_memory(use_system_db: bool = True) -> Dict[str, Any]:
     """Get memory usage by table type (column vs row) from SAP HANA.
     
@@ -444,90 +640,81 @@ async def get_table_used_memory(use_system_db: bool = True) -> Dict[str, Any]:
         use_system_db: Whether to use the system database (recommended for administration)
     """
     try:
-        with hana_connection(use_system_db) as conn:
+        async with (await get_pool(use_system_db)).acquire() as conn:
             if conn is None:
                 return {
                     "content": [{"type": "text", "text": "Error: Database connection failed. Check credentials."}],
                     "isError": True
                 }
             
-            # First, check what columns are actually available in the view
-            try:
-                # Check M_TABLES columns
-                columns_query = """
-                SELECT COLUMN_NAME 
-                FROM SYS.TABLE_COLUMNS 
-                WHERE SCHEMA_NAME = 'SYS' AND TABLE_NAME = 'M_TABLES'
-                """
-                columns = execute_query(conn, columns_query)
-                column_names = [col['COLUMN_NAME'] for col in columns]
-                logger.info(f"Available columns in SYS.M_TABLES: {column_names}")
-            except Exception as e:
-                logger.error(f"Error checking available columns: {str(e)}")
-                # Fall back to standard column names from SAP HANA documentation
-                column_names = ["TABLE_NAME", "SCHEMA_NAME", "TABLE_TYPE", "TABLE_SIZE"]
-            
-            # Check if required columns exist
-            has_table_type = "TABLE_TYPE" in column_names
-            has_table_size = "TABLE_SIZE" in column_names
-            
-            # Build the query based on available columns
-            if has_table_type and has_table_size:
-                # We can perform the full query
-                query = """
-                SELECT 
-                    C AS "Used Storage for Column Tables in [MB]", 
-                    R AS "Used Storage for Row Tables in [MB]" 
-                FROM 
-                    (SELECT ROUND(SUM(TABLE_SIZE)/1024/1024) AS "C" FROM SYS.M_TABLES WHERE TABLE_TYPE = 'COLUMN'), 
-                    (SELECT ROUND(SUM(TABLE_SIZE)/1024/1024) AS "R" FROM SYS.M_TABLES WHERE TABLE_TYPE = 'ROW')
-                """
-            else:
-                # Fallback to a more detailed query that doesn't rely on the specific calculation
-                query = """
-                SELECT TABLE_TYPE, COUNT(*) AS TABLE_COUNT, SUM(TABLE_SIZE) AS TOTAL_SIZE 
-                FROM SYS.M_TABLES 
-                GROUP BY TABLE_TYPE
-                """
+            # Standard column names from SAP HANA documentation, assumed until the view is probed
+            views = {
+                ('SYS', 'M_TABLES'): ["TABLE_NAME", "SCHEMA_NAME", "TABLE_TYPE", "TABLE_SIZE"]
+            }
             
             try:
-                memory_usage = execute_query(conn, query)
-                logger.info(f"Successfully retrieved table memory usage: {len(memory_usage)} rows")
+                memory_usage, _ = await asyncio.to_thread(
+                    _run_for_columns, conn, views, _table_memory_query, use_system_db, None,
+                    _table_memory_fallback_query
+                )
+                query_failed = _is_query_error(memory_usage)
+                logger.info("Successfully retrieved table memory usage: %d rows", len(memory_usage))
                 
-                # If we used the fallback query, convert the results to a more readable format
-                if not (has_table_type and has_table_size) and memory_usage:
+                # If we used the query by table type, convert the results to a more readable format
+                if isinstance(memory_usage, list) and memory_usage and 'TOTAL_SIZE' in memory_usage[0]:
                     # Process the results to add MB values
                     for row in memory_usage:
+                        # Every row gets the MB column so the table stays rectangular
+                        row['TOTAL_SIZE_MB'] = None
                         if 'TOTAL_SIZE' in row and row['TOTAL_SIZE'] is not None:
                             try:
                                 # Add size in MB for readability
                                 row['TOTAL_SIZE_MB'] = round(float(row['TOTAL_SIZE']) / (1024 * 1024), 2)
                             except (ValueError, TypeError):
-                                # In case of conversion error, just skip adding the MB column
+                                # In case of conversion error, just leave the MB column empty
                                 pass
             except Exception as e:
-                logger.error(f"Error querying table memory usage: {str(e)}")
-                # Try a simpler query as fallback
-                try:
-                    # Try to get just the basic information
-                    fallback_query = """
-                    SELECT TABLE_TYPE, COUNT(*) AS TABLE_COUNT 
-                    FROM SYS.M_TABLES 
-                    GROUP BY TABLE_TYPE
-                    """
-                    memory_usage = execute_query(conn, fallback_query)
-                    logger.info(f"Retrieved table counts with fallback query: {len(memory_usage)} rows")
-                except Exception as e2:
-                    logger.error(f"Error with fallback query: {str(e2)}")
-                    memory_usage = [{"error": f"Failed to retrieve table memory usage: {str(e)}"}]
+                logger.error("Error querying table memory usage: %s", e)
+                memory_usage = [{"error": f"Failed to retrieve table memory usage: {str(e)}"}]
+                query_failed = True
             
             return {
                 "content": format_result_content(memory_usage),
-                "isError": False
+                "isError": query_failed
             }
     except Exception as e:
-        logger.error(f"Error getting table memory usage: {str(e)}", exc_info=True)
+        logger.error("Error getting table memory usage: %s", e, exc_info=True)
         return {
             "content": [{"type": "text", "text": f"Error getting table memory usage: {str(e)}"}],
             "isError": True
         }
+
+async def get_all_system_info(use_system_db: bool = True, refresh: bool = False) -> Dict[str, Any]:
+    """Get the backup catalog, database information, failed backups, table sizes on disk
+    and table memory usage from SAP HANA in one call.
+    
+    The five tools run concurrently, each on its own pooled connection, so the
+    call takes about as long as the slowest of them. Their cached responses are
+    reused unless refresh is set.
+    
+    Args:
+        use_system_db: Whether to use the system database (recommended for administration)
+        refresh: Bypass the responses cached from recent calls
+    """
+    sections = [
+        ("Backup Catalog", get_backup_catalog),
+        ("Database Information", get_db_info),
+        ("Failed Backups", get_failed_backups),
+        ("Table Sizes on Disk", get_tablesize_on_disk),
+        ("Table Memory Usage", get_table_used_memory),
+    ]
+    results = await asyncio.gather(*(tool(use_system_db, refresh=refresh) for _, tool in sections))
+    
+    content = []
+    for (title, _), result in zip(sections, results):
+        content.append({"type": "text", "text": f"## {title}"})
+        content.extend(result["content"])
+    return {
+        "content": content,
+        "isError": all(result.get("isError") for result in results)
+    }
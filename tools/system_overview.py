@@ -5,74 +5,184 @@ This module provides tools for retrieving system overview information from SAP H
 including host information, service status, and memory usage.
 """
 
+import asyncio
 import logging
-import json
-import decimal
-from typing import Any, Dict, List
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-from hana_connection import hana_connection, execute_query
+from hana_connection import execute_query, execute_query_iter
+from connection_pool import get_pool
+from tools._formatting import format_result_content, format_table
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Custom JSON encoder for handling Decimal objects (copied from utils to avoid circular imports)
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, o):
-        if isinstance(o, decimal.Decimal):
-            return float(o)
-        return super().default(o)
-
-# Format utilities (copied from utils to avoid circular imports)
-def format_result_content(result: Any) -> List[Dict[str, Any]]:
-    """Format result into MCP content format."""
-    if isinstance(result, str):
-        return [{"type": "text", "text": result}]
-    elif isinstance(result, dict):
-        if "error" in result:
-            return [{"type": "text", "text": f"Error: {result['error']}"}]
-        else:
-            # Format dictionary as markdown table
-            return [{"type": "text", "text": json.dumps(result, indent=2, cls=DecimalEncoder)}]
-    elif isinstance(result, list):
-        if not result:
-            return [{"type": "text", "text": "No results found."}]
-        
-        if isinstance(result[0], dict):
-            # Format list of dictionaries as markdown table
-            table_str = "| " + " | ".join(result[0].keys()) + " |\n"
-            table_str += "| " + " | ".join(["---"] * len(result[0].keys())) + " |\n"
-            
-            for row in result:
-                # Convert any Decimal values to float
-                formatted_values = []
-                for val in row.values():
-                    if isinstance(val, decimal.Decimal):
-                        formatted_values.append(str(float(val)))
-                    else:
-                        formatted_values.append(str(val))
-                
-                table_str += "| " + " | ".join(formatted_values) + " |\n"
-            
-            return [{"type": "text", "text": table_str}]
-        else:
-            # Format list as bullet points
-            bullet_list = "\n".join([f"* {item}" for item in result])
-            return [{"type": "text", "text": bullet_list}]
+# Seconds the column names of a view are reused before they are probed again
+_COLUMN_TTL = 3600
+
+# (use_system_db, view) -> (probe time, column names)
+_COLUMN_CACHE: Dict[Tuple[bool, str], Tuple[float, List[str]]] = {}
+
+# Guards _COLUMN_CACHE; tools may run concurrently in worker threads
+_COLUMN_CACHE_LOCK = threading.Lock()
+
+# (view, available column names) -> query built for them
+_QUERY_CACHE: Dict[Tuple[str, frozenset], str] = {}
+
+# The views get_system_overview queries
+_OVERVIEW_VIEWS = ('M_HOST_INFORMATION', 'M_SERVICES', 'M_SERVICE_MEMORY')
+
+# Output formats of get_system_overview
+_OVERVIEW_FORMATS = ("json", "markdown")
+
+# (result key, title) of the tables in the markdown output
+_OVERVIEW_SECTIONS = (
+    ("host_information", "Host Information"),
+    ("service_status", "Service Status"),
+    ("memory_usage", "Memory Usage"),
+)
+
+# Columns selected from each view if it has them; also assumed to be the available
+# columns (standard column names from SAP HANA documentation) if they cannot be checked
+_HOST_COLS = ("HOST", "HOST_ACTIVE", "HOST_STATUS", "PRODUCT_VERSION", "INSTANCE_ID", "COORDINATOR_TYPE")
+_SERVICE_COLS = ("HOST", "PORT", "SERVICE_NAME", "SERVICE_STATUS", "PROCESS_ID", "DETAIL")
+_MEMORY_COLS = ("HOST", "PORT", "SERVICE_NAME", "LOGICAL_MEMORY_SIZE", "PHYSICAL_MEMORY_SIZE")
+
+# Select expression of each M_SERVICE_MEMORY column; memory sizes are converted to GB
+_MEM_PROJ = {
+    "HOST": "HOST",
+    "PORT": "PORT",
+    "SERVICE_NAME": "SERVICE_NAME",
+    "LOGICAL_MEMORY_SIZE": "LOGICAL_MEMORY_SIZE/1024/1024/1024 AS LOGICAL_MEMORY_SIZE_GB",
+    "PHYSICAL_MEMORY_SIZE": "PHYSICAL_MEMORY_SIZE/1024/1024/1024 AS PHYSICAL_MEMORY_SIZE_GB",
+}
+
+def _get_columns(conn, views: Tuple[str, ...], use_system_db: bool, ttl: float = _COLUMN_TTL) -> Dict[str, List[str]]:
+    """Get the column names of SYS views, cached per database for ttl seconds.
+
+    The views that are not cached are probed together with one query.
+
+    Raises:
+        RuntimeError: If the columns could not be queried; failures are not cached
+    """
+    column_names: Dict[str, List[str]] = {}
+    now = time.monotonic()
+    with _COLUMN_CACHE_LOCK:
+        for view in views:
+            cached = _COLUMN_CACHE.get((use_system_db, view))
+            if cached is not None and now - cached[0] < ttl:
+                column_names[view] = cached[1]
+
+    missing = [view for view in views if view not in column_names]
+    if not missing:
+        return column_names
+
+    columns = execute_query(
+        conn,
+        f"""
+        SELECT TABLE_NAME, COLUMN_NAME 
+        FROM SYS.TABLE_COLUMNS 
+        WHERE SCHEMA_NAME = 'SYS' AND TABLE_NAME IN ({', '.join(['?'] * len(missing))})
+        """,
+        missing
+    )
+    if isinstance(columns, dict):
+        raise RuntimeError(columns.get("error", "Unexpected column query result"))
+
+    fetched: Dict[str, List[str]] = {view: [] for view in missing}
+    for col in columns:
+        fetched[col['TABLE_NAME']].append(col['COLUMN_NAME'])
+    now = time.monotonic()
+    with _COLUMN_CACHE_LOCK:
+        for view, names in fetched.items():
+            logger.info(f"Available columns in {view}: {names}")
+            _COLUMN_CACHE[(use_system_db, view)] = (now, names)
+    column_names.update(fetched)
+    return column_names
+
+def _build_query(
+    view: str,
+    candidate_cols: Sequence[str],
+    available_cols: Sequence[str],
+    basic_col: str,
+    projections: Optional[Dict[str, str]] = None
+) -> str:
+    """Build the query of a SYS view for the candidate columns it has, cached per column set.
+
+    Columns are selected as is unless projections gives their select expression.
+    If the view has none of the candidate columns, only basic_col is selected.
+    """
+    available_set = frozenset(available_cols)
+    key = (view, available_set)
+    query = _QUERY_CACHE.get(key)
+    if query is not None:
+        return query
+    
+    if projections is None:
+        select_columns = [col for col in candidate_cols if col in available_set]
     else:
-        # Default formatting for other types
-        return [{"type": "text", "text": str(result)}]
+        select_columns = [projections[col] for col in candidate_cols if col in available_set]
+    
+    query = f"SELECT {', '.join(select_columns or [basic_col])} FROM SYS.{view}"
+    _QUERY_CACHE[key] = query
+    return query
+
+def _run_query(conn, query: str, label: str) -> List[Dict[str, Any]]:
+    """Run a system overview query, returning its rows or a single error row.
+
+    The query only selects columns the view was found to have, so there is
+    no simpler query to fall back to.
+    """
+    rows = execute_query(conn, query)
+    if isinstance(rows, dict):
+        logger.error(f"Error querying {label} information: {rows.get('error')}")
+        return [{"error": f"Failed to retrieve {label} information: {rows.get('error')}"}]
+    logger.info(f"Successfully retrieved {label} information: {len(rows)} rows")
+    return rows
+
+def _run_query_table(conn, query: str, label: str) -> str:
+    """Run a system overview query and render its rows into a markdown table as they are fetched.
+
+    Rows are streamed from the cursor into the table, so they are never
+    collected into a list. A failure is rendered as a single error row.
+    """
+    try:
+        return format_table(execute_query_iter(conn, query))
+    except Exception as e:
+        logger.error(f"Error querying {label} information: {str(e)}")
+        return format_table([{"error": f"Failed to retrieve {label} information: {str(e)}"}])
 
-async def get_system_overview(use_system_db: bool = True) -> Dict[str, Any]:
+async def _pooled_query(use_system_db: bool, query: str, label: str, as_table: bool = False) -> Any:
+    """Run a system overview query on its own pooled connection, in a worker thread.
+
+    A HANA connection runs one statement at a time, so queries that should run
+    concurrently each borrow their own connection. With as_table, the rows are
+    returned rendered as a markdown table instead of as a list.
+    """
+    async with (await get_pool(use_system_db)).acquire() as conn:
+        return await asyncio.to_thread(_run_query_table if as_table else _run_query, conn, query, label)
+
+async def get_system_overview(use_system_db: bool = True, fmt: str = "json") -> Dict[str, Any]:
     """Get an overview of the SAP HANA system status, including host information,
     service status, and system resource usage.
     
     This uses the M_HOST_INFORMATION, M_SERVICES, and M_SERVICE_MEMORY system views.
+    The three views are queried concurrently, each on its own pooled connection.
     
     Args:
         use_system_db: Whether to use the system database (recommended for administration)
+        fmt: Output format, "json" (one JSON document, for programmatic clients) or
+            "markdown" (one table per view, for reading)
     """
+    if fmt not in _OVERVIEW_FORMATS:
+        return {
+            "content": [{"type": "text", "text": f"Invalid format: {fmt}. Must be one of: json, markdown"}],
+            "isError": True
+        }
+    
     try:
-        with hana_connection(use_system_db) as conn:
+        async with (await get_pool(use_system_db)).acquire() as conn:
             if conn is None:
                 return {
                     "content": [{"type": "text", "text": "Error: Database connection failed. Check credentials."}],
@@ -81,153 +191,58 @@ async def get_system_overview(use_system_db: bool = True) -> Dict[str, Any]:
             
             # First, check what columns are actually available in these views
             try:
-                # Check M_HOST_INFORMATION columns
-                host_columns_query = """
-                SELECT COLUMN_NAME 
-                FROM SYS.TABLE_COLUMNS 
-                WHERE SCHEMA_NAME = 'SYS' AND TABLE_NAME = 'M_HOST_INFORMATION'
-                """
-                host_columns = execute_query(conn, host_columns_query)
-                host_column_names = [col['COLUMN_NAME'] for col in host_columns]
-                logger.info(f"Available columns in M_HOST_INFORMATION: {host_column_names}")
-                
-                # Check M_SERVICES columns
-                services_columns_query = """
-                SELECT COLUMN_NAME 
-                FROM SYS.TABLE_COLUMNS 
-                WHERE SCHEMA_NAME = 'SYS' AND TABLE_NAME = 'M_SERVICES'
-                """
-                services_columns = execute_query(conn, services_columns_query)
-                services_column_names = [col['COLUMN_NAME'] for col in services_columns]
-                logger.info(f"Available columns in M_SERVICES: {services_column_names}")
-                
-                # Check M_SERVICE_MEMORY columns
-                memory_columns_query = """
-                SELECT COLUMN_NAME 
-                FROM SYS.TABLE_COLUMNS 
-                WHERE SCHEMA_NAME = 'SYS' AND TABLE_NAME = 'M_SERVICE_MEMORY'
-                """
-                memory_columns = execute_query(conn, memory_columns_query)
-                memory_column_names = [col['COLUMN_NAME'] for col in memory_columns]
-                logger.info(f"Available columns in M_SERVICE_MEMORY: {memory_column_names}")
+                column_names = await asyncio.to_thread(_get_columns, conn, _OVERVIEW_VIEWS, use_system_db)
+                host_column_names = column_names['M_HOST_INFORMATION']
+                services_column_names = column_names['M_SERVICES']
+                memory_column_names = column_names['M_SERVICE_MEMORY']
             except Exception as e:
                 logger.error(f"Error checking available columns: {str(e)}")
                 # Fall back to standard column names from SAP HANA documentation
-                host_column_names = ["HOST", "HOST_ACTIVE", "HOST_STATUS", "PRODUCT_VERSION", 
-                                    "INSTANCE_ID", "COORDINATOR_TYPE"]
-                services_column_names = ["HOST", "PORT", "SERVICE_NAME", "SERVICE_STATUS", 
-                                        "PROCESS_ID", "DETAIL"]
-                memory_column_names = ["HOST", "PORT", "SERVICE_NAME", "PROCESS_ID", 
-                                      "LOGICAL_MEMORY_SIZE", "PHYSICAL_MEMORY_SIZE"]
-            
-            # Build dynamic queries based on available columns
-            # Host information query
-            host_select_columns = []
-            for col in ["HOST", "HOST_ACTIVE", "HOST_STATUS", "PRODUCT_VERSION", "INSTANCE_ID", "COORDINATOR_TYPE"]:
-                if col in host_column_names:
-                    host_select_columns.append(col)
-            
-            if not host_select_columns:
-                # If no columns match, try with a basic query
-                host_query = """
-                SELECT HOST 
-                FROM SYS.M_HOST_INFORMATION
-                """
-            else:
-                host_query = f"""
-                SELECT {', '.join(host_select_columns)}
-                FROM SYS.M_HOST_INFORMATION
-                """
-            
-            try:
-                host_info = execute_query(conn, host_query)
-                logger.info(f"Successfully retrieved host information: {len(host_info)} rows")
-            except Exception as e:
-                logger.error(f"Error querying host information: {str(e)}")
-                # Try a simpler query as fallback
-                try:
-                    host_info = execute_query(conn, "SELECT HOST FROM SYS.M_HOST_INFORMATION")
-                    logger.info(f"Retrieved basic host information: {len(host_info)} rows")
-                except Exception as e2:
-                    logger.error(f"Error with fallback host query: {str(e2)}")
-                    host_info = [{"error": f"Failed to retrieve host information: {str(e)}"}]
-            
-            # Service status query
-            service_select_columns = []
-            for col in ["HOST", "PORT", "SERVICE_NAME", "SERVICE_STATUS", "PROCESS_ID", "DETAIL"]:
-                if col in services_column_names:
-                    service_select_columns.append(col)
-            
-            if not service_select_columns:
-                # If no columns match, try with a basic query
-                service_query = """
-                SELECT SERVICE_NAME 
-                FROM SYS.M_SERVICES
-                """
-            else:
-                service_query = f"""
-                SELECT {', '.join(service_select_columns)}
-                FROM SYS.M_SERVICES
-                """
-            
-            try:
-                service_info = execute_query(conn, service_query)
-                logger.info(f"Successfully retrieved service information: {len(service_info)} rows")
-            except Exception as e:
-                logger.error(f"Error querying service information: {str(e)}")
-                # Try a simpler query as fallback
-                try:
-                    service_info = execute_query(conn, "SELECT SERVICE_NAME FROM SYS.M_SERVICES")
-                    logger.info(f"Retrieved basic service information: {len(service_info)} rows")
-                except Exception as e2:
-                    logger.error(f"Error with fallback service query: {str(e2)}")
-                    service_info = [{"error": f"Failed to retrieve service information: {str(e)}"}]
-            
-            # Memory usage query
-            memory_select_columns = []
-            for col in ["HOST", "PORT", "SERVICE_NAME", "LOGICAL_MEMORY_SIZE", "PHYSICAL_MEMORY_SIZE"]:
-                if col in memory_column_names:
-                    if col in ["LOGICAL_MEMORY_SIZE", "PHYSICAL_MEMORY_SIZE"]:
-                        memory_select_columns.append(f"{col}/1024/1024/1024 as {col}_GB")
-                    else:
-                        memory_select_columns.append(col)
-            
-            if not memory_select_columns:
-                # If no columns match, try with a basic query
-                memory_query = """
-                SELECT SERVICE_NAME 
-                FROM SYS.M_SERVICE_MEMORY
-                """
-            else:
-                memory_query = f"""
-                SELECT {', '.join(memory_select_columns)}
-                FROM SYS.M_SERVICE_MEMORY
-                """
-            
-            try:
-                memory_info = execute_query(conn, memory_query)
-                logger.info(f"Successfully retrieved memory information: {len(memory_info)} rows")
-            except Exception as e:
-                logger.error(f"Error querying memory information: {str(e)}")
-                # Try a simpler query as fallback
-                try:
-                    memory_info = execute_query(conn, "SELECT SERVICE_NAME FROM SYS.M_SERVICE_MEMORY")
-                    logger.info(f"Retrieved basic memory information: {len(memory_info)} rows")
-                except Exception as e2:
-                    logger.error(f"Error with fallback memory query: {str(e2)}")
-                    memory_info = [{"error": f"Failed to retrieve memory information: {str(e)}"}]
-            
-            # Compile the results
-            result = {
-                "host_information": host_info,
-                "service_status": service_info,
-                "memory_usage": memory_info
-            }
-            
-            return {
-                "content": format_result_content(result),
-                "isError": False
-            }
+                host_column_names = _HOST_COLS
+                services_column_names = _SERVICE_COLS
+                memory_column_names = _MEMORY_COLS
+        
+        # Build dynamic queries based on available columns
+        host_query = _build_query("M_HOST_INFORMATION", _HOST_COLS, host_column_names, "HOST")
+        service_query = _build_query("M_SERVICES", _SERVICE_COLS, services_column_names, "SERVICE_NAME")
+        memory_query = _build_query("M_SERVICE_MEMORY", _MEMORY_COLS, memory_column_names, "SERVICE_NAME", _MEM_PROJ)
+        
+        host_info, service_info, memory_info = await asyncio.gather(
+            _pooled_query(use_system_db, host_query, "host", fmt == "markdown"),
+            _pooled_query(use_system_db, service_query, "service", fmt == "markdown"),
+            _pooled_query(use_system_db, memory_query, "memory", fmt == "markdown"),
+            return_exceptions=True
+        )
+        # A query that could not get a connection from the pool in time
+        if isinstance(host_info, Exception):
+            host_info = [{"error": f"Failed to retrieve host information: {str(host_info)}"}]
+        if isinstance(service_info, Exception):
+            service_info = [{"error": f"Failed to retrieve service information: {str(service_info)}"}]
+        if isinstance(memory_info, Exception):
+            memory_info = [{"error": f"Failed to retrieve memory information: {str(memory_info)}"}]
+        
+        # Compile the results
+        result = {
+            "host_information": host_info,
+            "service_status": service_info,
+            "memory_usage": memory_info
+        }
+        
+        if fmt == "json":
+            # Serialized in one call, without the per-row table rendering
+            content = format_result_content(result)
+        else:
+            # The tables were rendered while their rows were fetched
+            content = [
+                {"type": "text", "text": f"## {title}\n\n{block['text']}"}
+                for key, title in _OVERVIEW_SECTIONS
+                for block in format_result_content(result[key])
+            ]
+        
+        return {
+            "content": content,
+            "isError": False
+        }
     except Exception as e:
         logger.error(f"Error getting system overview: {str(e)}", exc_info=True)
         return {